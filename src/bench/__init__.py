@@ -0,0 +1 @@
+# 벤치마크: 가짜 OpenAI 서버, 합성 코퍼스 적재, 부하 테스트
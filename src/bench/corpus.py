@@ -0,0 +1,173 @@
+"""
+벤치마크용 합성 채용 공고 코퍼스
+
+실제 크롤링 데이터 없이 jobs / chunks 테이블을 채우기 위한 결정적(seed 고정) 생성기.
+- generate_jobs(n, seed) : nomalizing 출력과 같은 모양의 공고 dict 목록 (job_post_id는 "bench-" 접두어)
+- job_chunks(job)        : 공고 1건 → chunking 출력과 같은 모양의 청크 dict 목록 (임베딩 제외)
+- sample_queries(n, seed): 코퍼스 어휘로 만든 사용자 질문 목록
+- golden_set(jobs, n, seed): 정답 job_post_id가 라벨링된 평가용 질문 (bench/eval.py)
+"""
+
+import random
+
+from etl.chunking import CHUNK_TYPES
+
+BENCH_ID_PREFIX = "bench-"
+
+CATEGORIES = {
+    "서버/백엔드": ["Python", "Django", "FastAPI", "Java", "Spring Boot", "Go", "PostgreSQL", "Redis", "Kafka"],
+    "프론트엔드": ["JavaScript", "TypeScript", "React", "Vue.js", "Next.js", "Webpack", "GraphQL"],
+    "인공지능/머신러닝": ["Python", "PyTorch", "TensorFlow", "LLM", "RAG", "Computer Vision", "MLOps"],
+    "데이터 엔지니어": ["Python", "Spark", "Airflow", "Kafka", "BigQuery", "dbt", "SQL"],
+    "DevOps/시스템 엔지니어": ["AWS", "Kubernetes", "Docker", "Terraform", "Linux", "Prometheus"],
+    "안드로이드": ["Kotlin", "Java", "Jetpack Compose", "Coroutine", "Android"],
+    "iOS": ["Swift", "SwiftUI", "RxSwift", "Objective-C", "iOS"],
+}
+TASKS = [
+    "신규 서비스 API 설계 및 개발", "대용량 트래픽 처리 구조 개선", "데이터 파이프라인 구축 및 운영",
+    "사내 플랫폼 고도화", "모델 학습 및 서빙 파이프라인 개발", "웹 프론트엔드 화면 개발",
+    "모바일 앱 기능 개발", "클라우드 인프라 운영 및 자동화", "성능 모니터링 및 장애 대응",
+]
+REQUIREMENTS = [
+    "관련 분야 실무 경험", "컴퓨터공학 기초 지식", "협업 및 커뮤니케이션 능력",
+    "Git 기반 협업 경험", "테스트 코드 작성 경험", "문제 해결 능력",
+]
+PREFERRED = [
+    "오픈소스 기여 경험", "스타트업 근무 경험", "대규모 서비스 운영 경험",
+    "코드 리뷰 문화 경험", "클라우드 자격증 보유",
+]
+CITIES = [("서울", ["강남구", "서초구", "구로구", "마포구", "성동구"]), ("경기", ["성남시", "수원시"]), ("부산", ["해운대구"])]
+TAGS = ["유연근무제", "재택근무", "점심지원", "스톡옵션", "2호선 역세권 기업", "자기계발비 지원"]
+QUERY_TEMPLATES = [
+    "{stack} 쓰는 {category} 신입 공고 알려줘",
+    "안녕하세요 저는 {stack} 개발자인데 {city} 근무 가능한 회사 있나요?",
+    "{stack} {stack2} 경험 필요한 {category} 채용 공고 추천해줘",
+    "{category} 직무에서 {task} 하는 회사 연봉이랑 복지 알려줘",
+    "경력 {years}년 {stack} 개발자 채용 공고",
+]
+
+
+def _job_id(i: int) -> str:
+    return f"{BENCH_ID_PREFIX}{i:06d}"
+
+
+def generate_jobs(n: int, seed: int = 42) -> list[dict]:
+    """nomalizing_*.json과 같은 모양의 합성 공고 n건"""
+    rng = random.Random(seed)
+    jobs = []
+    for i in range(n):
+        category = rng.choice(list(CATEGORIES))
+        stacks = rng.sample(CATEGORIES[category], k=min(4, len(CATEGORIES[category])))
+        min_years = rng.choice([0, 0, 1, 2, 3, 5])
+        max_years = None if min_years >= 3 else min_years + rng.choice([0, 2, 3])
+        city, districts = rng.choice(CITIES)
+        district = rng.choice(districts)
+        company_name = f"벤치컴퍼니{i % max(1, n // 3):04d}"
+        jobs.append({
+            "job_post_id": _job_id(i),
+            "job_category": category,
+            "post_title": f"[{category}] {stacks[0]} 개발자 ({'신입' if min_years == 0 else f'경력 {min_years}년 이상'})",
+            "job_post_url": f"https://example.com/position/{_job_id(i)}",
+            "requirements": {
+                "경력": "신입" if min_years == 0 else f"경력 {min_years}년 이상",
+                "학력": "학력무관",
+                "마감일": f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                "근무지역": f"{city} {district}",
+            },
+            "job_description": {
+                "기술스택": ", ".join(stacks),
+                "주요업무": "\n".join(f"- {t}" for t in rng.sample(TASKS, k=3)),
+                "자격요건": "\n".join(f"- {r}" for r in rng.sample(REQUIREMENTS, k=3)),
+                "우대사항": "\n".join(f"- {p}" for p in rng.sample(PREFERRED, k=2)),
+                "코딩테스트 여부": rng.choice(["채용 절차에 코딩테스트 있음", "채용 절차에 코딩테스트 없음"]),
+            },
+            "hiring_process": "채용 절차 및 지원 시 유의사항은 서류전형 - 1차 면접 - 최종 합격",
+            "company": {
+                "company_name": company_name,
+                "company_url": f"https://example.com/company/{company_name}",
+                "company_tags": rng.sample(TAGS, k=3),
+                "전체 직원수": f"{rng.randint(10, 3000)}명",
+                "평균 연봉": f"{rng.randint(3000, 9000):,}만원",
+                "매출액": f"{rng.randint(1, 5000)}억원",
+                "영업이익": f"{rng.randint(-50, 500)}억원",
+                "복지 및 혜택": ", ".join(rng.sample(TAGS, k=2)),
+            },
+            "normalized": {
+                "experience_raw": "신입" if min_years == 0 else f"경력 {min_years}년 이상",
+                "experience_min_years": min_years,
+                "experience_max_years": max_years,
+                "location_raw": f"{city} {district}",
+                "location_city": city,
+                "location_district": district,
+                "location_detail": None,
+            },
+        })
+    return jobs
+
+
+def job_chunks(job: dict) -> list[dict]:
+    """공고 1건 → chunking_*.json과 같은 모양의 청크 (chunk_type은 etl/chunking.py의 CHUNK_TYPES 값)"""
+    jd = job["job_description"]
+
+    def _items(text: str) -> str:
+        return ", ".join(line.lstrip("- ") for line in text.splitlines())
+
+    sections = [
+        (CHUNK_TYPES["skills"], f"[{CHUNK_TYPES['skills']}] -{job['job_category']}:{jd['기술스택']}"),
+        (CHUNK_TYPES["main_tasks"], f"[{CHUNK_TYPES['main_tasks']}] -{_items(jd['주요업무'])}"),
+        (CHUNK_TYPES["requirements"], f"[{CHUNK_TYPES['requirements']}] -{_items(jd['자격요건'])}"),
+        (CHUNK_TYPES["preferred"], f"[{CHUNK_TYPES['preferred']}] -{_items(jd['우대사항'])}"),
+    ]
+    return [
+        {
+            "job_post_id": job["job_post_id"],
+            "job_category": job["job_category"],
+            "post_title": job["post_title"],
+            "job_post_url": job["job_post_url"],
+            "chunk_type": chunk_type,
+            "chunk_id": f"{job['job_post_id']}_{i}",
+            "chunk_text": text,
+        }
+        for i, (chunk_type, text) in enumerate(sections)
+    ]
+
+
+def sample_queries(n: int, seed: int = 7) -> list[str]:
+    """코퍼스 어휘로 만든 사용자 질문 n개 (중복 가능 → 캐시 적중률도 함께 측정됨)"""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(n):
+        category = rng.choice(list(CATEGORIES))
+        stack, stack2 = rng.sample(CATEGORIES[category], k=2)
+        queries.append(rng.choice(QUERY_TEMPLATES).format(
+            stack=stack,
+            stack2=stack2,
+            category=category,
+            city=rng.choice(CITIES)[0],
+            task=rng.choice(TASKS),
+            years=rng.randint(1, 5),
+        ))
+    return queries
+
+
+def golden_set(jobs: list[dict], n: int = 50, seed: int = 11) -> list[dict]:
+    """
+    정답이 라벨링된 평가용 질문 n개.
+    질문 = (직무 카테고리 + 기술스택 2개), 정답 = 같은 카테고리이면서 두 스택을 모두 가진 공고.
+    """
+    rng = random.Random(seed)
+    items = []
+    for _ in range(n):
+        job = rng.choice(jobs)
+        category = job["job_category"]
+        stack, stack2 = rng.sample(job["job_description"]["기술스택"].split(", "), k=2)
+        relevant = [
+            j["job_post_id"] for j in jobs
+            if j["job_category"] == category
+            and {stack, stack2} <= set(j["job_description"]["기술스택"].split(", "))
+        ]
+        items.append({
+            "query": f"{stack}, {stack2} 쓰는 {category} 채용 공고 찾아줘",
+            "relevant_job_post_ids": relevant,
+        })
+    return items
@@ -0,0 +1,346 @@
+"""
+EVALUATE - 검색 품질·지연 시간 오프라인 평가
+
+정답 job_post_id가 라벨링된 골든셋 질문을 설정 조합(top_k × grade_mode × rewrite)마다 실행해
+품질과 비용을 함께 보고한다. 설정 값을 감이 아니라 숫자로 고르기 위한 도구.
+- retrieval: llm.aretrieve(재작성 → 임베딩 → 벡터 검색)만 실행
+    recall@k  = 상위 k개 청크의 공고 중 정답 수 / min(정답 수, k)
+    mrr       = 첫 정답 공고 순위의 역수 평균
+    hit_rate  = 정답 공고가 하나라도 들어온 질문 비율
+- generate : agenerate 전체 경로 실행 (답변 캐시 끔)
+    context_recall / context_precision = 평가(grading) 후 최종 컨텍스트 청크 기준
+- --diversify: 두 경로 모두 MMR 다양화(retrieval/diversify.py) 적용 → recall·precision 변화 확인용
+- --two-stage: 두 경로 모두 2단계 검색(공고 벡터 → 청크) 사용 → 전체 청크 검색과 recall·지연 시간 비교용
+- --stack-fast-path: generate 경로에서 기술스택 나열 질의를 스택 인덱스로 처리 (합성 골든셋 질문이 "스택, 스택 … 공고" 형태)
+- --name-fast-path: generate 경로에서 회사명·공고 제목 질의를 trigram 인덱스로 처리 (골든셋에 이름 질의가 있을 때 비교용)
+- 공통: 지연 시간 p50/p95, 단계(span)별 평균 ms, 질문당 API 호출 수·토큰 수
+- 설정마다 프로세스 내 캐시를 비우고 시작, 결과는 키 정렬된 JSON → 실행 간 diff / --compare로 비교
+
+골든셋 JSONL 한 줄: {"query": "...", "relevant_job_post_ids": ["52895679", ...]}
+(--golden 없이 실행하면 seed_db.py와 같은 seed의 합성 코퍼스로 골든셋을 만들어 사용)
+
+사용법:
+    python src/bench/evaluate.py --top-k 5,10,20 --grade-mode none,batch,similarity --rewrite on,off \\
+        --golden data/eval/golden.jsonl --out data/eval/report.json
+    python src/bench/evaluate.py --fake --retrieval-only --top-k 5,10 --compare data/eval/report.json
+"""
+
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 스크립트 단독 실행 시 src, src/generation을 path에 넣어 llm 모듈 import 가능하게 함
+_src_dir = Path(__file__).resolve().parent.parent
+for _p in (_src_dir, _src_dir / "generation"):
+    if str(_p) not in sys.path:
+        sys.path.insert(0, str(_p))
+
+# 평가가 실제 디스크 임베딩 캐시를 채우거나 캐시 적중으로 지연 시간이 왜곡되지 않도록 메모리 캐시만 사용
+os.environ.setdefault("EMBEDDING_CACHE_PATH", "")
+
+from openai import AsyncOpenAI
+
+from bench.corpus import generate_jobs, golden_set
+from bench.fake_openai import add_config_args, config_from_args, start_in_thread
+from db.conn import get_async_conn
+from grading import GRADE_MODES
+from llm import CONTEXT_POLICIES, agenerate, aretrieve, clear_caches
+from monitoring.tracing import Tracer, span
+
+# --compare에서 보여줄 지표 (섹션, 키)
+COMPARE_METRICS = [
+    ("retrieval", "recall_at_k"),
+    ("retrieval", "mrr"),
+    ("generate", "context_recall"),
+    ("generate", "context_precision"),
+    ("generate", "latency_p50_ms"),
+    ("generate", "api_calls"),
+]
+
+
+def load_golden(path: str) -> list[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _ranked_job_ids(chunks: list[dict]) -> list[str]:
+    """청크 순서대로 공고 ID 중복 제거"""
+    return list(dict.fromkeys(str(c["job_post_id"]) for c in chunks))
+
+
+def _recall(found: list[str], relevant: set[str], k: int) -> float:
+    hits = len(set(found[:k]) & relevant)
+    return hits / min(len(relevant), k)
+
+
+def _reciprocal_rank(found: list[str], relevant: set[str]) -> float:
+    for rank, job_id in enumerate(found, 1):
+        if job_id in relevant:
+            return 1.0 / rank
+    return 0.0
+
+
+def _stage_means(traces: list[list[dict]]) -> dict[str, float]:
+    """질문당 단계(span 이름)별 평균 소요 시간(ms)"""
+    totals: dict[str, float] = {}
+    for trace in traces:
+        for s in trace:
+            totals[s["name"]] = totals.get(s["name"], 0.0) + s["duration_ms"]
+    return {name: round(total / len(traces), 1) for name, total in sorted(totals.items())}
+
+
+def _cost(traces: list[list[dict]], key: str) -> float:
+    return round(sum(s["attributes"].get(key, 0) for t in traces for s in t) / len(traces), 2)
+
+
+def _round(value: float) -> float:
+    return round(float(value), 4)
+
+
+async def eval_retrieval(
+    golden,
+    conn,
+    client,
+    top_k: int,
+    rewrite: bool,
+    speculative: bool = False,
+    diversify: bool = False,
+    two_stage: bool = False,
+) -> dict:
+    recalls, rrs, hits, latencies, traces = [], [], [], [], []
+    for item in golden:
+        relevant = {str(i) for i in item["relevant_job_post_ids"]}
+        tracer = Tracer()
+        t0 = time.perf_counter()
+        with tracer.activate(), span("retrieve"):
+            _, _, chunks = await aretrieve(
+                item["query"], conn=conn, client=client, top_k=top_k, rewrite=rewrite,
+                speculative=speculative, diversify=diversify, two_stage=two_stage,
+            )
+        latencies.append((time.perf_counter() - t0) * 1000)
+        traces.append(tracer.spans)
+        found = _ranked_job_ids(chunks)
+        recalls.append(_recall(found, relevant, top_k))
+        rrs.append(_reciprocal_rank(found, relevant))
+        hits.append(1.0 if set(found) & relevant else 0.0)
+    return {
+        "recall_at_k": _round(np.mean(recalls)),
+        "mrr": _round(np.mean(rrs)),
+        "hit_rate": _round(np.mean(hits)),
+        "latency_p50_ms": round(float(np.percentile(latencies, 50)), 1),
+        "latency_p95_ms": round(float(np.percentile(latencies, 95)), 1),
+        "stage_ms": _stage_means(traces),
+        "api_calls": _cost(traces, "api_calls"),
+        "tokens": _cost(traces, "total_tokens"),
+    }
+
+
+async def eval_generate(
+    golden,
+    conn,
+    client,
+    top_k: int,
+    grade_mode: str,
+    rewrite: bool,
+    speculative: bool = False,
+    context_policy: str = "chunks",
+    diversify: bool = False,
+    two_stage: bool = False,
+    stack_fast_path: bool = False,
+    name_fast_path: bool = False,
+) -> dict:
+    recalls, precisions, latencies, traces, errors = [], [], [], [], 0
+    for item in golden:
+        relevant = {str(i) for i in item["relevant_job_post_ids"]}
+        t0 = time.perf_counter()
+        try:
+            _, chunks, _, trace = await agenerate(
+                item["query"],
+                conn=conn,
+                client=client,
+                return_chunks=True,
+                return_trace=True,
+                use_answer_cache=False,
+                grade_mode=grade_mode,
+                top_k=top_k,
+                rewrite=rewrite,
+                speculative=speculative,
+                context_policy=context_policy,
+                diversify=diversify,
+                two_stage=two_stage,
+                stack_fast_path=stack_fast_path,
+                name_fast_path=name_fast_path,
+            )
+        except Exception as e:
+            print(f"  ⚠ 생성 실패: {item['query'][:30]}... ({e})")
+            errors += 1
+            continue
+        latencies.append((time.perf_counter() - t0) * 1000)
+        traces.append(trace)
+        found = _ranked_job_ids(chunks)
+        recalls.append(_recall(found, relevant, len(found)) if found else 0.0)
+        precisions.append(
+            sum(1 for c in chunks if str(c["job_post_id"]) in relevant) / len(chunks) if chunks else 0.0
+        )
+    if not traces:
+        return {"errors": errors}
+    return {
+        "context_recall": _round(np.mean(recalls)),
+        "context_precision": _round(np.mean(precisions)),
+        "latency_p50_ms": round(float(np.percentile(latencies, 50)), 1),
+        "latency_p95_ms": round(float(np.percentile(latencies, 95)), 1),
+        "stage_ms": _stage_means(traces),
+        "api_calls": _cost(traces, "api_calls"),
+        "tokens": _cost(traces, "total_tokens"),
+        "errors": errors,
+    }
+
+
+def config_name(top_k: int, grade_mode: str | None, rewrite: bool) -> str:
+    parts = [f"top_k={top_k}"]
+    if grade_mode is not None:
+        parts.append(f"grade={grade_mode}")
+    parts.append(f"rewrite={'on' if rewrite else 'off'}")
+    return ",".join(parts)
+
+
+async def run(args, golden: list[dict]) -> dict:
+    server = None
+    base_url = args.base_url
+    if args.fake and base_url is None:
+        server, base_url = start_in_thread(config=config_from_args(args))
+        print(f"가짜 OpenAI 서버: {base_url}")
+    client = (
+        AsyncOpenAI(base_url=base_url, api_key=os.environ.get("OPENAI_API_KEY", "fake"), max_retries=0)
+        if base_url else AsyncOpenAI()
+    )
+    conn = await get_async_conn()
+
+    top_ks = [int(x) for x in args.top_k.split(",")]
+    grade_modes = args.grade_mode.split(",")
+    rewrites = [x.strip() == "on" for x in args.rewrite.split(",")]
+    configs = []
+    try:
+        for top_k, rewrite in itertools.product(top_ks, rewrites):
+            clear_caches()
+            retrieval = await eval_retrieval(
+                golden, conn, client, top_k, rewrite, args.speculative, args.diversify, args.two_stage
+            )
+            print(f"[{config_name(top_k, None, rewrite)}] recall@k {retrieval['recall_at_k']:.3f}  "
+                  f"MRR {retrieval['mrr']:.3f}  p50 {retrieval['latency_p50_ms']:.0f}ms")
+            if args.retrieval_only:
+                configs.append({"name": config_name(top_k, None, rewrite), "retrieval": retrieval})
+                continue
+            for grade_mode in grade_modes:
+                clear_caches()
+                gen = await eval_generate(
+                    golden, conn, client, top_k, grade_mode, rewrite,
+                    args.speculative, args.context_policy, args.diversify, args.two_stage,
+                    args.stack_fast_path, args.name_fast_path,
+                )
+                name = config_name(top_k, grade_mode, rewrite)
+                print(f"[{name}] context recall {gen.get('context_recall', 0):.3f}  "
+                      f"precision {gen.get('context_precision', 0):.3f}  "
+                      f"p50 {gen.get('latency_p50_ms', 0):.0f}ms  API {gen.get('api_calls', 0)}회")
+                configs.append({"name": name, "retrieval": retrieval, "generate": gen})
+    finally:
+        await conn.close()
+        await client.close()
+        if server is not None:
+            server.shutdown()
+
+    golden_bytes = json.dumps(golden, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return {
+        "golden": {
+            "source": args.golden or f"synthetic(jobs={args.jobs}, seed={args.seed})",
+            "questions": len(golden),
+            "sha256": hashlib.sha256(golden_bytes).hexdigest()[:16],
+        },
+        "client": "fake" if args.fake else (args.base_url or "openai"),
+        "speculative": args.speculative,
+        "diversify": args.diversify,
+        "two_stage": args.two_stage,
+        "stack_fast_path": args.stack_fast_path,
+        "name_fast_path": args.name_fast_path,
+        "context_policy": args.context_policy,
+        "configs": configs,
+    }
+
+
+def compare(old: dict, new: dict) -> None:
+    """같은 이름의 설정끼리 주요 지표 변화 출력"""
+    if old.get("golden", {}).get("sha256") != new["golden"]["sha256"]:
+        print("⚠ 골든셋이 달라 직접 비교가 어려울 수 있습니다.")
+    old_by_name = {c["name"]: c for c in old.get("configs", [])}
+    print("\n[비교] 이전 → 현재")
+    for c in new["configs"]:
+        prev = old_by_name.get(c["name"])
+        if prev is None:
+            print(f"  {c['name']}: (새 설정)")
+            continue
+        diffs = []
+        for section, key in COMPARE_METRICS:
+            a = prev.get(section, {}).get(key)
+            b = c.get(section, {}).get(key)
+            if a is None or b is None:
+                continue
+            diffs.append(f"{key} {a} → {b} ({b - a:+.4g})")
+        print(f"  {c['name']}: " + ", ".join(diffs))
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="검색 품질·지연 시간 오프라인 평가")
+    parser.add_argument("--golden", default=None, help="골든셋 JSONL 경로 (없으면 합성 코퍼스 골든셋)")
+    parser.add_argument("--jobs", type=int, default=1000, help="합성 골든셋: seed_db.py --jobs 값")
+    parser.add_argument("--seed", type=int, default=42, help="합성 골든셋: seed_db.py --seed 값")
+    parser.add_argument("--limit", type=int, default=50, help="평가할 질문 수")
+    parser.add_argument("--top-k", default="10", help="쉼표 구분 (예: 5,10,20)")
+    parser.add_argument("--grade-mode", default="batch", help=f"쉼표 구분 ({', '.join(GRADE_MODES)})")
+    parser.add_argument("--rewrite", default="on", help="on / off / on,off")
+    parser.add_argument("--speculative", action="store_true", help="추측 검색(재작성과 원본 질의 검색 동시 실행) 사용")
+    parser.add_argument("--diversify", action="store_true", help="MMR 다양화(후보를 넉넉히 가져와 공고별 개수 제한) 사용")
+    parser.add_argument("--two-stage", action="store_true", help="2단계 검색(공고 벡터 → 해당 공고 청크) 사용")
+    parser.add_argument("--stack-fast-path", action="store_true", help="기술스택 나열 질의 빠른 경로 사용 (generate 경로)")
+    parser.add_argument("--name-fast-path", action="store_true", help="회사명·공고 제목 질의 빠른 경로 사용 (generate 경로)")
+    parser.add_argument("--context-policy", choices=CONTEXT_POLICIES, default="chunks", help="초기 컨텍스트에 넣을 공고 정보")
+    parser.add_argument("--retrieval-only", action="store_true", help="generate 전체 경로는 실행하지 않음")
+    parser.add_argument("--base-url", default=None, help="OpenAI 호환 서버 주소")
+    parser.add_argument("--fake", action="store_true", help="가짜 OpenAI 서버를 띄워 사용 (지연·비용 구조만 측정)")
+    parser.add_argument("--out", default=None, help="결과 JSON 저장 경로")
+    parser.add_argument("--compare", default=None, help="이전 결과 JSON과 비교")
+    add_config_args(parser)
+    args = parser.parse_args()
+
+    unknown = set(args.grade_mode.split(",")) - set(GRADE_MODES)
+    if unknown:
+        parser.error(f"지원하지 않는 평가 모드: {', '.join(sorted(unknown))}")
+
+    if args.golden:
+        golden = load_golden(args.golden)
+    else:
+        golden = golden_set(generate_jobs(args.jobs, seed=args.seed), n=args.limit)
+    golden = [g for g in golden if g.get("relevant_job_post_ids")][: args.limit]
+    print(f"골든셋 질문 {len(golden)}개")
+
+    report = asyncio.run(run(args, golden))
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"결과 저장: {args.out}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f), report)
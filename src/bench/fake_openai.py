@@ -0,0 +1,293 @@
+"""
+FAKE OPENAI - 벤치마크용 로컬 OpenAI 호환 서버
+
+실제 API 비용·rate limit 없이 generate 처리량을 재기 위한 가짜 서버 (표준 라이브러리 http.server).
+- POST /v1/embeddings       : 단어 해시 기반 결정적 임베딩 (같은 단어를 공유하는 문장끼리 유사도가 높음)
+- POST /v1/chat/completions : 요청 모양을 보고 정해진 응답을 돌려줌
+    · 질의 재작성 프롬프트  → 원본 질문 그대로
+    · response_format=json  → 일괄 청크 평가 {"relevant": [1..]}
+    · max_tokens<=10        → 청크별 평가 "YES"
+    · tools가 있고 아직 tool 결과가 없음 → 컨텍스트의 공고ID로 get_company_info / get_jobs_title_link 호출
+    · 그 외                 → answer_tokens개 토큰짜리 최종 답변 (stream=True면 SSE로 토큰 단위 전송)
+- 모든 응답에 usage 포함, 지연 시간은 latency_ms(+jitter_ms) + 출력 토큰당 token_latency_ms
+
+사용법:
+    python src/bench/fake_openai.py --port 8900 --latency-ms 300 --token-latency-ms 5
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1 OPENAI_API_KEY=fake python src/generation/ask.py
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+EMBEDDING_DIM = 1536  # chunks.embedding vector(1536)과 같아야 함
+
+_TOKEN_RE = re.compile(r"[0-9A-Za-z가-힣+#.]+")
+_JOB_ID_RE = re.compile(r"\[공고ID: ([^\]]+)\]")
+_ANSWER_WORDS = ["조건에", "맞는", "채용", "공고를", "정리했습니다.", "자세한", "내용은", "링크를", "확인하세요."]
+
+
+@lru_cache(maxsize=20000)
+def _token_vector(token: str, dim: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.md5(token.encode("utf-8")).digest()[:8], "little")
+    return np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+
+
+def fake_embedding(text: str, dim: int = EMBEDDING_DIM) -> list[float]:
+    """단어(토큰)마다 고정된 난수 벡터를 더해 정규화한 결정적 임베딩"""
+    tokens = [t.lower() for t in _TOKEN_RE.findall(text or "")] or [""]
+    vec = np.zeros(dim, dtype=np.float32)
+    for token in tokens:
+        vec += _token_vector(token, dim)
+    norm = np.linalg.norm(vec)
+    return (vec / norm if norm else vec).tolist()
+
+
+def _count_tokens(text: str) -> int:
+    """usage 계산용 대략적인 토큰 수 (공백 단위)"""
+    return max(1, len(str(text or "").split()))
+
+
+@dataclass
+class FakeConfig:
+    latency_ms: float = 200.0        # 요청마다 기본 지연
+    jitter_ms: float = 50.0          # 0 ~ jitter_ms 사이 무작위 추가 지연
+    token_latency_ms: float = 5.0    # 출력 토큰당 지연 (chat만)
+    embed_latency_ms: float = 50.0   # 임베딩 요청 지연
+    answer_tokens: int = 60          # 최종 답변 토큰 수
+    use_tools: bool = True           # False면 툴 호출 없이 바로 답변
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive (클라이언트 연결 재사용)
+    config: FakeConfig = FakeConfig()
+
+    def log_message(self, format, *args):  # 요청마다 찍히는 접근 로그 끔
+        pass
+
+    # ---------- 공통 ----------
+
+    def _sleep(self, base_ms: float) -> None:
+        delay = base_ms + random.uniform(0, self.config.jitter_ms)
+        time.sleep(delay / 1000)
+
+    def _send_json(self, payload: dict, status: int = 200) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunk(self, payload) -> None:
+        data = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)
+        raw = f"data: {data}\n\n".encode("utf-8")
+        self.wfile.write(f"{len(raw):x}\r\n".encode("ascii") + raw + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json({"object": "list", "data": [{"id": "gpt-4o-mini", "object": "model"}]})
+        else:
+            self._send_json({"error": {"message": "not found"}}, status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if self.path.endswith("/embeddings"):
+            self._embeddings(body)
+        elif self.path.endswith("/chat/completions"):
+            self._chat(body)
+        else:
+            self._send_json({"error": {"message": "not found"}}, status=404)
+
+    # ---------- /v1/embeddings ----------
+
+    def _embeddings(self, body: dict) -> None:
+        inputs = body.get("input")
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        self._sleep(self.config.embed_latency_ms)
+        tokens = sum(_count_tokens(t) for t in inputs)
+        self._send_json({
+            "object": "list",
+            "model": body.get("model"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": fake_embedding(text)}
+                for i, text in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+    # ---------- /v1/chat/completions ----------
+
+    def _plan_reply(self, body: dict) -> tuple[str | None, list[dict]]:
+        """요청 모양에 맞는 (content, tool_calls) 결정"""
+        messages = body.get("messages", [])
+        last_user = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+
+        if "재작성된 질문" in last_user:
+            match = re.search(r"원본 질문: (.*)\n", last_user)
+            return (match.group(1).strip() if match else last_user), []
+        if (body.get("response_format") or {}).get("type") == "json_object":
+            count = len(re.findall(r"^\[(\d+)\]", last_user, flags=re.M))
+            return json.dumps({"relevant": list(range(1, min(count, 5) + 1))}), []
+        if body.get("max_tokens") and body["max_tokens"] <= 10:
+            return "YES", []
+
+        has_tool_result = any(m.get("role") == "tool" for m in messages)
+        if body.get("tools") and self.config.use_tools and not has_tool_result:
+            job_ids = list(dict.fromkeys(_JOB_ID_RE.findall(last_user)))
+            if job_ids:
+                return None, [
+                    {
+                        "id": f"call_{uuid.uuid4().hex[:12]}",
+                        "type": "function",
+                        "function": {
+                            "name": "get_company_info",
+                            "arguments": json.dumps({"job_post_id": job_ids[0]}),
+                        },
+                    },
+                    {
+                        "id": f"call_{uuid.uuid4().hex[:12]}",
+                        "type": "function",
+                        "function": {
+                            "name": "get_jobs_title_link",
+                            "arguments": json.dumps({"job_post_ids": job_ids[:3]}),
+                        },
+                    },
+                ]
+
+        words = [_ANSWER_WORDS[i % len(_ANSWER_WORDS)] for i in range(self.config.answer_tokens)]
+        return " ".join(words), []
+
+    def _chat(self, body: dict) -> None:
+        content, tool_calls = self._plan_reply(body)
+        prompt_tokens = sum(_count_tokens(m.get("content")) for m in body.get("messages", []))
+        completion_tokens = _count_tokens(content) if content else 10 * len(tool_calls)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        meta = {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o-mini"),
+        }
+        finish_reason = "tool_calls" if tool_calls else "stop"
+
+        if body.get("stream"):
+            self._stream_chat(body, meta, content, tool_calls, usage, finish_reason)
+            return
+
+        self._sleep(self.config.latency_ms + self.config.token_latency_ms * completion_tokens)
+        self._send_json({
+            **meta,
+            "object": "chat.completion",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content, "tool_calls": tool_calls or None},
+                "finish_reason": finish_reason,
+            }],
+            "usage": usage,
+        })
+
+    def _stream_chat(self, body, meta, content, tool_calls, usage, finish_reason) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def chunk(delta: dict, finish: str | None = None) -> dict:
+            return {
+                **meta,
+                "object": "chat.completion.chunk",
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+            }
+
+        self._sleep(self.config.latency_ms)  # 첫 토큰까지 지연
+        self._send_chunk(chunk({"role": "assistant", "content": "" if content else None}))
+        if tool_calls:
+            for i, tc in enumerate(tool_calls):
+                args = tc["function"]["arguments"]
+                half = len(args) // 2
+                self._send_chunk(chunk({"tool_calls": [{
+                    "index": i, "id": tc["id"], "type": "function",
+                    "function": {"name": tc["function"]["name"], "arguments": args[:half]},
+                }]}))
+                self._send_chunk(chunk({"tool_calls": [{"index": i, "function": {"arguments": args[half:]}}]}))
+        else:
+            for n, word in enumerate(content.split(" ")):
+                time.sleep(self.config.token_latency_ms / 1000)
+                self._send_chunk(chunk({"content": word if n == 0 else " " + word}))
+        self._send_chunk(chunk({}, finish_reason))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            self._send_chunk({**meta, "object": "chat.completion.chunk", "choices": [], "usage": usage})
+        self._send_chunk("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def make_server(host: str = "127.0.0.1", port: int = 8900, config: FakeConfig | None = None) -> ThreadingHTTPServer:
+    """설정값을 가진 가짜 서버 생성 (serve_forever는 호출하지 않음)"""
+    handler = type("FakeOpenAIHandler", (_Handler,), {"config": config or FakeConfig()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_in_thread(host: str = "127.0.0.1", port: int = 0, config: FakeConfig | None = None):
+    """백그라운드 스레드에서 서버 실행. (server, base_url) 반환 (port=0이면 빈 포트 자동 선택)"""
+    server = make_server(host, port, config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def add_config_args(parser: argparse.ArgumentParser) -> None:
+    """FakeConfig 항목을 CLI 옵션으로 추가 (load_test.py와 공유)"""
+    defaults = FakeConfig()
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms, help="chat 요청 기본 지연")
+    parser.add_argument("--jitter-ms", type=float, default=defaults.jitter_ms, help="무작위 추가 지연 상한")
+    parser.add_argument("--token-latency-ms", type=float, default=defaults.token_latency_ms, help="출력 토큰당 지연")
+    parser.add_argument("--embed-latency-ms", type=float, default=defaults.embed_latency_ms, help="임베딩 요청 지연")
+    parser.add_argument("--answer-tokens", type=int, default=defaults.answer_tokens, help="최종 답변 토큰 수")
+    parser.add_argument("--no-tools", action="store_true", help="툴 호출 없이 바로 답변")
+
+
+def config_from_args(args) -> FakeConfig:
+    return FakeConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        token_latency_ms=args.token_latency_ms,
+        embed_latency_ms=args.embed_latency_ms,
+        answer_tokens=args.answer_tokens,
+        use_tools=not args.no_tools,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="벤치마크용 가짜 OpenAI 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_config_args(parser)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, config_from_args(args))
+    print(f"가짜 OpenAI 서버 실행 중: http://{args.host}:{args.port}/v1 (Ctrl+C로 종료)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n종료합니다.")
+    finally:
+        server.server_close()
@@ -0,0 +1,241 @@
+"""
+LOAD TEST - generate 처리량·지연 시간 측정
+
+동시 요청 수를 늘려가며(예: 1, 2, 4, 8, 16) 같은 질문 목록으로 agenerate를 실행하고
+단계마다 QPS, 지연 시간 p50/p95/p99, 요청당 API 호출 수·토큰 수를 보고한다.
+- --base-url을 주지 않으면 fake_openai 서버를 프로세스 안 스레드로 띄워 사용 (지연 시간 옵션 적용)
+- AsyncOpenAI 클라이언트 1개와 psycopg_pool.AsyncConnectionPool 1개를 모든 요청이 공유
+- 기본은 단계마다 프로세스 내 캐시를 비우고 시작 (--warm이면 유지)
+- --out 경로에 설정·결과를 JSON으로 저장 → 파이프라인 변경 전후 결과를 숫자로 비교
+
+사전 준비: python src/bench/seed_db.py --jobs 1000
+
+사용법:
+    python src/bench/load_test.py --concurrency 1,2,4,8,16 --requests 64
+    python src/bench/load_test.py --grade-mode similarity --latency-ms 500 --out data/bench/similarity.json
+    python src/bench/load_test.py --base-url http://127.0.0.1:8900/v1   # 따로 띄운 가짜 서버 사용
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 스크립트 단독 실행 시 src, src/generation을 path에 넣어 llm 모듈 import 가능하게 함
+_src_dir = Path(__file__).resolve().parent.parent
+for _p in (_src_dir, _src_dir / "generation"):
+    if str(_p) not in sys.path:
+        sys.path.insert(0, str(_p))
+
+# 벤치마크가 실제 디스크 임베딩 캐시를 채우지 않도록 기본은 메모리 캐시만 사용
+os.environ.setdefault("EMBEDDING_CACHE_PATH", "")
+
+from openai import AsyncOpenAI
+from psycopg_pool import AsyncConnectionPool
+
+from bench.corpus import sample_queries
+from bench.fake_openai import add_config_args, config_from_args, start_in_thread
+from db.conn import get_database_url
+from grading import GRADE_MODES
+from llm import CONTEXT_POLICIES, agenerate, astream_generate, clear_caches
+
+
+def percentile(values: list[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+async def request_generate(query: str, client, pool, **generate_kwargs) -> tuple[list[dict], float | None]:
+    """agenerate 1건 실행 → (trace, None)"""
+    _, trace = await agenerate(query, client=client, pool=pool, return_trace=True, **generate_kwargs)
+    return trace, None
+
+
+async def request_stream(query: str, client, pool, **generate_kwargs) -> tuple[list[dict], float | None]:
+    """astream_generate 1건 실행 → (trace, 첫 답변 토큰까지 걸린 ms)"""
+    t0 = time.perf_counter()
+    ttft = None
+    trace = []
+    async for event in astream_generate(query, client=client, pool=pool, **generate_kwargs):
+        if event["type"] == "delta" and ttft is None:
+            ttft = (time.perf_counter() - t0) * 1000
+        elif event["type"] == "done":
+            trace = event["trace"]
+    return trace, ttft
+
+
+def _latency_summary(values: list[float]) -> dict:
+    return {
+        "mean": round(float(np.mean(values)), 1) if values else 0.0,
+        "p50": round(percentile(values, 50), 1),
+        "p95": round(percentile(values, 95), 1),
+        "p99": round(percentile(values, 99), 1),
+        "max": round(max(values), 1) if values else 0.0,
+    }
+
+
+async def run_level(
+    queries: list[str],
+    concurrency: int,
+    n_requests: int,
+    request,
+) -> dict:
+    """
+    동시 요청 concurrency개로 n_requests건 처리. 단계 결과 dict 반환
+
+    Args:
+        request: async (query) -> (trace, ttft_ms | None) — request_generate / request_stream을 감싼 함수
+    """
+    latencies: list[float] = []
+    ttfts: list[float] = []
+    api_calls: list[int] = []
+    tokens: list[int] = []
+    errors: list[str] = []
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index
+        while next_index < n_requests:
+            query = queries[next_index % len(queries)]
+            next_index += 1
+            t0 = time.perf_counter()
+            try:
+                trace, ttft = await request(query)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                continue
+            latencies.append((time.perf_counter() - t0) * 1000)
+            if ttft is not None:
+                ttfts.append(ttft)
+            api_calls.append(sum(s["attributes"].get("api_calls", 0) for s in trace))
+            tokens.append(sum(s["attributes"].get("total_tokens", 0) for s in trace))
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - t0
+
+    result = {
+        "concurrency": concurrency,
+        "requests": n_requests,
+        "ok": len(latencies),
+        "errors": len(errors),
+        "error_samples": errors[:3],
+        "wall_s": round(wall, 3),
+        "qps": round(len(latencies) / wall, 3) if wall else 0.0,
+        "latency_ms": _latency_summary(latencies),
+        "api_calls_per_request": round(float(np.mean(api_calls)), 2) if api_calls else 0.0,
+        "tokens_per_request": round(float(np.mean(tokens)), 1) if tokens else 0.0,
+    }
+    if ttfts:
+        result["ttft_ms"] = _latency_summary(ttfts)
+    return result
+
+
+def print_level(r: dict) -> None:
+    lat = r["latency_ms"]
+    print(
+        f"  동시 {r['concurrency']:>3} | {r['ok']:>4}건 (실패 {r['errors']}) | "
+        f"QPS {r['qps']:>7.2f} | p50 {lat['p50']:>8.1f}ms  p95 {lat['p95']:>8.1f}ms  p99 {lat['p99']:>8.1f}ms | "
+        f"API {r['api_calls_per_request']:.2f}회/건"
+        + (f" | TTFT p50 {r['ttft_ms']['p50']:.1f}ms" if "ttft_ms" in r else "")
+    )
+    for sample in r["error_samples"]:
+        print(f"      실패 예: {sample}")
+
+
+async def main(args) -> dict:
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server, base_url = start_in_thread(config=config_from_args(args))
+        print(f"가짜 OpenAI 서버: {base_url}")
+
+    levels = [int(x) for x in args.concurrency.split(",") if x.strip()]
+    queries = sample_queries(args.queries, seed=args.seed)
+    client = AsyncOpenAI(base_url=base_url, api_key=os.environ.get("OPENAI_API_KEY", "fake"), max_retries=0)
+    pool = AsyncConnectionPool(
+        get_database_url(),
+        min_size=1,
+        max_size=args.pool_size,
+        kwargs={"autocommit": True},
+        open=False,
+    )
+    await pool.open()
+
+    request_fn = request_stream if args.stream else request_generate
+    generate_kwargs = {
+        "grade_mode": args.grade_mode,
+        "use_answer_cache": not args.no_answer_cache,
+        "speculative": args.speculative,
+        "context_policy": args.context_policy,
+    }
+    results = []
+    try:
+        print(f"질문 {len(queries)}종, 단계별 {args.requests}건, grade_mode={args.grade_mode}, stream={args.stream}")
+        for concurrency in levels:
+            if not args.warm:
+                clear_caches()
+            r = await run_level(
+                queries,
+                concurrency,
+                args.requests,
+                lambda q: request_fn(q, client, pool, **generate_kwargs),
+            )
+            print_level(r)
+            results.append(r)
+    finally:
+        await pool.close()
+        await client.close()
+        if server is not None:
+            server.shutdown()
+
+    return {
+        "config": {
+            "base_url": args.base_url or "in-process fake",
+            "grade_mode": args.grade_mode,
+            "stream": args.stream,
+            "speculative": args.speculative,
+            "context_policy": args.context_policy,
+            "answer_cache": not args.no_answer_cache,
+            "warm": args.warm,
+            "queries": args.queries,
+            "requests": args.requests,
+            "pool_size": args.pool_size,
+            "fake": None if args.base_url else vars(config_from_args(args)),
+        },
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="generate 부하 테스트 (QPS, p50/p95/p99)")
+    parser.add_argument("--base-url", default=None, help="OpenAI 호환 서버 주소 (없으면 가짜 서버를 띄움)")
+    parser.add_argument("--concurrency", default="1,2,4,8,16", help="동시 요청 수 단계 (쉼표 구분)")
+    parser.add_argument("--requests", type=int, default=32, help="단계별 요청 수")
+    parser.add_argument("--queries", type=int, default=50, help="질문 종류 수 (requests보다 적으면 반복 → 캐시 적중)")
+    parser.add_argument("--seed", type=int, default=7, help="질문 생성 seed")
+    parser.add_argument("--pool-size", type=int, default=10, help="DB 커넥션 풀 최대 크기")
+    parser.add_argument("--grade-mode", choices=GRADE_MODES, default="batch")
+    parser.add_argument("--stream", action="store_true", help="astream_generate로 실행하고 첫 토큰까지 시간(TTFT)도 측정")
+    parser.add_argument("--speculative", action="store_true", help="재작성과 원본 질의 검색을 동시에 실행")
+    parser.add_argument("--context-policy", choices=CONTEXT_POLICIES, default="chunks", help="초기 컨텍스트에 넣을 공고 정보")
+    parser.add_argument("--no-answer-cache", action="store_true", help="시맨틱 답변 캐시 끄기")
+    parser.add_argument("--warm", action="store_true", help="단계 사이에 캐시를 비우지 않음")
+    parser.add_argument("--out", default=None, help="결과 JSON 저장 경로")
+    add_config_args(parser)
+    args = parser.parse_args()
+
+    report = asyncio.run(main(args))
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장: {args.out}")
@@ -0,0 +1,76 @@
+"""
+SEED DB - 벤치마크용 pgvector DB 채우기
+
+corpus.py의 합성 공고·청크를 fake_openai.fake_embedding으로 임베딩해
+etl/load.py와 같은 경로(create_tables → load_job_records → load_chunk_records)로 적재.
+합성 데이터는 job_post_id가 "bench-"로 시작하므로 --reset으로 실제 데이터와 분리해 지울 수 있음.
+(가짜 서버도 같은 임베딩 함수를 쓰므로 질의와 청크의 유사도가 의미를 가짐)
+
+사용법:
+    python src/bench/seed_db.py --jobs 2000          # 공고 2000건, 청크 8000건
+    python src/bench/seed_db.py --reset --jobs 500   # 기존 합성 데이터 삭제 후 다시 적재
+
+환경변수: DATABASE_URL 또는 POSTGRES_* (db/conn.py)
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# 스크립트 단독 실행 시 src를 path에 넣어 db / etl / bench 패키지 import 가능하게 함
+_src_dir = Path(__file__).resolve().parent.parent
+if str(_src_dir) not in sys.path:
+    sys.path.insert(0, str(_src_dir))
+
+from bench.corpus import BENCH_ID_PREFIX, generate_jobs, job_chunks
+from bench.fake_openai import fake_embedding
+from db.conn import get_conn
+from etl.load import create_tables, load_chunk_records, load_job_records
+
+
+def reset(conn) -> None:
+    """합성 데이터(bench- 접두어)만 삭제 (chunks → jobs 순서, FK. job_vectors는 jobs 삭제 시 CASCADE)"""
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM chunks WHERE job_post_id LIKE %s", (BENCH_ID_PREFIX + "%",))
+        cur.execute("DELETE FROM jobs WHERE job_post_id LIKE %s", (BENCH_ID_PREFIX + "%",))
+    conn.commit()
+    print("  기존 합성 데이터 삭제 완료")
+
+
+def seed(conn, n_jobs: int, seed_value: int = 42, batch_size: int = 500) -> tuple[int, int]:
+    """합성 공고 n_jobs건과 그 청크를 batch_size 단위로 적재. (공고 수, 청크 수) 반환"""
+    jobs = generate_jobs(n_jobs, seed=seed_value)
+    n_chunks = 0
+    for start in range(0, len(jobs), batch_size):
+        batch = jobs[start:start + batch_size]
+        load_job_records(conn, batch)
+        chunks = [c for job in batch for c in job_chunks(job)]
+        for c in chunks:
+            c["embedding"] = fake_embedding(c["chunk_text"])
+        n_chunks += load_chunk_records(conn, chunks)
+    return len(jobs), n_chunks
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="벤치마크용 합성 코퍼스 적재")
+    parser.add_argument("--jobs", type=int, default=1000, help="합성 공고 수 (공고당 청크 4개)")
+    parser.add_argument("--seed", type=int, default=42, help="코퍼스 난수 seed")
+    parser.add_argument("--batch-size", type=int, default=500, help="한 번에 적재할 공고 수")
+    parser.add_argument("--reset", action="store_true", help="기존 합성 데이터 삭제 후 적재")
+    args = parser.parse_args()
+
+    conn = get_conn()
+    try:
+        create_tables(conn)
+        if args.reset:
+            reset(conn)
+        t0 = time.perf_counter()
+        n_jobs, n_chunks = seed(conn, args.jobs, args.seed, args.batch_size)
+    finally:
+        conn.close()
+    print(f"합성 코퍼스 적재 완료: 공고 {n_jobs}건, 청크 {n_chunks}건 ({time.perf_counter() - t0:.1f}s)")
@@ -1,24 +1,77 @@
 """
 PostgreSQL 연결 공용 모듈
 
+- get_conn       : 동기 연결 (psycopg2) - ETL 적재, 동기 스크립트용
+- get_async_conn : 비동기 연결 (psycopg 3 AsyncConnection) - RAG 생성 경로(agenerate)용
+- async_conn_scope: 주어진 연결 / 커넥션 풀(psycopg_pool.AsyncConnectionPool) / 새 연결 중 하나를 빌려 쓰는 컨텍스트
+- async_pool_scope: 비동기 커넥션 풀을 열고 끝나면 닫는 컨텍스트 (배치·부하 테스트용)
+
 환경변수: DATABASE_URL 또는 POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_HOST, POSTGRES_PORT, POSTGRES_DB
 """
 
 import os
+from contextlib import asynccontextmanager
 from urllib.parse import quote_plus
 
+import psycopg
 import psycopg2
+from psycopg_pool import AsyncConnectionPool
 
 
-def get_conn():
-    """환경변수로 PostgreSQL 연결을 만들고 반환한다."""
+def get_database_url() -> str:
+    """환경변수로 PostgreSQL 접속 URL을 만든다."""
     url = os.environ.get("DATABASE_URL")
     if url:
-        return psycopg2.connect(url)
+        return url
     user = os.environ.get("POSTGRES_USER", "root")
     password = os.environ.get("POSTGRES_PASSWORD", "")
     host = os.environ.get("POSTGRES_HOST", "localhost")
     port = os.environ.get("POSTGRES_PORT", "5432")
     db = os.environ.get("POSTGRES_DB", "dj-project")
-    url = f"postgresql://{quote_plus(user)}:{quote_plus(password)}@{host}:{port}/{db}"
-    return psycopg2.connect(url)
+    return f"postgresql://{quote_plus(user)}:{quote_plus(password)}@{host}:{port}/{db}"
+
+
+def get_conn():
+    """환경변수로 PostgreSQL 연결을 만들고 반환한다."""
+    return psycopg2.connect(get_database_url())
+
+
+async def get_async_conn():
+    """환경변수로 비동기 PostgreSQL 연결(psycopg AsyncConnection)을 만들고 반환한다."""
+    return await psycopg.AsyncConnection.connect(get_database_url(), autocommit=True)
+
+
+@asynccontextmanager
+async def async_conn_scope(conn=None, pool=None):
+    """
+    conn이 있으면 그대로 쓰고(닫지 않음), pool이 있으면 풀에서 빌렸다가 반납하고,
+    둘 다 없으면 새로 연결한 뒤 끝나면 닫는다.
+    """
+    if conn is not None:
+        yield conn
+    elif pool is not None:
+        async with pool.connection() as pooled:
+            yield pooled
+    else:
+        new_conn = await get_async_conn()
+        try:
+            yield new_conn
+        finally:
+            await new_conn.close()
+
+
+@asynccontextmanager
+async def async_pool_scope(max_size: int = 10, min_size: int = 1):
+    """autocommit 연결을 쓰는 AsyncConnectionPool을 열고, 끝나면 닫는다."""
+    pool = AsyncConnectionPool(
+        get_database_url(),
+        min_size=min_size,
+        max_size=max_size,
+        kwargs={"autocommit": True},
+        open=False,
+    )
+    await pool.open()
+    try:
+        yield pool
+    finally:
+        await pool.close()
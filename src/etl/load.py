@@ -3,7 +3,11 @@ LOAD - PostgreSQL + pgvector 적재
 
 PIPELINE_PLAN.md 6. LOAD 스펙 구현
 - chunks 테이블: embedding_*.json → chunk_id, chunk_text, embedding(vector), 메타데이터
-- jobs 테이블  : nomalizing_*.json → job_post_id, normalized 필드, company, job_description 등
+- jobs 테이블  : nomalizing_*.json → job_post_id, normalized 필드, company, job_description,
+                 stack(정규화된 기술스택 TEXT[], GIN 인덱스),
+                 회사 수치·코딩테스트·마감일 컬럼(B-tree 인덱스, filter_jobs 툴의 구조화 필터용) 등
+                 post_title, company->>'company_name'에 pg_trgm GIN 인덱스 (회사명·제목 질의 빠른 경로)
+- job_vectors  : 청크 적재 후 공고별 청크 임베딩 평균(centroid)을 계산해 저장 (2단계 검색의 1단계 공고 ANN용)
 
 환경변수: DATABASE_URL 또는 POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_HOST, POSTGRES_PORT, POSTGRES_DB
 """
@@ -22,10 +26,12 @@ import psycopg2
 from psycopg2.extras import execute_values
 
 from db.conn import get_conn
+from etl.nomalizing import job_attributes, job_stack
 
-# DDL: pgvector 확장 + 두 테이블 생성
+# DDL: pgvector 확장 + 테이블 생성
 DDL = """
 CREATE EXTENSION IF NOT EXISTS vector;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
 CREATE TABLE IF NOT EXISTS jobs (
     job_post_id          TEXT PRIMARY KEY,
@@ -58,11 +64,50 @@ CREATE TABLE IF NOT EXISTS chunks (
 
 CREATE INDEX IF NOT EXISTS idx_chunks_embedding
     ON chunks USING hnsw (embedding vector_cosine_ops);
+
+-- 청크 내용이 바뀐 시각 (답변 캐시 무효화용). 기존 테이블에도 컬럼 추가
+ALTER TABLE chunks ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now();
+
+-- 정규화된 기술스택 (기술스택 질의 빠른 경로: stack && 질의 스택). 기존 테이블에도 컬럼 추가
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS stack TEXT[] NOT NULL DEFAULT '{}';
+CREATE INDEX IF NOT EXISTS idx_jobs_stack ON jobs USING gin (stack);
+
+-- 구조화 필터 (filter_jobs 툴): 회사 수치(직원 수 명, 금액 만원), 코딩테스트 여부, 마감일. 기존 테이블에도 컬럼 추가
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS company_employees        INT;
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS company_avg_salary       INT;
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS company_revenue          BIGINT;
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS company_operating_profit BIGINT;
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS has_coding_test          BOOLEAN;
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS deadline                 DATE;
+CREATE INDEX IF NOT EXISTS idx_jobs_company_employees ON jobs (company_employees);
+CREATE INDEX IF NOT EXISTS idx_jobs_company_avg_salary ON jobs (company_avg_salary);
+CREATE INDEX IF NOT EXISTS idx_jobs_company_revenue ON jobs (company_revenue);
+CREATE INDEX IF NOT EXISTS idx_jobs_company_operating_profit ON jobs (company_operating_profit);
+CREATE INDEX IF NOT EXISTS idx_jobs_has_coding_test ON jobs (has_coding_test);
+CREATE INDEX IF NOT EXISTS idx_jobs_deadline ON jobs (deadline);
+
+-- 회사명·공고 제목 trigram 유사도 검색 (이름 질의 빠른 경로: retrieval/name_search.py)
+CREATE INDEX IF NOT EXISTS idx_jobs_post_title_trgm ON jobs USING gin (post_title gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_jobs_company_name_trgm ON jobs USING gin ((company->>'company_name') gin_trgm_ops);
+
+-- 공고별 청크 조회 (2단계 검색의 2단계, 공고 행 조회)
+CREATE INDEX IF NOT EXISTS idx_chunks_job_post_id ON chunks (job_post_id);
+
+-- 공고 단위 벡터: 공고 청크 임베딩의 평균 (코사인 거리는 크기와 무관하므로 정규화하지 않음)
+CREATE TABLE IF NOT EXISTS job_vectors (
+    job_post_id TEXT PRIMARY KEY REFERENCES jobs(job_post_id) ON DELETE CASCADE,
+    embedding   vector(1536) NOT NULL,
+    n_chunks    INT NOT NULL,
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_vectors_embedding
+    ON job_vectors USING hnsw (embedding vector_cosine_ops);
 """
 
 
 def create_tables(conn) -> None:
-    """pgvector 확장 및 jobs, chunks 테이블이 없으면 생성한다."""
+    """pgvector·pg_trgm 확장 및 jobs, chunks 테이블이 없으면 생성한다."""
     with conn.cursor() as cur:
         cur.execute(DDL)
     conn.commit()
@@ -73,10 +118,16 @@ def load_jobs(conn, nomalizing_path: Path) -> int:
     """정규화 JSON을 읽어 jobs 테이블에 넣거나(같은 job_post_id면) 갱신한다. 적재 건수를 반환한다."""
     with open(nomalizing_path, "r", encoding="utf-8") as f:
         jobs = json.load(f)
+    return load_job_records(conn, jobs)
+
 
+def load_job_records(conn, jobs: list[dict]) -> int:
+    """정규화된 공고 dict 목록을 jobs 테이블에 넣거나 갱신한다. 적재 건수를 반환한다."""
     rows = []
     for job in jobs:
         norm = job.get("normalized") or {}
+        # 회사 수치 필드가 없는 예전 정규화 파일은 원본 문자열에서 바로 파싱
+        attrs = norm if "company_employees" in norm else job_attributes(job)
         rows.append((
             job.get("job_post_id"),
             job.get("job_category"),
@@ -93,6 +144,13 @@ def load_jobs(conn, nomalizing_path: Path) -> int:
             norm.get("location_city"),
             norm.get("location_district"),
             norm.get("location_detail"),
+            norm.get("stack") if norm.get("stack") is not None else job_stack(job),
+            attrs.get("company_employees"),
+            attrs.get("company_avg_salary"),
+            attrs.get("company_revenue"),
+            attrs.get("company_operating_profit"),
+            attrs.get("has_coding_test"),
+            attrs.get("deadline"),
         ))
 
     sql = """
@@ -100,7 +158,10 @@ def load_jobs(conn, nomalizing_path: Path) -> int:
             job_post_id, job_category, post_title, job_post_url,
             requirements, job_description, hiring_process, company,
             experience_raw, experience_min_years, experience_max_years,
-            location_raw, location_city, location_district, location_detail
+            location_raw, location_city, location_district, location_detail,
+            stack,
+            company_employees, company_avg_salary, company_revenue, company_operating_profit,
+            has_coding_test, deadline
         ) VALUES %s
         ON CONFLICT (job_post_id) DO UPDATE SET
             job_category         = EXCLUDED.job_category,
@@ -116,7 +177,14 @@ def load_jobs(conn, nomalizing_path: Path) -> int:
             location_raw         = EXCLUDED.location_raw,
             location_city        = EXCLUDED.location_city,
             location_district    = EXCLUDED.location_district,
-            location_detail      = EXCLUDED.location_detail
+            location_detail      = EXCLUDED.location_detail,
+            stack                = EXCLUDED.stack,
+            company_employees        = EXCLUDED.company_employees,
+            company_avg_salary       = EXCLUDED.company_avg_salary,
+            company_revenue          = EXCLUDED.company_revenue,
+            company_operating_profit = EXCLUDED.company_operating_profit,
+            has_coding_test          = EXCLUDED.has_coding_test,
+            deadline                 = EXCLUDED.deadline
     """
     with conn.cursor() as cur:
         execute_values(cur, sql, rows)
@@ -144,26 +212,29 @@ def _chunk_record_to_row(c: dict) -> tuple | None:
 
 def load_chunks(conn, embedding_path: Path) -> int:
     """임베딩 JSON/JSONL을 읽어 chunks 테이블에 넣거나(같은 chunk_id면) 갱신한다. 적재 건수를 반환한다."""
-    rows = []
+    records = []
     with open(embedding_path, "r", encoding="utf-8") as f:
         peek = f.read(50).lstrip()
     is_array = peek.startswith("[")
     with open(embedding_path, "r", encoding="utf-8") as f:
         if is_array:
-            data = json.load(f)
-            for c in data:
-                row = _chunk_record_to_row(c)
-                if row is not None:
-                    rows.append(row)
+            records = json.load(f)
         else:
             for line in f:
                 line = line.strip()
                 if not line:
                     continue
-                c = json.loads(line)
-                row = _chunk_record_to_row(c)
-                if row is not None:
-                    rows.append(row)
+                records.append(json.loads(line))
+    return load_chunk_records(conn, records)
+
+
+def load_chunk_records(conn, records) -> int:
+    """임베딩이 포함된 청크 dict 목록을 chunks 테이블에 넣거나 갱신한다. 적재 건수를 반환한다."""
+    rows = []
+    for c in records:
+        row = _chunk_record_to_row(c)
+        if row is not None:
+            rows.append(row)
 
     sql = """
         INSERT INTO chunks (
@@ -176,7 +247,14 @@ def load_chunks(conn, embedding_path: Path) -> int:
             embedding    = EXCLUDED.embedding,
             job_category = EXCLUDED.job_category,
             post_title   = EXCLUDED.post_title,
-            job_post_url = EXCLUDED.job_post_url
+            job_post_url = EXCLUDED.job_post_url,
+            updated_at   = now()
+        -- 내용이 같은 청크는 건드리지 않아 updated_at(답변 캐시 버전)이 유지됨
+        WHERE (chunks.chunk_type, chunks.chunk_text, chunks.embedding,
+               chunks.job_category, chunks.post_title, chunks.job_post_url)
+              IS DISTINCT FROM
+              (EXCLUDED.chunk_type, EXCLUDED.chunk_text, EXCLUDED.embedding,
+               EXCLUDED.job_category, EXCLUDED.post_title, EXCLUDED.job_post_url)
     """
     with conn.cursor() as cur:
         execute_values(
@@ -185,9 +263,39 @@ def load_chunks(conn, embedding_path: Path) -> int:
         )
     conn.commit()
     print(f"  chunks 테이블 적재 완료: {len(rows)}건")
+    refresh_job_vectors(conn, {row[4] for row in rows if row[4]})
     return len(rows)
 
 
+def refresh_job_vectors(conn, job_post_ids=None) -> int:
+    """
+    공고별 청크 임베딩 평균을 job_vectors에 넣거나 갱신한다 (job_post_ids가 없으면 전체 공고).
+    평균이 그대로인 공고는 건드리지 않는다. 갱신 건수를 반환한다.
+    """
+    if job_post_ids is not None and not job_post_ids:
+        return 0
+    where = "WHERE job_post_id = ANY(%s)" if job_post_ids is not None else "WHERE job_post_id IS NOT NULL"
+    sql = f"""
+        INSERT INTO job_vectors (job_post_id, embedding, n_chunks)
+        SELECT job_post_id, AVG(embedding), COUNT(*)
+        FROM chunks
+        {where}
+        GROUP BY job_post_id
+        ON CONFLICT (job_post_id) DO UPDATE SET
+            embedding  = EXCLUDED.embedding,
+            n_chunks   = EXCLUDED.n_chunks,
+            updated_at = now()
+        WHERE (job_vectors.embedding, job_vectors.n_chunks)
+              IS DISTINCT FROM (EXCLUDED.embedding, EXCLUDED.n_chunks)
+    """
+    with conn.cursor() as cur:
+        cur.execute(sql, (list(job_post_ids),) if job_post_ids is not None else None)
+        count = cur.rowcount
+    conn.commit()
+    print(f"  job_vectors 갱신 완료: {count}건")
+    return count
+
+
 def run(
     embedding_path: str | Path,
     nomalizing_path: str | Path,
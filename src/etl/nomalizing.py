@@ -5,6 +5,9 @@ PIPELINE_PLAN.md 3. NORMALIZING 스펙 구현
 - 기술스택: 토큰화, 정규화, 동의어 매핑 (주로 질의 정규화용)
 - 경력/학력: 숫자 범위 파싱, enum 매핑
 - 위치: 시/도, 구/시/군, 상세 주소 추출
+- 회사 수치·코딩테스트·마감일: company의 직원 수·평균 연봉·매출액·영업이익 문자열을 숫자로,
+  코딩테스트 여부를 boolean으로, 마감일을 날짜(YYYY-MM-DD)로 파싱 (load.py가 B-tree 인덱스 컬럼에 저장)
+- stack: normalize_stack_field=True면 job_description.기술스택을 정규화한 토큰 목록 (load.py가 jobs.stack에 저장)
 
 참고: 공고 데이터의 기술스택은 이미 통일된 선택지에서 선택한 값이므로,
       정규화는 주로 사용자 질의를 검색하기 좋게 정제할 때 사용합니다.
@@ -13,7 +16,7 @@ PIPELINE_PLAN.md 3. NORMALIZING 스펙 구현
 
 import json
 import re
-from datetime import datetime
+from datetime import date, datetime
 from pathlib import Path
 from typing import Any
 
@@ -185,6 +188,96 @@ def parse_location(location_raw: str) -> tuple[str, str, str]:
     return (city, district, detail)
 
 
+# 금액 단위 → 만원 배수 (회사 수치는 모두 만원 단위 정수로 저장)
+_MONEY_UNITS = {"조": 10 ** 8, "억": 10 ** 4, "만": 1}
+
+
+def parse_count(count_raw: str) -> int | None:
+    """
+    인원 수 파싱 ("1,234명" → 1234)
+    파싱 실패: None
+    """
+    if not count_raw or not isinstance(count_raw, str):
+        return None
+    m = re.search(r"\d[\d,]*", count_raw)
+    return int(m.group(0).replace(",", "")) if m else None
+
+
+def parse_money(money_raw: str) -> int | None:
+    """
+    금액 파싱 → 만원 단위 정수
+    - "5,200만원" → 5200
+    - "123억 4,567만원" → 1234567
+    - "1조 2,000억원" → 120000000
+    - "-12억원" → -120000 (영업손실)
+    - 단위 없이 "원"만 있으면 원 단위로 보고 만원으로 환산
+    파싱 실패: None
+    """
+    if not money_raw or not isinstance(money_raw, str):
+        return None
+    text = money_raw.replace(",", "").replace(" ", "")
+    sign = -1 if re.match(r"^[^\d]*[-−▼]", text) else 1
+    parts = re.findall(r"(\d+(?:\.\d+)?)(조|억|만)", text)
+    if parts:
+        total = sum(float(n) * _MONEY_UNITS[unit] for n, unit in parts)
+    else:
+        m = re.search(r"(\d+(?:\.\d+)?)원", text)
+        if not m:
+            return None
+        total = float(m.group(1)) / 10000
+    return sign * round(total)
+
+
+def parse_coding_test(coding_test_raw: str) -> bool | None:
+    """
+    코딩테스트 여부 파싱 (cleaning.py의 "채용 절차에 코딩테스트 있음/없음")
+    파싱 실패: None
+    """
+    if not coding_test_raw or not isinstance(coding_test_raw, str):
+        return None
+    if "없음" in coding_test_raw:
+        return False
+    if "있음" in coding_test_raw:
+        return True
+    return None
+
+
+def parse_deadline(deadline_raw: str) -> str | None:
+    """
+    마감일 파싱 → "YYYY-MM-DD"
+    - "2026-03-31", "2026.03.31", "2026/3/31", "2026년 3월 31일"
+    - 상시채용 등 날짜가 없으면 None
+    """
+    if not deadline_raw or not isinstance(deadline_raw, str):
+        return None
+    m = re.search(r"(\d{4})\s*[.\-/년]\s*(\d{1,2})\s*[.\-/월]\s*(\d{1,2})", deadline_raw)
+    if not m:
+        return None
+    try:
+        return date(int(m.group(1)), int(m.group(2)), int(m.group(3))).isoformat()
+    except ValueError:
+        return None
+
+
+def job_attributes(job: dict) -> dict:
+    """
+    공고 1건 → 구조화 필터용 필드 (jobs 테이블의 같은 이름 컬럼, 파싱 실패 시 None)
+    company_employees(명), company_avg_salary·company_revenue·company_operating_profit(만원),
+    has_coding_test, deadline(YYYY-MM-DD)
+    """
+    company = job.get("company") or {}
+    job_description = job.get("job_description") or {}
+    requirements = job.get("requirements") or {}
+    return {
+        "company_employees": parse_count(company.get("전체 직원수")),
+        "company_avg_salary": parse_money(company.get("평균 연봉")),
+        "company_revenue": parse_money(company.get("매출액")),
+        "company_operating_profit": parse_money(company.get("영업이익")),
+        "has_coding_test": parse_coding_test(job_description.get("코딩테스트 여부")),
+        "deadline": parse_deadline(requirements.get("마감일")),
+    }
+
+
 def normalize_query_stack(query: str) -> list[str]:
     """
     사용자 질의의 기술스택을 정규화하여 검색에 사용
@@ -210,11 +303,12 @@ def normalize_job(job: dict, normalize_stack_field: bool = False) -> dict:
     
     Args:
         job: Cleaning 단계 출력 레코드
-        normalize_stack_field: 사용하지 않음 (하위 호환용 유지)
+        normalize_stack_field: True면 job_description.기술스택을 정규화한 "stack" 필드 추가
     
     Returns:
         normalized 객체: experience_raw, experience_min_years, experience_max_years,
-                         location_raw, location_city, location_district, location_detail
+                         location_raw, location_city, location_district, location_detail,
+                         job_attributes의 회사 수치·코딩테스트·마감일 필드 (+ stack)
     """
     requirements = job.get("requirements", {})
     
@@ -226,7 +320,7 @@ def normalize_job(job: dict, normalize_stack_field: bool = False) -> dict:
     location_raw = requirements.get("근무지역", "") or ""
     location_city, location_district, location_detail = parse_location(location_raw)
     
-    return {
+    normalized = {
         "experience_raw": experience_raw,
         "experience_min_years": experience_min_years,
         "experience_max_years": experience_max_years,
@@ -234,13 +328,22 @@ def normalize_job(job: dict, normalize_stack_field: bool = False) -> dict:
         "location_city": location_city,
         "location_district": location_district,
         "location_detail": location_detail,
+        **job_attributes(job),
     }
+    if normalize_stack_field:
+        normalized["stack"] = job_stack(job)
+    return normalized
+
+
+def job_stack(job: dict) -> list[str]:
+    """공고의 job_description.기술스택 → 정규화된 스택 토큰 목록 (jobs.stack 컬럼 값)"""
+    return normalize_stack((job.get("job_description") or {}).get("기술스택", ""))
 
 
 def run(
     input_path: str | Path,
     output_path: str | Path | None = None,
-    normalize_stack_field: bool = False,
+    normalize_stack_field: bool = True,
 ) -> Path:
     """
     Cleaning JSON 로드 → Normalizing 적용 → 저장
@@ -248,9 +351,9 @@ def run(
     Args:
         input_path: Cleaning 출력 JSON 경로
         output_path: 출력 파일 경로 (기본: 입력 파일과 동일 디렉터리, normalized_ 접두어)
-        normalize_stack_field: 기술스택 필드를 정규화할지 여부 (기본: False)
-                              공고 데이터는 이미 통일된 선택지이므로 기본적으로 False
-                              검색 효율을 위해 정규화된 버전도 저장하고 싶을 때 True
+        normalize_stack_field: 기술스택 필드를 정규화해 normalized.stack으로 저장할지 여부 (기본: True)
+                              jobs.stack(GIN 인덱스) → 기술스택 질의 빠른 경로(retrieval/stack_search.py)에 사용.
+                              없어도 load.py가 job_description.기술스택에서 다시 계산
     
     Returns:
         저장된 파일 경로
@@ -0,0 +1,196 @@
+"""
+시맨틱 답변 캐시
+
+질의 임베딩을 키로 이전에 답한 질의들과 최근접 이웃(코사인 유사도) 비교 →
+유사도가 threshold 이상이면 저장된 답변·청크 목록·tools_used를 그대로 반환.
+
+- 각 항목은 답변에 사용된 chunk_id와 그 시점의 chunks.updated_at(버전)을 기록
+- 적중 시 DB에서 해당 청크들의 현재 버전을 한 번에 조회해, etl/load.py가 청크를
+  다시 쓰거나(updated_at 변경) 지웠으면 그 청크에 의존하는 항목을 모두 무효화
+  (ETL은 별도 프로세스이므로 무효화는 이 버전 비교로만 함)
+- 각 항목은 답변을 만든 설정(settings: 평가 방식·top_k·컨텍스트 정책 등)도 기록하고,
+  조회 시 설정이 같은 항목만 비교 (다른 설정으로 만든 답변을 돌려주지 않음)
+"""
+
+import threading
+import time
+
+import numpy as np
+
+ANSWER_CACHE_THRESHOLD = 0.95   # 이 유사도 이상이면 같은 질문으로 간주
+ANSWER_CACHE_SIZE = 256
+ANSWER_CACHE_TTL = 60 * 60 * 6  # 6시간
+
+
+_CHUNK_VERSIONS_SQL = """
+    SELECT chunk_id, updated_at
+    FROM chunks
+    WHERE chunk_id = ANY(%s)
+"""
+
+
+def fetch_chunk_versions(conn, chunk_ids: list[str]) -> dict[str, object]:
+    """chunk_id 목록의 현재 updated_at(버전)을 한 번의 쿼리로 조회"""
+    if not chunk_ids:
+        return {}
+    with conn.cursor() as cur:
+        cur.execute(_CHUNK_VERSIONS_SQL, (list(chunk_ids),))
+        rows = cur.fetchall()
+    return {r[0]: r[1] for r in rows}
+
+
+async def afetch_chunk_versions(conn, chunk_ids: list[str]) -> dict[str, object]:
+    """fetch_chunk_versions의 비동기 버전 (conn: psycopg AsyncConnection)"""
+    if not chunk_ids:
+        return {}
+    async with conn.cursor() as cur:
+        await cur.execute(_CHUNK_VERSIONS_SQL, (list(chunk_ids),))
+        rows = await cur.fetchall()
+    return {r[0]: r[1] for r in rows}
+
+
+class SemanticAnswerCache:
+    """질의 임베딩 최근접 이웃 기반 답변 캐시 (프로세스 내, 스레드 안전)"""
+
+    def __init__(
+        self,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        maxsize: int = ANSWER_CACHE_SIZE,
+        ttl: float | None = ANSWER_CACHE_TTL,
+    ):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: list[dict] = []
+        self._matrix: np.ndarray | None = None  # 정규화된 질의 임베딩 (행 = 항목)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def _rebuild(self) -> None:
+        if self._entries:
+            self._matrix = np.vstack([e["vector"] for e in self._entries])
+        else:
+            self._matrix = None
+
+    def _expire(self) -> None:
+        if not self.ttl:
+            return
+        now = time.time()
+        alive = [e for e in self._entries if e["created_at"] + self.ttl >= now]
+        if len(alive) != len(self._entries):
+            self._entries = alive
+            self._rebuild()
+
+    def _nearest(self, embedding, settings: dict | None) -> dict | None:
+        q = self._normalize(embedding)
+        settings = settings or {}
+        with self._lock:
+            self._expire()
+            if self._matrix is None:
+                return None
+            sims = self._matrix @ q
+            # 설정이 다른 항목은 후보에서 제외
+            same = np.fromiter((e["settings"] == settings for e in self._entries), dtype=bool, count=len(self._entries))
+            sims = np.where(same, sims, -np.inf)
+            best = int(np.argmax(sims))
+            score = float(sims[best])
+            if score < self.threshold:
+                return None
+            return {**self._entries[best], "similarity": score}
+
+    def _record(self, entry: dict | None) -> dict | None:
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def _check_versions(self, entry: dict, current: dict[str, object]) -> bool:
+        """저장 당시 청크 버전과 현재 버전 비교. 바뀌었거나 삭제된 청크가 있으면 무효화 후 False"""
+        stale = [cid for cid, ver in entry["chunk_versions"].items() if current.get(cid) != ver]
+        if stale:
+            self._invalidate_chunks(stale)
+            return False
+        return True
+
+    def lookup(self, embedding, conn=None, settings: dict | None = None) -> dict | None:
+        """
+        settings가 같은 이전 질의 중 가장 유사한 것이 threshold 이상이면 그 항목(similarity 포함)을 반환.
+        conn을 주면 항목이 의존한 청크가 그대로인지 DB로 확인하고, 바뀌었으면 무효화 후 None.
+        """
+        entry = self._nearest(embedding, settings)
+        if entry is not None and conn is not None:
+            current = fetch_chunk_versions(conn, list(entry["chunk_versions"]))
+            if not self._check_versions(entry, current):
+                entry = None
+        return self._record(entry)
+
+    async def alookup(self, embedding, conn=None, settings: dict | None = None) -> dict | None:
+        """lookup의 비동기 버전 (conn: psycopg AsyncConnection)"""
+        entry = self._nearest(embedding, settings)
+        if entry is not None and conn is not None:
+            current = await afetch_chunk_versions(conn, list(entry["chunk_versions"]))
+            if not self._check_versions(entry, current):
+                entry = None
+        return self._record(entry)
+
+    def store(
+        self,
+        embedding,
+        answer: str,
+        chunks: list[dict],
+        tools_used: list[str],
+        chunk_versions: dict[str, object],
+        query: str = "",
+        settings: dict | None = None,
+    ) -> None:
+        """답변과 그 답변이 의존한 청크(chunk_id·버전), 답변을 만든 설정을 저장"""
+        entry = {
+            "query": query,
+            "settings": dict(settings or {}),
+            "vector": self._normalize(embedding),
+            "answer": answer,
+            # 캐시 메모리 절약: 청크 임베딩은 저장하지 않음
+            "chunks": [{k: v for k, v in c.items() if k != "embedding"} for c in chunks],
+            "tools_used": list(tools_used),
+            "chunk_versions": dict(chunk_versions),
+            "created_at": time.time(),
+        }
+        with self._lock:
+            self._entries.append(entry)
+            if len(self._entries) > self.maxsize:
+                self._entries = self._entries[-self.maxsize:]  # 오래된 항목부터 제거
+            self._rebuild()
+
+    def _invalidate_chunks(self, chunk_ids) -> int:
+        """주어진 청크 중 하나라도 의존하는 항목을 모두 제거. 제거한 항목 수 반환"""
+        ids = set(chunk_ids)
+        with self._lock:
+            before = len(self._entries)
+            self._entries = [e for e in self._entries if not ids & e["chunk_versions"].keys()]
+            removed = before - len(self._entries)
+            if removed:
+                self._rebuild()
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries = []
+            self._matrix = None
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -1,19 +1,156 @@
 """
 터미널에서 사용자 질의를 입력받아 RAG 답변을 출력합니다.
+답변은 토큰이 생성되는 대로 바로 출력합니다 (session.ChatSession.stream).
+대화 세션을 유지하므로 "그 회사 연봉은?", "두 번째 공고 더 자세히" 같은 후속 질문은
+새로 검색하지 않고 이전 검색 결과로 답합니다. '/reset' 입력 시 세션 초기화.
 빈 입력 또는 'quit'/'exit'/'q' 입력 시 종료.
+
+옵션:
+  -v, --verbose : 질의 재작성·청크 평가·LLM 컨텍스트 등 단계별 로그 출력
+  --trace       : 답변마다 단계별 소요 시간·API 호출 수·토큰 수 요약 출력 (배치 모드에서는 결과에 trace 포함)
+  --diversify   : 검색 후보를 넉넉히 가져와 MMR로 다양화 (같은 공고의 비슷한 청크가 결과를 채우지 않게)
+  --two-stage   : 공고 벡터로 후보 공고를 먼저 고른 뒤 그 공고의 청크만 검색 (2단계 검색)
+  --stack-fast-path : "React, TypeScript 공고" 같은 기술스택 나열 질의는 재작성·임베딩 없이 스택 인덱스로 검색
+  --name-fast-path  : "카카오 백엔드 공고" 같은 회사명·공고 제목 질의는 재작성·임베딩 없이 trigram 인덱스로 검색
+  --metrics-port N  : 이 포트에서 GET /metrics로 Prometheus 형식 지표(API 호출·토큰·DB 지연·캐시 적중) 제공
+
+배치 모드 (비대화형):
+  --batch FILE  : 한 줄에 질문 하나씩 담긴 파일('-'면 stdin)을 읽어 agenerate_many로 처리하고
+                  결과를 JSON lines로 출력 (--out 경로, 없으면 stdout). 진행 상황은 stderr로 출력
+  예) uv run src/generation/ask.py --batch data/queries.txt --out data/answers.jsonl --concurrency 16
 """
 
+import argparse
+import asyncio
+import json
+import sys
+
 from dotenv import load_dotenv
+from openai import AsyncOpenAI
 
-from llm import generate
+from llm import DEFAULT_BATCH_CONCURRENCY, agenerate_many
+from db.conn import async_pool_scope
+from monitoring.metrics import start_http_server
+from session import ChatSession
 
 PROMPT = "질문을 입력하세요 (종료: Enter만 입력 또는 quit): "
 
 
+def _print_trace(spans: list[dict]) -> None:
+    """단계(span 이름)별 합계 출력"""
+    stages: dict[str, dict] = {}
+    for s in spans:
+        agg = stages.setdefault(s["name"], {"count": 0, "ms": 0.0, "api_calls": 0, "tokens": 0})
+        agg["count"] += 1
+        agg["ms"] += s["duration_ms"]
+        agg["api_calls"] += s["attributes"].get("api_calls", 0)
+        agg["tokens"] += s["attributes"].get("total_tokens", 0)
+    print("[추적] 단계별 소요 시간")
+    for name, agg in stages.items():
+        print(
+            f"  {name:<14} {agg['ms']:>9.1f}ms  x{agg['count']}"
+            f"  API {agg['api_calls']}회  토큰 {agg['tokens']}"
+        )
+    print()
+
+
+def _read_queries(path: str) -> list[str]:
+    """한 줄에 질문 하나 (빈 줄 무시). path가 '-'면 stdin"""
+    if path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    return [line.strip() for line in lines if line.strip()]
+
+
+def _batch_record(result: dict, with_trace: bool) -> dict:
+    """agenerate_many 결과 1건 → JSONL 한 줄 (청크는 id만)"""
+    if "error" in result:
+        return {"query": result["query"], "error": result["error"]}
+    record = {
+        "query": result["query"],
+        "answer": result["answer"],
+        "chunk_ids": [c["chunk_id"] for c in result["chunks"]],
+        "job_post_ids": list(dict.fromkeys(str(c["job_post_id"]) for c in result["chunks"])),
+        "tools_used": result["tools_used"],
+    }
+    if with_trace:
+        record["trace"] = result["trace"]
+    return record
+
+
+async def _run_batch(queries: list[str], out, args) -> int:
+    """batch_size개씩 agenerate_many로 처리하고 결과를 바로 기록. 실패한 질의 수 반환"""
+    client = AsyncOpenAI()
+    failed = 0
+    async with async_pool_scope(max_size=args.concurrency) as pool:
+        for start in range(0, len(queries), args.batch_size):
+            results = await agenerate_many(
+                queries[start:start + args.batch_size],
+                pool=pool,
+                client=client,
+                concurrency=args.concurrency,
+                verbose=args.verbose,
+                diversify=args.diversify,
+                two_stage=args.two_stage,
+            )
+            for r in results:
+                failed += "error" in r
+                out.write(json.dumps(_batch_record(r, args.trace), ensure_ascii=False, default=str) + "\n")
+            out.flush()
+            print(f"[배치] {min(start + args.batch_size, len(queries))}/{len(queries)} 처리 (실패 {failed})", file=sys.stderr)
+    return failed
+
+
+def batch_main(args) -> None:
+    queries = _read_queries(args.batch)
+    print(f"[배치] 질문 {len(queries)}개, 동시 {args.concurrency}", file=sys.stderr)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as out:
+            asyncio.run(_run_batch(queries, out, args))
+    else:
+        asyncio.run(_run_batch(queries, sys.stdout, args))
+
+
 def main():
+    parser = argparse.ArgumentParser(description="채용 공고 검색 도우미 (RAG)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="단계별 로그 출력")
+    parser.add_argument("--trace", action="store_true", help="답변마다 단계별 소요 시간 출력")
+    parser.add_argument("--diversify", action="store_true", help="검색 결과를 MMR로 다양화 (공고별 최대 개수 제한)")
+    parser.add_argument("--two-stage", action="store_true", help="공고 벡터 → 청크 순 2단계 검색")
+    parser.add_argument("--stack-fast-path", action="store_true", help="기술스택 나열 질의를 스택 인덱스로 바로 검색")
+    parser.add_argument("--name-fast-path", action="store_true", help="회사명·공고 제목 질의를 trigram 인덱스로 바로 검색")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Prometheus 지표를 GET /metrics로 제공할 포트")
+    parser.add_argument("--batch", metavar="FILE", default=None, help="질문 파일('-'면 stdin)을 일괄 처리해 JSONL로 출력")
+    parser.add_argument("--out", default=None, help="배치 결과 JSONL 경로 (없으면 stdout)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_BATCH_CONCURRENCY, help="배치 모드 동시 처리 수")
+    parser.add_argument("--batch-size", type=int, default=100, help="배치 모드에서 한 번에 검색할 질문 수")
+    args = parser.parse_args()
+
     load_dotenv()
+    if args.metrics_port is not None:
+        start_http_server(args.metrics_port)
+        print(f"[지표] http://localhost:{args.metrics_port}/metrics", file=sys.stderr)
+    if args.batch is not None:
+        batch_main(args)
+        return
+
     print("채용 공고 검색 도우미 (RAG)\n")
+    session = ChatSession(
+        verbose=args.verbose,
+        diversify=args.diversify,
+        two_stage=args.two_stage,
+        stack_fast_path=args.stack_fast_path,
+        name_fast_path=args.name_fast_path,
+    )
+    try:
+        _repl(session, args)
+    finally:
+        session.close()
+
 
+def _repl(session: ChatSession, args) -> None:
     while True:
         try:
             query = input(PROMPT).strip()
@@ -24,9 +161,31 @@ def main():
         if not query or query.lower() in ("quit", "exit", "q"):
             print("종료합니다.")
             break
+        if query == "/reset":
+            session.reset()
+            print("세션을 초기화했습니다.\n")
+            continue
 
         print()
-        answer, chunks, tools_used = generate(query, return_chunks=True)
+        answer_started = False
+        result = None
+        for event in session.stream(query):
+            if event["type"] == "delta":
+                if not answer_started:
+                    print(f"질문: {query}")
+                    print("답변:")
+                    answer_started = True
+                print(event["content"], end="", flush=True)
+            elif event["type"] == "done":
+                result = event
+        if not answer_started:
+            print(f"질문: {query}")
+            print(f"답변:\n{result['answer']}", end="")
+        print("\n")
+
+        chunks, tools_used = result["chunks"], result["tools_used"]
+        if result["route"] == "followup":
+            print("[세션] 후속 질문 → 이전 검색 결과로 답변")
         print(f"[로그] 검색된 청크 수: {len(chunks)}개")
         for i, c in enumerate(chunks, 1):
             print(f"  [{i}] chunk_id={c['chunk_id']}")
@@ -36,8 +195,9 @@ def main():
             print(f"[사용한 툴] {', '.join(tools_used)}")
         else:
             print("[사용한 툴] (없음)")
-        print(f"질문: {query}")
-        print(f"답변:\n{answer}\n")
+        print()
+        if args.trace:
+            _print_trace(result["trace"])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,153 @@
+"""
+LLM 컨텍스트 구성 (토큰 예산)
+
+- estimate_tokens: 토크나이저 없이 로컬에서 토큰 수 추정 (한글 등 비ASCII 1글자 ≈ 1토큰, ASCII 4글자 ≈ 1토큰 → 약간 과대 추정)
+- build_context  : 검색 청크를 공고(job_post_id)별로 묶어 제목 헤더 1번 + 청크 목록으로 구성하고,
+                   context_policy에 따라 링크·직무소개를 덧붙이되 전체가 토큰 예산(budget)을 넘지 않게 자름
+                   (청크는 유사도 순이므로 앞 공고부터 채우고, 예산이 모자라면 청크 단위로 자름.
+                    직무소개는 청크를 다 넣고 남은 예산으로만 추가)
+- compact_json / project_job_description: 툴 결과 직렬화용 (요청 필드만, 필드별 글자 수 제한, 공백 없는 JSON)
+"""
+
+import json
+import math
+
+# 초기 컨텍스트에 공고 정보를 얼마나 넣을지
+# - chunks    : 검색된 청크만 (제목·링크·직무소개는 툴로 조회)
+# - title_link: 청크 + 공고별 링크
+# - full      : 청크 + 공고별 링크·직무소개(job_description) → 툴 호출 라운드가 거의 필요 없음
+CONTEXT_POLICIES = ("chunks", "title_link", "full")
+DEFAULT_CONTEXT_POLICY = "chunks"
+DEFAULT_CONTEXT_BUDGET = 3000        # 컨텍스트(청크 + 공고 정보) 토큰 예산
+JOB_DESCRIPTION_FIELD_LIMIT = 400    # full 정책에서 직무소개 필드 1개당 최대 글자 수
+
+
+def estimate_tokens(text: str) -> int:
+    """토큰 수 로컬 추정 (비ASCII 글자 1개 ≈ 1토큰, 공백 외 ASCII 4글자 ≈ 1토큰)"""
+    if not text:
+        return 0
+    non_ascii = ascii_chars = 0
+    for ch in text:
+        if ord(ch) > 127:
+            non_ascii += 1
+        elif not ch.isspace():
+            ascii_chars += 1
+    return non_ascii + math.ceil(ascii_chars / 4)
+
+
+def truncate_text(text: str, limit: int) -> str:
+    text = str(text or "")
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def compact_json(obj) -> str:
+    """공백 없는 JSON (툴 결과 토큰 절약)"""
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def project_job_description(job_description: dict, fields=None, limit: int | None = None) -> dict:
+    """job_description에서 요청한 필드만(없으면 전체), 빈 값 제외, 필드별 limit 글자로 자름"""
+    keys = fields or list(job_description)
+    out = {}
+    for key in keys:
+        value = job_description.get(key)
+        if value:
+            out[key] = truncate_text(value, limit) if limit else value
+    return out
+
+
+def _group_by_job(chunks: list[dict]) -> list[tuple[str, list[dict]]]:
+    """청크를 처음 나온 순서(유사도 순)대로 공고별로 묶음"""
+    groups: dict[str, list[dict]] = {}
+    for c in chunks:
+        groups.setdefault(str(c["job_post_id"]), []).append(c)
+    return list(groups.items())
+
+
+def _job_header(job_post_id: str, job_chunks: list[dict], job: dict | None, policy: str) -> tuple[list[str], list[str]]:
+    """공고 1개의 (제목·링크 헤더 줄, full 정책의 직무소개 줄)"""
+    title = job["post_title"] if job else job_chunks[0].get("post_title", "")
+    header = [f"[공고ID: {job_post_id}] {title}"]
+    if job and policy in ("title_link", "full"):
+        header.append(f"링크: {job['job_post_url']}")
+    details = []
+    if job and policy == "full":
+        description = project_job_description(job["job_description"], limit=JOB_DESCRIPTION_FIELD_LIMIT)
+        details = [f"{key}: {value}" for key, value in description.items()]
+    return header, details
+
+
+def _line_cost(line: str) -> int:
+    return estimate_tokens(line) + 1  # 줄바꿈
+
+
+def build_context(
+    chunks: list[dict],
+    job_cache=None,
+    policy: str = DEFAULT_CONTEXT_POLICY,
+    budget: int = DEFAULT_CONTEXT_BUDGET,
+) -> tuple[str, dict]:
+    """
+    토큰 예산 안에서 LLM 컨텍스트 구성.
+    1) 유사도 순으로 공고 헤더(제목·링크) + 청크를 예산이 허락하는 데까지 채우고
+    2) 남은 예산으로 full 정책의 직무소개 줄을 앞 공고부터 덧붙임 (검색 근거인 청크가 우선)
+
+    Args:
+        chunks: 답변에 쓸 청크 (유사도 순)
+        job_cache: tool_runner.JobCache (title_link / full 정책에서 공고 정보 조회)
+        policy: CONTEXT_POLICIES 중 하나
+        budget: 컨텍스트 전체 토큰 예산 (estimate_tokens 기준)
+
+    Returns:
+        (컨텍스트 텍스트, {"tokens", "jobs", "chunks", "dropped_chunks", "dropped_details"})
+    """
+    hint = ""
+    if policy != "chunks":
+        provided = "링크" if policy == "title_link" else "링크·직무소개"
+        hint = f"(위 공고들의 제목·{provided}는 이미 포함되어 있으니 툴로 다시 조회하지 마세요)"
+    remaining = budget - _line_cost(hint) if hint else budget
+
+    # 1) 헤더 + 청크
+    jobs = []  # (헤더 줄, 직무소개 후보 줄, 넣은 청크 줄)
+    for job_post_id, job_chunks in _group_by_job(chunks):
+        job = job_cache.get(job_post_id) if job_cache is not None else None
+        header, details = _job_header(job_post_id, job_chunks, job, policy)
+        cost = sum(_line_cost(line) for line in header) + 3  # 공고 사이 구분선
+        taken = []
+        for c in job_chunks:
+            line = f"- {c['chunk_text']}"
+            if cost + _line_cost(line) > remaining:
+                break
+            taken.append(line)
+            cost += _line_cost(line)
+        if not taken:
+            break  # 청크를 하나도 못 넣는 공고부터는 생략
+        jobs.append((header, details, taken))
+        remaining -= cost
+        if len(taken) < len(job_chunks):
+            break
+
+    # 2) 남은 예산으로 직무소개
+    blocks = []
+    n_dropped_details = 0
+    for header, details, taken in jobs:
+        added = []
+        for line in details:
+            if _line_cost(line) <= remaining:
+                added.append(line)
+                remaining -= _line_cost(line)
+        n_dropped_details += len(details) - len(added)
+        blocks.append("\n".join(header + added + taken))
+
+    context = "\n\n---\n\n".join(blocks)
+    if blocks and hint:
+        context += f"\n\n{hint}"
+    n_chunks = sum(len(taken) for _, _, taken in jobs)
+    stats = {
+        "tokens": estimate_tokens(context),
+        "jobs": len(blocks),
+        "chunks": n_chunks,
+        "dropped_chunks": len(chunks) - n_chunks,
+        "dropped_details": n_dropped_details,
+    }
+    return context, stats
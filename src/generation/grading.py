@@ -0,0 +1,234 @@
+"""
+청크 관련성 평가(grading)
+
+벡터 검색으로 가져온 청크가 사용자 질문과 관련 있는지 LLM으로 판별(YES/NO).
+- batch     : 모든 청크를 한 번의 요청으로 보내고, 관련 있는(YES) 청크 번호 목록을 JSON으로 받음
+- concurrent: 청크마다 YES/NO 요청을 동시에 보냄 (asyncio, max_concurrency로 동시 호출 수 제한)
+- similarity: LLM 호출 없이 질의 임베딩과 청크 임베딩의 코사인 유사도로 로컬 판별
+              (절대 임계값 + 1위 대비 하락폭 + 점수 간격(gap) 감지 + 공고별 최대 개수)
+- none      : 평가 없이 검색 결과를 그대로 사용 (평가 단계의 비용·효과를 비교하기 위한 기준선)
+
+모든 방식은 관련 있는 청크만 유사도 순서대로 반환하고,
+평가에 실패한 청크는 안전하게 제외합니다.
+"""
+
+import asyncio
+import json
+
+import numpy as np
+from openai import AsyncOpenAI
+
+from monitoring.tracing import log, span
+
+EVAL_MODEL = "gpt-4o-mini"  # 평가용 모델 (빠르고 저렴)
+GRADE_MODES = ("batch", "concurrent", "similarity", "none")
+DEFAULT_GRADE_MODE = "batch"
+DEFAULT_MAX_CONCURRENCY = 5
+EVAL_TEXT_LIMIT = 500  # 토큰 절약을 위해 청크 앞부분만 평가
+
+# similarity 모드 기본값 (text-embedding-3-small 코사인 유사도 기준)
+SIM_MIN_SCORE = 0.35     # 이 값 미만은 관련 없음
+SIM_MAX_DROP = 0.12      # 1위 점수보다 이만큼 넘게 낮으면 관련 없음
+SIM_GAP = 0.05           # 정렬된 점수 사이 간격이 이보다 크면 그 아래는 잘라냄
+SIM_MAX_PER_JOB = 3      # 같은 공고(job_post_id)에서 최대 몇 개까지 유지할지
+
+EVAL_PROMPT = (
+    "다음 청크 내용이 사용자 질문과 관련이 있는지 판단하세요.\n\n"
+    "관련이 있으면 'YES', 관련이 없으면 'NO'만 답변하세요.\n\n"
+    "사용자 질문: {query}\n\n"
+    "청크 내용:\n{chunk_text}\n\n"
+    "답변 (YES/NO만):"
+)
+
+BATCH_EVAL_PROMPT = (
+    "아래 번호가 매겨진 청크들 각각이 사용자 질문과 관련이 있는지 판단하세요.\n"
+    "관련이 있으면 YES, 관련이 없으면 NO로 판단하고, YES인 청크 번호만 골라\n"
+    '{{"relevant": [번호, ...]}} 형식의 JSON으로만 답변하세요. 관련 있는 청크가 없으면 {{"relevant": []}}.\n\n'
+    "사용자 질문: {query}\n\n"
+    "청크 목록:\n{chunk_list}"
+)
+
+
+async def _grade_one(client: AsyncOpenAI, query: str, chunk_text: str) -> bool:
+    """청크 1개에 대해 YES/NO 평가. YES면 True."""
+    with span("grade_llm", mode="concurrent") as sp:
+        response = await client.chat.completions.create(
+            model=EVAL_MODEL,
+            messages=[
+                {
+                    "role": "user",
+                    "content": EVAL_PROMPT.format(query=query, chunk_text=chunk_text[:EVAL_TEXT_LIMIT]),
+                }
+            ],
+            temperature=0,  # 일관성 위해 0
+            max_tokens=10,  # YES/NO만 필요
+        )
+        sp.add_usage(response.usage)
+    answer = response.choices[0].message.content.strip().upper()
+    return "YES" in answer
+
+
+async def _grade_concurrent(
+    client: AsyncOpenAI,
+    query: str,
+    candidates: list[tuple[int, dict]],
+    max_concurrency: int,
+) -> set[int]:
+    """청크별 YES/NO 요청을 동시에 보내고 YES로 판별된 청크 인덱스 집합 반환."""
+    total_count = len(candidates)
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def _task(i: int, chunk: dict) -> tuple[int, bool]:
+        try:
+            async with semaphore:
+                ok = await _grade_one(client, query, chunk["chunk_text"])
+        except Exception as e:
+            # 평가 실패 시 안전하게 제외 (에러 발생한 청크는 포함하지 않음)
+            log(f"  [{i + 1}/{total_count}] ⚠ 평가 실패 (제외): {e}")
+            return i, False
+        mark = "✓ 관련 있음" if ok else "✗ 관련 없음 (제외)"
+        log(f"  [{i + 1}/{total_count}] {mark}: {chunk.get('chunk_id', '?')[:20]}...")
+        return i, ok
+
+    results = await asyncio.gather(*(_task(i, c) for i, c in candidates))
+    return {i for i, ok in results if ok}
+
+
+async def _grade_batch(client: AsyncOpenAI, query: str, candidates: list[tuple[int, dict]]) -> set[int]:
+    """모든 청크를 한 번의 요청으로 평가하고 YES로 판별된 청크 인덱스 집합 반환."""
+    chunk_list = "\n\n".join(
+        f"[{n}] {chunk['chunk_text'][:EVAL_TEXT_LIMIT]}"
+        for n, (_, chunk) in enumerate(candidates, 1)
+    )
+    try:
+        with span("grade_llm", mode="batch", chunks=len(candidates)) as sp:
+            response = await client.chat.completions.create(
+                model=EVAL_MODEL,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": BATCH_EVAL_PROMPT.format(query=query, chunk_list=chunk_list),
+                    }
+                ],
+                temperature=0,
+                response_format={"type": "json_object"},
+                max_tokens=20 + 5 * len(candidates),  # 번호 목록만 필요
+            )
+            sp.add_usage(response.usage)
+        payload = json.loads(response.choices[0].message.content)
+        numbers = payload.get("relevant", [])
+    except Exception as e:
+        # 평가 실패 시 안전하게 전부 제외 (generate의 상위 3개 fallback이 처리)
+        log(f"  ⚠ 일괄 평가 실패 (전체 제외): {e}")
+        return set()
+
+    if not isinstance(numbers, list):
+        numbers = [numbers]
+    selected = set()
+    for n in numbers:
+        # 숫자 문자열("3")은 번호로 받고, true/false·소수·범위 밖 번호·숫자가 아닌 값은 무시
+        if isinstance(n, bool) or (isinstance(n, float) and not n.is_integer()):
+            continue
+        try:
+            n = int(n)
+        except (TypeError, ValueError):
+            continue
+        if 1 <= n <= len(candidates):
+            selected.add(candidates[n - 1][0])
+    return selected
+
+
+def filter_by_similarity(
+    query_embedding: list[float],
+    chunks: list[dict],
+    min_score: float = SIM_MIN_SCORE,
+    max_drop: float = SIM_MAX_DROP,
+    gap: float = SIM_GAP,
+    max_per_job: int = SIM_MAX_PER_JOB,
+) -> list[dict]:
+    """
+    LLM 호출 없이 임베딩 유사도만으로 관련 청크를 고른다.
+    청크에는 vector_search(with_embedding=True)로 받은 "embedding"이 있어야 한다.
+
+    1. 코사인 유사도 계산 (NumPy 행렬 연산)
+    2. min_score 미만, 1위 대비 max_drop 초과 하락 청크 제외
+    3. 유사도 내림차순으로 인접 점수 간격이 gap보다 크게 벌어지는 지점 아래는 잘라냄
+    4. 같은 공고에서는 최대 max_per_job개만 유지
+    """
+    candidates = [c for c in chunks if c.get("chunk_text") and c.get("embedding") is not None]
+    if not candidates:
+        return []
+
+    q = np.asarray(query_embedding, dtype=np.float32)
+    mat = np.asarray([c["embedding"] for c in candidates], dtype=np.float32)
+    q_norm = np.linalg.norm(q) or 1.0
+    row_norms = np.linalg.norm(mat, axis=1)
+    row_norms[row_norms == 0] = 1.0
+    scores = (mat @ q) / (row_norms * q_norm)
+
+    order = np.argsort(-scores, kind="stable")
+    sorted_scores = scores[order]
+    keep = (sorted_scores >= min_score) & (sorted_scores >= sorted_scores[0] - max_drop)
+
+    # 점수 간격(gap) 감지: 처음으로 크게 벌어지는 지점 이후는 모두 제외
+    if len(sorted_scores) > 1:
+        gaps = sorted_scores[:-1] - sorted_scores[1:]
+        cut = np.nonzero(gaps > gap)[0]
+        if cut.size:
+            keep[cut[0] + 1:] = False
+
+    selected = []
+    per_job: dict[str, int] = {}
+    for idx, ok in zip(order, keep):
+        if not ok:
+            continue
+        chunk = candidates[idx]
+        job_id = chunk.get("job_post_id")
+        if per_job.get(job_id, 0) >= max_per_job:
+            continue
+        per_job[job_id] = per_job.get(job_id, 0) + 1
+        selected.append({**chunk, "score": float(scores[idx])})
+    return selected
+
+
+async def grade_chunks(
+    client: AsyncOpenAI,
+    query: str,
+    chunks: list[dict],
+    mode: str = DEFAULT_GRADE_MODE,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    query_embedding: list[float] | None = None,
+) -> list[dict]:
+    """
+    청크들 중 질문과 관련 있다고(YES) 판별된 청크만 원래 순서대로 반환.
+
+    Args:
+        client: AsyncOpenAI 클라이언트
+        query: 평가 기준이 되는 사용자 질문
+        chunks: 벡터 검색 결과 청크 리스트 (유사도 순)
+        mode: "batch" (한 번의 요청), "concurrent" (청크별 동시 요청),
+              "similarity" (LLM 없이 임베딩 유사도로 로컬 판별), "none" (평가 없이 그대로 반환)
+        max_concurrency: concurrent 모드의 최대 동시 호출 수
+        query_embedding: similarity 모드에서 사용할 질의 임베딩
+    """
+    if mode not in GRADE_MODES:
+        raise ValueError(f"지원하지 않는 평가 모드입니다: {mode} (가능: {', '.join(GRADE_MODES)})")
+
+    if mode == "none":
+        return list(chunks)
+
+    if mode == "similarity":
+        if query_embedding is None:
+            raise ValueError("similarity 모드에는 query_embedding이 필요합니다.")
+        return filter_by_similarity(query_embedding, chunks)
+
+    # 텍스트 없는 청크는 평가하지 않고 제외
+    candidates = [(i, c) for i, c in enumerate(chunks) if c.get("chunk_text")]
+    if not candidates:
+        return []
+
+    if mode == "batch":
+        selected = await _grade_batch(client, query, candidates)
+    else:
+        selected = await _grade_concurrent(client, query, candidates, max_concurrency)
+    return [c for i, c in enumerate(chunks) if i in selected]
@@ -3,42 +3,94 @@ AUGMENTED GENERATION - RAG
 
 PIPELINE_PLAN.md 7. AUGMENTED GENERATION 스펙 구현
 - 사용자 질의 → retriever로 벡터 검색(top_k) → gpt-4o-mini → 응답
-- Tool: get_company_info, get_jobs_title_link, get_job_descriptions
+- 전체 경로는 비동기(agenerate: AsyncOpenAI + psycopg AsyncConnection),
+  generate는 agenerate를 실행하는 동기 래퍼
+- 스트리밍: astream_generate(async iterator) / stream_generate(동기 제너레이터)가 답변 토큰을 도착하는 대로 내보냄
+- 추측 검색(speculative=True): 질의 재작성과 원본 질의 임베딩·검색을 동시에 실행해 재작성 왕복을 검색 경로에서 제거
+- 추적: 요청마다 monitoring.tracing.Tracer로 단계별 span(시간·토큰·API 호출 수) 기록, 콘솔 로그는 verbose일 때만
+- 컨텍스트: context.py가 청크를 공고별로 묶어 토큰 예산(context_budget) 안에서 구성
+- Tool: get_company_info, get_companies_info, get_jobs_title_link, get_job_descriptions, filter_jobs
+- 다양화(diversify=True): 후보를 top_k × DEFAULT_FETCH_FACTOR개 임베딩과 함께 가져와 retrieval/diversify.py의 MMR로 top_k개 선택
+  (같은 공고의 비슷한 청크가 top_k를 채우지 않도록, 추가 API 호출 없음)
+- 2단계 검색(two_stage=True): 공고 벡터(job_vectors)로 후보 공고를 고른 뒤 그 공고의 청크만 순위 매김 (retriever 참고)
+- 기술스택 빠른 경로(stack_fast_path=True): "React, TypeScript 공고"처럼 스택 나열 질의는 재작성·임베딩·평가 없이
+  jobs.stack 배열 겹침 쿼리로 공고를 찾고(retrieval/stack_search.py), 커버리지가 낮을 때만 벡터 검색
+- 이름 빠른 경로(name_fast_path=True): "카카오 백엔드 공고"처럼 회사명·공고 제목을 짚는 짧은 질의는 재작성·임베딩·평가 없이
+  pg_trgm 유사도 쿼리 1번으로 공고를 찾고(retrieval/name_search.py), 이름이 맞지 않을 때만 벡터 검색
+- 배치: generate_many / agenerate_many가 여러 질의의 임베딩·벡터 검색을 한 번씩으로 묶고 LLM 단계는 동시 실행 수 제한
+- 청크 평가: grading.py (batch 일괄 평가 / concurrent 동시 평가 / similarity 로컬 유사도 필터)
 """
 
+import asyncio
+import contextvars
+import hashlib
 import json
+import re
 import sys
+from contextlib import AsyncExitStack
 from pathlib import Path
+from types import SimpleNamespace
 
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 # uv run src/generation/ask.py 실행 시 src가 패키지로 안 잡히므로 path 추가
 _src_dir = Path(__file__).resolve().parent.parent
 if str(_src_dir) not in sys.path:
     sys.path.insert(0, str(_src_dir))
-from db.conn import get_conn
+from answer_cache import SemanticAnswerCache, afetch_chunk_versions
+from context import (
+    CONTEXT_POLICIES,
+    DEFAULT_CONTEXT_BUDGET,
+    DEFAULT_CONTEXT_POLICY,
+    build_context,
+)
+from db.conn import async_conn_scope, async_pool_scope
+from monitoring.metrics import count_cache
+from monitoring.tracing import Tracer, log, span
+from retrieval.cache import TTLCache, get_embedding_cache, normalize_query_text
+from retrieval.diversify import DEFAULT_FETCH_FACTOR, mmr_select
+from retrieval.name_search import aname_search, extract_name_terms
+from retrieval.stack_search import (
+    aload_stack_vocabulary,
+    astack_search,
+    clear_stack_vocabulary,
+    extract_query_stacks,
+)
 from retrieval.retriever import (
     DEFAULT_TOP_K,
-    embed_query,
-    vector_search,
+    EMBEDDING_MODEL,
+    aembed_queries,
+    aembed_query,
+    avector_search,
+    avector_search_many,
+)
+from grading import (
+    DEFAULT_GRADE_MODE,
+    DEFAULT_MAX_CONCURRENCY,
+    grade_chunks,
 )
 from tool import (
-    get_company_info,
-    get_job_descriptions,
-    get_jobs_title_link,
+    TOOL_FILTER_JOBS,
+    TOOL_GET_COMPANIES_INFO,
     TOOL_GET_COMPANY_INFO,
     TOOL_GET_JOB_DESCRIPTIONS,
     TOOL_GET_JOBS_TITLE_LINK,
 )
+from tool_runner import JobCache, ToolMemo, run_tool_calls
 
 LLM_MODEL = "gpt-4o-mini"
 TOP_K = DEFAULT_TOP_K
 
 
+# 시맨틱 답변 캐시 (프로세스 공용). 유사도 기준은 answer_cache.ANSWER_CACHE_THRESHOLD
+_answer_cache = SemanticAnswerCache()
+
 _TOOLS = [
     TOOL_GET_COMPANY_INFO,
+    TOOL_GET_COMPANIES_INFO,
     TOOL_GET_JOBS_TITLE_LINK,
     TOOL_GET_JOB_DESCRIPTIONS,
+    TOOL_FILTER_JOBS,
 ]
 
 _SYSTEM_PROMPT = (
@@ -47,119 +99,322 @@ _SYSTEM_PROMPT = (
     "직무·업무·역할·담당업무 관련 질문이면 get_job_descriptions 툴로 해당 공고들의 직무소개(job_description)를 가져와 참고하며 답하세요.\n"
     "추천 공고를 제목·링크로 정리해 보여줄 때는 get_jobs_title_link 툴을 사용하세요.\n"
     "특정 공고의 회사 정보(복지, 직원 수, 연봉, 매출액 등)가 필요하면 get_company_info 툴을 사용하세요.\n"
+    "여러 공고의 회사 정보를 비교할 때는 get_companies_info 툴 한 번으로 필요한 항목만 조회하세요.\n"
+    "직원 수·평균 연봉·매출액·영업이익·코딩테스트 여부·마감일 같은 조건 질문은 filter_jobs 툴로 조건에 맞는 공고를 한 번에 거르세요.\n"
     "필요하면 여러개의 tool을 사용할 수 있습니다."
     "답변은 한국어로 합니다."
 )
 
 
-def _rewrite_query_for_search(client: OpenAI, original_query: str) -> str:
+REWRITE_MODEL = "gpt-4o-mini"
+REWRITE_PROMPT = (
+    "사용자의 질문에서 JD(직무, 기술스택, 업무, 자격요건)와 관련된 핵심 키워드와 질문만 추출하여 간결하게 재작성하세요. 기술스택이 한국어로 적힌 경우, 기술스택 단어만 영어로 변환하세요.\n\n"
+    "제거할 내용:\n"
+    "- 인사말 (안녕하세요, 감사합니다 등)\n"
+    "- 개인 정보 (저는, 제가 등)\n"
+    "- 불필요한 수식어\n\n"
+    "유지할 내용:\n"
+    "- 기술스택, 직무, 업무 내용, 자격요건, 회사 정보 등 채용 공고와 관련된 핵심 키워드\n"
+    "- 질문의 의도 (예: 'Python 개발자 채용 공고', '코딩테스트 없는 회사')\n\n"
+    "원본 질문: {query}\n\n"
+    "재작성된 질문 (핵심만, 간결하게):"
+)
+# 프롬프트·모델이 바뀌면 이전 재작성 결과는 자동으로 무효 (키에 포함)
+_REWRITE_PROMPT_HASH = hashlib.sha256(f"{REWRITE_MODEL}\n{REWRITE_PROMPT}".encode("utf-8")).hexdigest()[:16]
+REWRITE_CACHE_SIZE = 512
+REWRITE_CACHE_TTL = 60 * 60  # 1시간
+
+# 원본 질의 → {"query": 재작성 결과, "embedding": 재작성 결과 임베딩(있으면), "model": 임베딩 모델}
+_rewrite_cache = TTLCache(maxsize=REWRITE_CACHE_SIZE, ttl=REWRITE_CACHE_TTL)
+
+# 추측 검색(speculative): 재작성 결과와 원본 질의의 단어 Jaccard 유사도가 이 값 이상이면
+# 원본 질의로 미리 검색한 결과를 그대로 사용 (재작성 결과로 다시 검색하지 않음)
+SPECULATIVE_REUSE_THRESHOLD = 0.6
+_WORD_RE = re.compile(r"\w+")
+
+# 요청 1건의 툴 호출 한도: 툴 라운드(LLM 재호출) 수, 실행하는 툴 호출 총수. 넘으면 tool_choice="none"으로 최종 답변 강제
+DEFAULT_MAX_TOOL_ROUNDS = 3
+DEFAULT_MAX_TOOL_CALLS = 8
+TOOL_LIMIT_RESULT = "툴 호출 한도를 넘어 실행하지 않았습니다. 지금까지의 정보로 답변하세요."
+
+# 후속 질문(세션): 이전 턴의 공고 정보를 직무소개까지 넣어 툴 호출 없이 답할 수 있게 함
+FOLLOWUP_CONTEXT_POLICY = "full"
+FOLLOWUP_CONTEXT_PROMPT = (
+    "아래는 이전 질문에서 검색한 채용 공고 데이터입니다 (검색 순위 순). "
+    "이전 대화와 이 데이터를 참고해 후속 질문에 답하세요."
+)
+
+# generate_many: 질의별 LLM 단계(재작성·평가·답변)의 최대 동시 실행 수, LATERAL 검색 쿼리 1번에 넣을 질의 수
+DEFAULT_BATCH_CONCURRENCY = 8
+SEARCH_BATCH_SIZE = 256
+
+
+def clear_caches() -> None:
+    """프로세스 내 캐시(질의 재작성, 시맨틱 답변, 질의 임베딩 메모리 캐시, 스택 어휘)를 비운다. 벤치마크·테스트용"""
+    _rewrite_cache.clear()
+    _answer_cache.clear()
+    get_embedding_cache(EMBEDDING_MODEL).memory.clear()
+    clear_stack_vocabulary()
+
+
+def _rewrite_cache_key(original_query: str) -> tuple[str, str]:
+    return (normalize_query_text(original_query), _REWRITE_PROMPT_HASH)
+
+
+async def _rewrite_query_for_search(client: AsyncOpenAI, original_query: str) -> str:
     """
     사용자 질의를 채용 공고 검색에 적합한 핵심 키워드/질문으로 재작성.
     인사말, 개인 정보 등 노이즈를 제거하고 채용 공고 내용과 관련된 핵심만 추출.
+    같은 질의를 최근에 재작성했다면 캐시된 결과를 그대로 사용 (모델 호출 없음).
     """
-    REWRITE_MODEL = "gpt-4o-mini"
-    REWRITE_PROMPT = (
-        "사용자의 질문에서 JD(직무, 기술스택, 업무, 자격요건)와 관련된 핵심 키워드와 질문만 추출하여 간결하게 재작성하세요. 기술스택이 한국어로 적힌 경우, 기술스택 단어만 영어로 변환하세요.\n\n"
-        "제거할 내용:\n"
-        "- 인사말 (안녕하세요, 감사합니다 등)\n"
-        "- 개인 정보 (저는, 제가 등)\n"
-        "- 불필요한 수식어\n\n"
-        "유지할 내용:\n"
-        "- 기술스택, 직무, 업무 내용, 자격요건, 회사 정보 등 채용 공고와 관련된 핵심 키워드\n"
-        "- 질문의 의도 (예: 'Python 개발자 채용 공고', '코딩테스트 없는 회사')\n\n"
-        "원본 질문: {query}\n\n"
-        "재작성된 질문 (핵심만, 간결하게):"
-    )
-    
+    key = _rewrite_cache_key(original_query)
+    cached = _rewrite_cache.get(key)
+    count_cache("rewrite", hits=int(cached is not None), misses=int(cached is None))
+    if cached is not None:
+        log(f"[질의 재작성] 캐시 사용: {cached['query']}")
+        return cached["query"]
+
     try:
-        response = client.chat.completions.create(
-            model=REWRITE_MODEL,
-            messages=[
-                {
-                    "role": "user",
-                    "content": REWRITE_PROMPT.format(query=original_query),
-                }
-            ],
-            temperature=0,
-            max_tokens=100,  # 간결하게 재작성
-        )
+        with span("rewrite", model=REWRITE_MODEL) as sp:
+            response = await client.chat.completions.create(
+                model=REWRITE_MODEL,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": REWRITE_PROMPT.format(query=original_query),
+                    }
+                ],
+                temperature=0,
+                max_tokens=100,  # 간결하게 재작성
+            )
+            sp.add_usage(response.usage)
         rewritten = response.choices[0].message.content.strip()
         
         # 재작성 결과가 너무 짧거나 비어있으면 원본 사용
         if len(rewritten) < 3:
-            print(f"[질의 재작성] 재작성 결과가 너무 짧아 원본 사용: {original_query}")
-            return original_query
-        
-        print(f"[질의 재작성]")
-        print(f"  원본: {original_query}")
-        print(f"  재작성: {rewritten}")
+            log(f"[질의 재작성] 재작성 결과가 너무 짧아 원본 사용: {original_query}")
+            rewritten = original_query
+        else:
+            log(f"[질의 재작성]")
+            log(f"  원본: {original_query}")
+            log(f"  재작성: {rewritten}")
+        _rewrite_cache.set(key, {"query": rewritten, "embedding": None, "model": None})
         return rewritten
     except Exception as e:
-        print(f"[질의 재작성 실패] 원본 사용: {e}")
+        # 실패 결과는 캐시하지 않음 (다음 요청에서 다시 시도)
+        log(f"[질의 재작성 실패] 원본 사용: {e}")
         return original_query
 
 
-def _evaluate_chunks(client: OpenAI, query: str, chunks: list[dict]) -> list[dict]:
+async def _rewrite_and_embed(
+    client: AsyncOpenAI,
+    original_query: str,
+    rewrite: bool = True,
+) -> tuple[str, list[float]]:
     """
-    벡터 검색으로 가져온 청크들 중 질문에 적합한 청크만 필터링.
-    각 청크의 내용이 질문과 관련이 있는지 LLM으로 평가.
-    관련 없다고 판별된 청크(NO)는 제외하고, 관련 있다고 판별된 청크(YES)만 반환합니다.
+    질의 재작성 + 재작성 결과 임베딩.
+    재작성 캐시에 임베딩까지 저장돼 있으면 임베딩 단계도 건너뛴다.
+    rewrite=False면 재작성 없이 원본 질의를 그대로 임베딩한다.
     """
-    if not chunks:
-        return []
+    if not rewrite:
+        return original_query, await aembed_query(client, original_query)
 
-    EVAL_MODEL = "gpt-4o-mini"  # 평가용 모델 (빠르고 저렴)
-    EVAL_PROMPT = (
-        "다음 청크 내용이 사용자 질문과 관련이 있는지 판단하세요.\n\n"
-        "관련이 있으면 'YES', 관련이 없으면 'NO'만 답변하세요.\n\n"
-        "사용자 질문: {query}\n\n"
-        "청크 내용:\n{chunk_text}\n\n"
-        "답변 (YES/NO만):"
-    )
+    search_query = await _rewrite_query_for_search(client, original_query)
+    key = _rewrite_cache_key(original_query)
+    cached = _rewrite_cache.get(key)
+    if cached and cached["embedding"] is not None and cached["model"] == EMBEDDING_MODEL:
+        return search_query, cached["embedding"]
 
-    relevant_chunks = []
-    total_count = len(chunks)
-    print(f"[청크 평가 시작] 총 {total_count}개 청크 평가 중...")
+    query_emb = await aembed_query(client, search_query)
+    _store_rewrite_embedding(original_query, search_query, query_emb)
+    return search_query, query_emb
 
-    for i, chunk in enumerate(chunks, 1):
-        chunk_text = chunk.get("chunk_text", "")
-        if not chunk_text:
-            continue  # 텍스트 없는 청크는 건너뜀
 
-        # 각 청크에 대해 간단한 평가 요청
-        eval_messages = [
-            {
-                "role": "user",
-                "content": EVAL_PROMPT.format(query=query, chunk_text=chunk_text[:500]),  # 토큰 절약을 위해 앞부분만
-            }
-        ]
+def _store_rewrite_embedding(original_query: str, search_query: str, query_emb: list[float]) -> None:
+    """재작성 캐시 항목(재작성 결과가 같을 때)에 재작성 결과 임베딩을 함께 저장"""
+    key = _rewrite_cache_key(original_query)
+    cached = _rewrite_cache.get(key)
+    if cached and cached["query"] == search_query:
+        _rewrite_cache.set(key, {**cached, "embedding": query_emb, "model": EMBEDDING_MODEL})
+
 
+def _word_jaccard(a: str, b: str) -> float:
+    """정규화한 두 질의의 단어 집합 Jaccard 유사도"""
+    wa = set(_WORD_RE.findall(normalize_query_text(a)))
+    wb = set(_WORD_RE.findall(normalize_query_text(b)))
+    if not wa or not wb:
+        return 0.0
+    return len(wa & wb) / len(wa | wb)
+
+
+def _merge_chunks(*chunk_lists: list[dict], top_k: int) -> list[dict]:
+    """여러 검색 결과를 chunk_id 기준으로 합치고(높은 점수 유지) 유사도 순 top_k개 반환"""
+    by_id: dict[str, dict] = {}
+    for chunks in chunk_lists:
+        for c in chunks:
+            prev = by_id.get(c["chunk_id"])
+            if prev is None or c["score"] > prev["score"]:
+                by_id[c["chunk_id"]] = c
+    return sorted(by_id.values(), key=lambda c: c["score"], reverse=True)[:top_k]
+
+
+async def _speculative_search(
+    client: AsyncOpenAI,
+    conn,
+    original_query: str,
+    top_k: int = TOP_K,
+    with_embedding: bool = False,
+    two_stage: bool = False,
+) -> tuple[str, list[float], list[dict]]:
+    """
+    질의 재작성 요청과 동시에 원본 질의로 임베딩·벡터 검색을 미리 실행.
+    - 재작성 결과가 원본과 가까우면(단어 Jaccard ≥ SPECULATIVE_REUSE_THRESHOLD) 미리 검색한 결과를 그대로 사용
+      → 재작성 왕복 시간이 검색 경로에서 빠짐
+    - 아니면 재작성 결과로도 검색해 두 후보 집합을 합침
+    재작성 캐시에 임베딩까지 있으면 추측할 필요가 없으므로 일반 경로로 검색한다.
+    """
+    cached = _rewrite_cache.get(_rewrite_cache_key(original_query))
+    if cached and cached["embedding"] is not None and cached["model"] == EMBEDDING_MODEL:
+        chunks = await avector_search(
+            conn, cached["embedding"], top_k=top_k, with_embedding=with_embedding, two_stage=two_stage
+        )
+        return cached["query"], cached["embedding"], chunks
+
+    with span("speculative_search") as sp:
+        rewrite_task = asyncio.create_task(_rewrite_query_for_search(client, original_query))
         try:
-            response = client.chat.completions.create(
-                model=EVAL_MODEL,
-                messages=eval_messages,
-                temperature=0,  # 일관성 위해 0
-                max_tokens=10,  # YES/NO만 필요
+            raw_emb = await aembed_query(client, original_query)
+            raw_chunks = await avector_search(
+                conn, raw_emb, top_k=top_k, with_embedding=with_embedding, two_stage=two_stage
             )
-            answer = response.choices[0].message.content.strip().upper()
+        except BaseException:
+            rewrite_task.cancel()
+            raise
+        search_query = await rewrite_task
 
-            if "YES" in answer:
-                # 관련 있다고 판별된 청크만 추가
-                relevant_chunks.append(chunk)
-                print(f"  [{i}/{total_count}] ✓ 관련 있음 ({len(relevant_chunks)}개): {chunk.get('chunk_id', '?')[:20]}...")
-            else:
-                # 관련 없다고 판별된 청크는 제외 (버림)
-                print(f"  [{i}/{total_count}] ✗ 관련 없음 (제외): {chunk.get('chunk_id', '?')[:20]}...")
-        except Exception as e:
-            # 평가 실패 시 안전하게 제외 (에러 발생한 청크는 포함하지 않음)
-            print(f"  [{i}/{total_count}] ⚠ 평가 실패 (제외): {e}")
+        similarity = _word_jaccard(original_query, search_query)
+        reused = search_query == original_query or similarity >= SPECULATIVE_REUSE_THRESHOLD
+        sp.set(jaccard=round(similarity, 3), reused=reused)
+        if reused:
+            log(f"[추측 검색] 재작성 결과가 원본과 가까워 원본 검색 결과 사용 (Jaccard {similarity:.2f})")
+            return search_query, raw_emb, raw_chunks
+
+        # 재작성 결과로 한 번 더 검색해 두 후보 집합을 합침 (질의 임베딩은 재작성 결과 기준)
+        # 재작성은 위에서 끝났으므로 임베딩만 하고 재작성 캐시에 저장 (재작성 캐시를 다시 조회하지 않음)
+        query_emb = await aembed_query(client, search_query)
+        _store_rewrite_embedding(original_query, search_query, query_emb)
+        rewritten_chunks = await avector_search(
+            conn, query_emb, top_k=top_k, with_embedding=with_embedding, two_stage=two_stage
+        )
+        chunks = _merge_chunks(raw_chunks, rewritten_chunks, top_k=top_k)
+        sp.set(merged=len(chunks))
+        log(f"[추측 검색] 원본·재작성 검색 결과 병합 (Jaccard {similarity:.2f}): {len(chunks)}개")
+        return search_query, query_emb, chunks
+
+
+async def _stack_fast_path(conn, query: str, top_k: int) -> tuple[list[str], list[dict]] | None:
+    """
+    기술스택 나열 질의면 (질의 스택, jobs.stack 겹침 검색 청크). 재작성·임베딩 호출 없음.
+    스택 질의가 아니거나 커버리지가 낮으면 None (일반 벡터 검색으로 진행)
+    """
+    stacks = extract_query_stacks(query, await aload_stack_vocabulary(conn))
+    if stacks is None:
+        return None
+    chunks = await astack_search(conn, stacks, top_k)
+    if chunks is None:
+        log(f"[스택 검색] 커버리지가 낮아 벡터 검색으로 진행: {', '.join(stacks)}")
+        return None
+    return stacks, chunks
+
+
+async def _name_fast_path(conn, query: str, top_k: int) -> tuple[list[str], list[dict]] | None:
+    """
+    회사명·공고 제목 질의면 (후보어, trigram 유사도 검색 청크). 재작성·임베딩 호출 없음.
+    짧은 질의가 아니거나 회사명·제목이 맞지 않으면 None (일반 벡터 검색으로 진행)
+    """
+    terms = extract_name_terms(query, await aload_stack_vocabulary(conn))
+    if terms is None:
+        return None
+    chunks = await aname_search(conn, terms, top_k)
+    if chunks is None:
+        log(f"[이름 검색] 맞는 회사명·제목이 없어 벡터 검색으로 진행: {' '.join(terms)}")
+        return None
+    return terms, chunks
+
+
+async def aretrieve(
+    query: str,
+    conn=None,
+    client: AsyncOpenAI | None = None,
+    top_k: int = TOP_K,
+    rewrite: bool = True,
+    with_embedding: bool = False,
+    speculative: bool = False,
+    diversify: bool = False,
+    two_stage: bool = False,
+) -> tuple[str, list[float], list[dict]]:
+    """
+    generate의 검색 단계만 실행 (재작성 → 임베딩 → 벡터 검색). 평가·답변 생성 없음.
+    speculative=True면 재작성과 원본 질의 검색을 동시에 실행 (_speculative_search).
+    diversify=True면 후보를 top_k × DEFAULT_FETCH_FACTOR개 가져와 MMR로 top_k개 선택.
+    two_stage=True면 공고 벡터로 후보 공고를 먼저 고르는 2단계 검색.
+
+    Returns:
+        (검색에 쓴 질의, 질의 임베딩, 유사도 순 청크 리스트)
+    """
+    client = client or AsyncOpenAI()
+    fetch_k = top_k * DEFAULT_FETCH_FACTOR if diversify else top_k
+    async with async_conn_scope(conn) as _conn:
+        if rewrite and speculative:
+            search_query, query_emb, chunks = await _speculative_search(
+                client, _conn, query, fetch_k, with_embedding or diversify, two_stage
+            )
+        else:
+            search_query, query_emb = await _rewrite_and_embed(client, query, rewrite)
+            chunks = await avector_search(
+                _conn, query_emb, top_k=fetch_k, with_embedding=with_embedding or diversify, two_stage=two_stage
+            )
+    if diversify:
+        with span("diversify", candidates=len(chunks), top_k=top_k):
+            chunks = mmr_select(query_emb, chunks, top_k)
+        if not with_embedding:
+            chunks = [{k: v for k, v in c.items() if k != "embedding"} for c in chunks]
+    return search_query, query_emb, chunks
+
+
+async def _evaluate_chunks(
+    client: AsyncOpenAI,
+    query: str,
+    chunks: list[dict],
+    mode: str = DEFAULT_GRADE_MODE,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    query_embedding: list[float] | None = None,
+) -> list[dict]:
+    """
+    벡터 검색으로 가져온 청크들 중 질문에 적합한 청크만 필터링.
+    각 청크의 내용이 질문과 관련이 있는지 평가 (grading.grade_chunks).
+    similarity 모드는 LLM 대신 query_embedding과 청크 임베딩의 유사도로 판별.
+    관련 없다고 판별된 청크(NO)는 제외하고, 관련 있다고 판별된 청크(YES)만 반환합니다.
+    """
+    if not chunks:
+        return []
+
+    total_count = len(chunks)
+    log(f"[청크 평가 시작] 총 {total_count}개 청크 평가 중... (모드: {mode})")
+
+    with span("grading", mode=mode, candidates=total_count) as sp:
+        relevant_chunks = await grade_chunks(
+            client, query, chunks,
+            mode=mode, max_concurrency=max_concurrency, query_embedding=query_embedding,
+        )
+        sp.set(relevant=len(relevant_chunks))
 
     relevant_count = len(relevant_chunks)
     excluded_count = total_count - relevant_count
-    print(f"\n[청크 평가 완료]")
-    print(f"  ✓ 관련 있음: {relevant_count}개")
-    print(f"  ✗ 관련 없음 (제외): {excluded_count}개")
-    print(f"  총 평가: {total_count}개 → {relevant_count}개 사용 ({excluded_count}개 제외)")
+    log(f"\n[청크 평가 완료]")
+    log(f"  ✓ 관련 있음: {relevant_count}개")
+    log(f"  ✗ 관련 없음 (제외): {excluded_count}개")
+    log(f"  총 평가: {total_count}개 → {relevant_count}개 사용 ({excluded_count}개 제외)")
     return relevant_chunks  # 관련 있는 청크만 반환
 
 
@@ -171,14 +426,14 @@ def _log_llm_context(messages: list, call_index: int = 0):
         return getattr(m, key, default)
 
     sep = "=" * 60
-    print(f"\n[LLM 컨텍스트 로그] (API 호출 #{call_index + 1})\n{sep}")
+    log(f"\n[LLM 컨텍스트 로그] (API 호출 #{call_index + 1})\n{sep}")
     for m in messages:
         role = _get(m, "role", "?")
         content = _get(m, "content") or "(없음)"
         if role == "system":
-            print(f"\n--- role: system ---\n{content}\n")
+            log(f"\n--- role: system ---\n{content}\n")
         elif role == "user":
-            print(f"\n--- role: user ---\n{content}\n")
+            log(f"\n--- role: user ---\n{content}\n")
         elif role == "assistant":
             part = content or ""
             tool_calls = _get(m, "tool_calls") or []
@@ -191,67 +446,299 @@ def _log_llm_context(messages: list, call_index: int = 0):
                     else:
                         tcs.append({"name": _get(fn, "name"), "arguments": _get(fn, "arguments", "")})
                 part += "\n[tool_calls] " + json.dumps(tcs, ensure_ascii=False)
-            print(f"\n--- role: assistant ---\n{part}\n")
+            log(f"\n--- role: assistant ---\n{part}\n")
         elif role == "tool":
             tid = _get(m, "tool_call_id") or ""
-            print(f"\n--- role: tool (id={str(tid)[:8]}...) ---\n{str(content)[:500]}{'...' if len(str(content)) > 500 else ''}\n")
-    print(sep + "\n")
+            log(f"\n--- role: tool (id={str(tid)[:8]}...) ---\n{str(content)[:500]}{'...' if len(str(content)) > 500 else ''}\n")
+    log(sep + "\n")
+
+
+async def _llm_round(client: AsyncOpenAI, messages: list, stream: bool, tool_choice: str = "auto"):
+    """
+    tool calling LLM 1회 호출 (tool_choice="none"이면 툴 없이 답변만).
+    ("delta", 텍스트) 이벤트를 내보낸 뒤 마지막에 ("message", 히스토리용 메시지, tool_calls, content)를 내보낸다.
+    stream=True면 토큰이 도착하는 대로 delta를 내보내고, 조각으로 오는 tool_calls는 index별로 이어 붙여 조립한다.
+    """
+    if not stream:
+        with span("llm_round", model=LLM_MODEL, stream=False, tool_choice=tool_choice) as sp:
+            response = await client.chat.completions.create(
+                model=LLM_MODEL,
+                messages=messages,
+                tools=_TOOLS,
+                tool_choice=tool_choice,
+            )
+            sp.add_usage(response.usage)
+        msg = response.choices[0].message
+        if msg.content:
+            yield ("delta", msg.content)
+        yield ("message", msg, msg.tool_calls or [], msg.content)
+        return
 
+    content_parts = []
+    calls: dict[int, dict] = {}  # tool_call index → {"id", "name", "arguments"}
+    with span("llm_round", model=LLM_MODEL, stream=True, tool_choice=tool_choice) as sp:
+        response = await client.chat.completions.create(
+            model=LLM_MODEL,
+            messages=messages,
+            tools=_TOOLS,
+            tool_choice=tool_choice,
+            stream=True,
+            stream_options={"include_usage": True},  # 마지막 청크에 토큰 사용량 포함
+        )
+        usage = None
+        async for chunk in response:
+            usage = getattr(chunk, "usage", None) or usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                if not content_parts:
+                    sp.set(first_token_ms=sp.elapsed_ms())
+                content_parts.append(delta.content)
+                yield ("delta", delta.content)
+            for tc in delta.tool_calls or []:
+                slot = calls.setdefault(tc.index, {"id": None, "name": "", "arguments": ""})
+                if tc.id:
+                    slot["id"] = tc.id
+                if tc.function is not None:
+                    slot["name"] += tc.function.name or ""
+                    slot["arguments"] += tc.function.arguments or ""
+        sp.add_usage(usage)
 
-def generate(query: str, conn=None, return_chunks: bool = False):
+    content = "".join(content_parts) or None
+    ordered = [calls[i] for i in sorted(calls)]
+    tool_calls = [
+        SimpleNamespace(id=c["id"], function=SimpleNamespace(name=c["name"], arguments=c["arguments"]))
+        for c in ordered
+    ]
+    message = {"role": "assistant", "content": content}
+    if ordered:
+        message["tool_calls"] = [
+            {
+                "id": c["id"],
+                "type": "function",
+                "function": {"name": c["name"], "arguments": c["arguments"]},
+            }
+            for c in ordered
+        ]
+    yield ("message", message, tool_calls, content)
+
+
+async def _answer_events(
+    client: AsyncOpenAI,
+    messages: list,
+    conn,
+    pool,
+    job_cache: JobCache,
+    stream: bool,
+    tools_used: list[str],
+    max_tool_rounds: int = DEFAULT_MAX_TOOL_ROUNDS,
+    max_tool_calls: int = DEFAULT_MAX_TOOL_CALLS,
+):
     """
-    사용자 질의 → RAG 응답 생성
+    tool calling loop. delta / tool_calls 이벤트를 내보내고 마지막에 {"type": "answer", "content": 최종 답변}.
+    messages에는 assistant·tool 메시지가 차례로 추가되고, 실행한 툴 이름은 tools_used에 쌓인다.
     """
-    client = OpenAI()
-    _conn = conn or get_conn()
-    close_conn = conn is None
+    memo = ToolMemo()  # 같은 툴 호출·이미 전달한 공고는 다시 실행하지 않음
+    api_call_index = 0
+    tool_rounds = tool_call_count = 0
+    while True:
+        # 툴 라운드·툴 호출 수 한도에 도달하면 툴 없이 최종 답변을 강제
+        force_answer = tool_rounds >= max_tool_rounds or tool_call_count >= max_tool_calls
+        if force_answer:
+            log(f"[툴 한도] 라운드 {tool_rounds}회, 호출 {tool_call_count}회 → 툴 없이 최종 답변 요청")
+        _log_llm_context(messages, api_call_index)
+        async for event in _llm_round(client, messages, stream, tool_choice="none" if force_answer else "auto"):
+            if event[0] == "delta":
+                yield {"type": "delta", "content": event[1]}
+            else:
+                _, message, tool_calls, content = event
+        if force_answer and tool_calls:
+            # tool_choice="none"인데도 호출이 오면 무시하고 받은 텍스트를 최종 답변으로
+            tool_calls = []
+            message = {"role": "assistant", "content": content}
+        messages.append(message)
+        api_call_index += 1
+
+        if not tool_calls:
+            yield {"type": "answer", "content": content}
+            return
+
+        # 남은 호출 한도를 넘는 호출은 실행하지 않음 (assistant의 모든 tool_call에는 tool 메시지가 필요)
+        allowed = max_tool_calls - tool_call_count
+        run_calls, skipped_calls = tool_calls[:allowed], tool_calls[allowed:]
+        tool_rounds += 1
+        tool_call_count += len(run_calls)
+
+        tool_names = [tc.function.name for tc in run_calls]
+        tools_used.extend(tool_names)
+        log(f"[툴 호출] {', '.join(tool_names)}" + (f" (한도 초과로 {len(skipped_calls)}개 생략)" if skipped_calls else ""))
+        yield {"type": "tool_calls", "names": tool_names}
+
+        # 같은 종류 툴 호출은 SQL 한 번으로 묶고, 종류가 다른 호출은 동시에 실행
+        messages.extend(await run_tool_calls(conn, run_calls, pool=pool, job_cache=job_cache, memo=memo))
+        messages.extend(
+            {"role": "tool", "tool_call_id": tc.id, "content": TOOL_LIMIT_RESULT} for tc in skipped_calls
+        )
+
+
+async def _pipeline_events(
+    query: str,
+    conn=None,
+    grade_mode: str = DEFAULT_GRADE_MODE,
+    grade_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    use_answer_cache: bool = True,
+    client: AsyncOpenAI | None = None,
+    pool=None,
+    stream: bool = False,
+    top_k: int = TOP_K,
+    rewrite: bool = True,
+    speculative: bool = False,
+    context_policy: str = DEFAULT_CONTEXT_POLICY,
+    context_budget: int = DEFAULT_CONTEXT_BUDGET,
+    max_tool_rounds: int = DEFAULT_MAX_TOOL_ROUNDS,
+    max_tool_calls: int = DEFAULT_MAX_TOOL_CALLS,
+    diversify: bool = False,
+    two_stage: bool = False,
+    stack_fast_path: bool = False,
+    name_fast_path: bool = False,
+    retrieved: tuple[str, list[float], list[dict]] | None = None,
+    job_cache: JobCache | None = None,
+    history: list[dict] | None = None,
+):
+    """
+    RAG 파이프라인 본체. 이벤트 dict를 차례로 내보낸다.
+    retrieved(검색 질의, 질의 임베딩, 청크)가 있으면 재작성·임베딩·검색을 건너뛴다 (generate_many의 배치 검색 결과).
+    diversify면 retrieved의 청크도 후보로 보고 MMR로 top_k개를 고른다.
+    job_cache를 주면 공고 행을 그 캐시에 채우고(대화 세션이 턴 사이에 재사용), history(이전 user/assistant 메시지)는
+    system 프롬프트와 이번 질문 사이에 넣는다.
+    - {"type": "delta", "content": 답변 조각}
+    - {"type": "tool_calls", "names": [툴 이름, ...]}
+    - {"type": "done", "answer": 최종 답변, "chunks": 사용 청크, "tools_used": 사용 툴}
+    """
+    if context_policy not in CONTEXT_POLICIES:
+        raise ValueError(
+            f"지원하지 않는 컨텍스트 정책입니다: {context_policy} (가능: {', '.join(CONTEXT_POLICIES)})"
+        )
+    client = client or AsyncOpenAI()
+    stack = AsyncExitStack()
+    _conn = await stack.enter_async_context(async_conn_scope(conn, pool))
     tools_used = []
     original_query = query  # 원본 질의는 최종 답변 생성 시 사용
 
     try:
         # 0. 질의 재작성 (임베딩된 데이터로 검색하기 적합한 핵심 키워드/질문으로 재작성)
-        search_query = _rewrite_query_for_search(client, original_query)
-        print(f"[질의 재작성] {search_query}")
-        
-        # 1. 재작성된 쿼리로 임베딩 (retriever)
-        query_emb = embed_query(client, search_query)
+        # 1. 재작성된 쿼리로 임베딩 (retriever) - 재작성 캐시 적중 시 모델 호출 없이 바로 검색
+        # similarity 평가·MMR 다양화는 청크 임베딩이 필요하므로 검색 시 함께 가져옴
+        # 다양화하면 후보를 top_k × DEFAULT_FETCH_FACTOR개 가져와 MMR로 top_k개를 고름
+        with_embedding = grade_mode == "similarity" or diversify
+        fetch_k = top_k * DEFAULT_FETCH_FACTOR if diversify else top_k
+        chunks = None
+        index_hit = None
+        if retrieved is None and stack_fast_path:
+            index_hit = await _stack_fast_path(_conn, original_query, top_k)
+        if retrieved is None and index_hit is None and name_fast_path:
+            index_hit = await _name_fast_path(_conn, original_query, top_k)
+        if retrieved is not None:
+            search_query, query_emb, chunks = retrieved
+        elif index_hit is not None:
+            # 기술스택 나열·회사명/제목 질의: 재작성·임베딩 없이 인덱스 검색 결과 사용 (답변 캐시·평가도 생략)
+            terms, chunks = index_hit
+            search_query, query_emb = ", ".join(terms), None
+        elif rewrite and speculative:
+            # 추측 검색: 재작성과 원본 질의 검색을 동시에 실행 (검색 결과까지 받음)
+            search_query, query_emb, chunks = await _speculative_search(
+                client, _conn, original_query, fetch_k, with_embedding, two_stage
+            )
+        else:
+            search_query, query_emb = await _rewrite_and_embed(client, original_query, rewrite)
+        log(f"[질의 재작성] {search_query}")
+
+        # 1.5. 시맨틱 답변 캐시: 비슷한 질문에 이미 답했고 근거 청크가 그대로면 바로 반환
+        # (대화 기록이 있으면 조회하지 않음: 캐시된 답변은 이전 대화 없이 만든 것)
+        # 답변에 영향을 주는 설정이 같은 항목끼리만 비교
+        cache_settings = {
+            "grade_mode": grade_mode,
+            "top_k": top_k,
+            "context_policy": context_policy,
+            "diversify": diversify,
+            "two_stage": two_stage,
+        }
+        if use_answer_cache and query_emb is not None and not history:
+            with span("answer_cache") as sp:
+                cached = await _answer_cache.alookup(query_emb, conn=_conn, settings=cache_settings)
+                sp.set(hit=cached is not None)
+            if cached is not None:
+                log(f"[답변 캐시] 적중 (유사도 {cached['similarity']:.3f}): {cached['query']}")
+                yield {"type": "delta", "content": cached["answer"]}
+                yield {
+                    "type": "done",
+                    "answer": cached["answer"],
+                    "chunks": cached["chunks"],
+                    "tools_used": cached["tools_used"],
+                }
+                return
 
-        # 2. 벡터 검색 top_k (retriever) - 재작성된 쿼리 사용
-        chunks = vector_search(_conn, query_emb, top_k=TOP_K)
+        # 2. 벡터 검색 top_k (retriever) - 재작성된 쿼리 사용 (추측 검색이면 이미 완료)
+        if chunks is None:
+            chunks = await avector_search(
+                _conn, query_emb, top_k=fetch_k, with_embedding=with_embedding, two_stage=two_stage
+            )
+        if diversify and index_hit is None:
+            with span("diversify", candidates=len(chunks), top_k=top_k) as sp:
+                chunks = mmr_select(query_emb, chunks, top_k)
+                if grade_mode != "similarity":  # 임베딩은 평가에 안 쓰이면 여기서 버림 (답변 캐시·응답 크기)
+                    chunks = [{k: v for k, v in c.items() if k != "embedding"} for c in chunks]
+                sp.set(selected=len(chunks), jobs=len({str(c["job_post_id"]) for c in chunks}))
+            log(f"[다양화] MMR로 후보 중 {len(chunks)}개 선택")
         for c in chunks:
-            print(f"  [공고ID: {c['job_post_id']}] {c['post_title']}\n")
-            print(f"  {c['chunk_text']}\n")
-            print(f"  유사도: {c['score']:.3f}\n")
+            log(f"  [공고ID: {c['job_post_id']}] {c['post_title']}\n")
+            log(f"  {c['chunk_text']}\n")
+            log(f"  유사도: {c['score']:.3f}\n")
 
         # 2.5. 청크 평가 및 필터링 (질문에 적합한 청크만 선택) - 원본 쿼리로 평가
+        # 평가와 동시에 검색된 공고 행을 한 번에 미리 가져와 요청 단위 캐시에 채움
+        # (툴 호출과 title_link/full 컨텍스트 정책은 이 캐시에서 DB 없이 응답)
         original_chunks = chunks.copy()  # 원본 청크 백업 (fallback용)
-        relevant_chunks = _evaluate_chunks(client, original_query, chunks)
+        if job_cache is None:
+            job_cache = JobCache(_conn, pool)
+        if index_hit is not None:
+            # 스택 겹침·이름 유사도는 공고 데이터와 직접 맞춘 결과이므로 평가 생략
+            await job_cache.ensure(c["job_post_id"] for c in chunks)
+            relevant_chunks = chunks
+        else:
+            relevant_chunks, _ = await asyncio.gather(
+                _evaluate_chunks(
+                    client, original_query, chunks,
+                    mode=grade_mode, max_concurrency=grade_concurrency, query_embedding=query_emb,
+                ),
+                job_cache.ensure(c["job_post_id"] for c in chunks),
+            )
         
         # 모든 청크가 필터링된 경우 fallback: 원본 청크 중 유사도 상위 3개 사용
         if not relevant_chunks and original_chunks:
-            print("[경고] 모든 청크가 관련 없다고 판별되었습니다.")
-            print("[Fallback] 유사도 상위 3개 청크를 사용합니다.")
+            log("[경고] 모든 청크가 관련 없다고 판별되었습니다.")
+            log("[Fallback] 유사도 상위 3개 청크를 사용합니다.")
             chunks = original_chunks[:3]  # 유사도가 높은 상위 3개 사용
         else:
             chunks = relevant_chunks  # 필터링된 청크 사용
         
         if not chunks:
-            print("[경고] 사용 가능한 청크가 없습니다. 빈 컨텍스트로 답변을 생성합니다.")
+            log("[경고] 사용 가능한 청크가 없습니다. 빈 컨텍스트로 답변을 생성합니다.")
         
-        print(f"[최종 사용 청크] {len(chunks)}개 청크가 답변 생성에 사용됩니다.\n")
+        log(f"[최종 사용 청크] {len(chunks)}개 청크가 답변 생성에 사용됩니다.\n")
 
-        # 3. 컨텍스트 구성
-        context_parts = []
-        for c in chunks:
-            context_parts.append(
-                f"[공고ID: {c['job_post_id']}] {c['post_title']}\n"
-                f"{c['chunk_text']}\n"
-            )
-        context = "\n\n---\n\n".join(context_parts)
+        # 3. 컨텍스트 구성 (공고별로 묶고 context_policy에 따라 링크·직무소개 포함, 토큰 예산 안에서)
+        with span("context", policy=context_policy, budget=context_budget) as sp:
+            context, context_stats = build_context(chunks, job_cache, context_policy, context_budget)
+            sp.set(**context_stats)
+        if context_stats["dropped_chunks"]:
+            log(f"[컨텍스트] 토큰 예산({context_budget}) 초과로 청크 {context_stats['dropped_chunks']}개 제외")
 
         # 4. LLM 호출 (tool calling loop)
         messages = [
             {"role": "system", "content": _SYSTEM_PROMPT},
+            *(history or []),
             {
                 "role": "user",
                 "content": (
@@ -261,74 +748,410 @@ def generate(query: str, conn=None, return_chunks: bool = False):
             },
         ]
 
-        api_call_index = 0
-        while True:
-            _log_llm_context(messages, api_call_index)
-            response = client.chat.completions.create(
-                model=LLM_MODEL,
-                messages=messages,
-                tools=_TOOLS,
-                tool_choice="auto",
-            )
-            msg = response.choices[0].message
-            messages.append(msg)
-            api_call_index += 1
-
-            if not msg.tool_calls:
-                if return_chunks:
-                    return msg.content, chunks, tools_used
-                return msg.content
-
-            tool_names = [tc.function.name for tc in msg.tool_calls]
-            tools_used.extend(tool_names)
-            print(f"[툴 호출] {', '.join(tool_names)}")
-
-            for tool_call in msg.tool_calls:
-                args = json.loads(tool_call.function.arguments)
-                if tool_call.function.name == "get_company_info":
-                    company_info = get_company_info(_conn, args["job_post_id"])
-                    if company_info:
-                        # 회사 정보를 읽기 쉬운 형식으로 변환
-                        company = company_info.get("company", {})
-                        result_parts = [
-                            f"공고 제목: {company_info.get('post_title', '')}",
-                            f"회사명: {company.get('company_name', '정보 없음')}",
-                            f"회사 소개 링크: {company.get('company_url', '정보 없음')}",
-                            f"직원 수: {company.get('전체 직원수', '정보 없음')}",
-                            f"평균 연봉: {company.get('평균 연봉', '정보 없음')}",
-                            f"매출액: {company.get('매출액', '정보 없음')}",
-                            f"영업이익: {company.get('영업이익', '정보 없음')}",
-                        ]
-                        if company.get("복지 및 혜택"):
-                            welfare = company["복지 및 혜택"]
-                            # 너무 길면 앞부분만 (500자 제한)
-                            if len(welfare) > 500:
-                                welfare = welfare[:500] + "..."
-                            result_parts.append(f"복지 및 혜택:\n{welfare}")
-                        if company.get("company_tags"):
-                            tags = ", ".join(company["company_tags"])
-                            result_parts.append(f"회사 태그: {tags}")
-                        result = "\n".join(result_parts)
-                    else:
-                        result = "해당 공고를 찾을 수 없습니다."
-                elif tool_call.function.name == "get_jobs_title_link":
-                    items = get_jobs_title_link(_conn, args.get("job_post_ids", []))
-                    result = json.dumps(items, ensure_ascii=False, default=str)
-                elif tool_call.function.name == "get_job_descriptions":
-                    n = args.get("n", 5)
-                    items = get_job_descriptions(
-                        _conn, args.get("job_post_ids", []), n=min(max(1, n), 10)
+        async for event in _answer_events(
+            client, messages, _conn, pool, job_cache, stream, tools_used, max_tool_rounds, max_tool_calls
+        ):
+            if event["type"] != "answer":
+                yield event
+                continue
+            content = event["content"]
+            # 근거 청크가 있는 답변만 캐시 (청크 버전으로 무효화 가능해야 함). 이전 대화에 기댄 답변은 캐시하지 않음
+            if use_answer_cache and query_emb is not None and chunks and content and not history:
+                versions = await afetch_chunk_versions(_conn, [c["chunk_id"] for c in chunks])
+                _answer_cache.store(
+                    query_emb, content, chunks, tools_used, versions, query=original_query, settings=cache_settings
+                )
+            yield {"type": "done", "answer": content, "chunks": chunks, "tools_used": tools_used}
+
+    finally:
+        await stack.aclose()
+
+
+async def _followup_events(
+    query: str,
+    chunks: list[dict],
+    job_cache: JobCache,
+    history: list[dict],
+    conn=None,
+    client: AsyncOpenAI | None = None,
+    pool=None,
+    stream: bool = False,
+    context_budget: int = DEFAULT_CONTEXT_BUDGET,
+    max_tool_rounds: int = DEFAULT_MAX_TOOL_ROUNDS,
+    max_tool_calls: int = DEFAULT_MAX_TOOL_CALLS,
+):
+    """
+    후속 질문 처리: 재작성·임베딩·검색·평가 없이 이전 턴의 청크·공고 행(job_cache)과 대화 기록만으로 답한다.
+    컨텍스트는 FOLLOWUP_CONTEXT_POLICY로 구성(직무소개까지 포함)하므로 대부분 LLM 호출 1번으로 끝나고,
+    툴 호출이 필요해도 공고 행은 job_cache에서 응답한다. 이벤트 형식은 _pipeline_events와 같다.
+    """
+    client = client or AsyncOpenAI()
+    await job_cache.ensure(c["job_post_id"] for c in chunks)  # 답변 캐시 적중 턴이면 공고 행이 아직 없음
+    with span("context", policy=FOLLOWUP_CONTEXT_POLICY, budget=context_budget) as sp:
+        context, context_stats = build_context(chunks, job_cache, FOLLOWUP_CONTEXT_POLICY, context_budget)
+        sp.set(**context_stats)
+    messages = [
+        {"role": "system", "content": _SYSTEM_PROMPT},
+        {"role": "system", "content": f"{FOLLOWUP_CONTEXT_PROMPT}\n\n{context}"},
+        *history,
+        {"role": "user", "content": query},
+    ]
+    tools_used: list[str] = []
+    async for event in _answer_events(
+        client, messages, conn, pool, job_cache, stream, tools_used, max_tool_rounds, max_tool_calls
+    ):
+        if event["type"] == "answer":
+            yield {"type": "done", "answer": event["content"], "chunks": chunks, "tools_used": tools_used}
+        else:
+            yield event
+
+
+async def _generate_events(query: str, verbose: bool = False, followup: bool = False, **kwargs):
+    """
+    요청 1건의 Tracer를 켜고 파이프라인(followup=True면 _followup_events)을 실행한다.
+    done 이벤트에는 단계별 span 목록("trace")이 함께 담기고, RAG_TRACE_PATH가 있으면 JSON lines로 기록된다.
+    """
+    tracer = Tracer(verbose=verbose)
+    done = None
+    events = _followup_events if followup else _pipeline_events
+    with tracer.activate():
+        with span("generate", stream=kwargs.get("stream", False), followup=followup) as root:
+            async for event in events(query, **kwargs):
+                if event["type"] == "done":
+                    done = event
+                    continue
+                yield event
+            root.set(tools_used=len(done["tools_used"]), chunks=len(done["chunks"]))
+    tracer.export_jsonl()
+    yield {**done, "trace": tracer.spans}
+
+
+async def agenerate(
+    query: str,
+    conn=None,
+    return_chunks: bool = False,
+    grade_mode: str = DEFAULT_GRADE_MODE,
+    grade_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    use_answer_cache: bool = True,
+    client: AsyncOpenAI | None = None,
+    pool=None,
+    verbose: bool = False,
+    return_trace: bool = False,
+    top_k: int = TOP_K,
+    rewrite: bool = True,
+    speculative: bool = False,
+    context_policy: str = DEFAULT_CONTEXT_POLICY,
+    context_budget: int = DEFAULT_CONTEXT_BUDGET,
+    max_tool_rounds: int = DEFAULT_MAX_TOOL_ROUNDS,
+    max_tool_calls: int = DEFAULT_MAX_TOOL_CALLS,
+    diversify: bool = False,
+    two_stage: bool = False,
+    stack_fast_path: bool = False,
+    name_fast_path: bool = False,
+):
+    """
+    사용자 질의 → RAG 응답 생성 (비동기)
+
+    Args:
+        conn: psycopg AsyncConnection (없으면 pool에서 빌리거나 새로 연결하고 끝나면 닫음)
+        grade_mode: 청크 평가 방식 ("batch": 한 번의 요청, "concurrent": 청크별 동시 요청,
+                    "similarity": LLM 호출 없이 임베딩 유사도로 로컬 필터링, "none": 평가 생략)
+        grade_concurrency: concurrent 모드의 최대 동시 호출 수
+        use_answer_cache: True면 비슷한 질문(질의 임베딩 유사도 기준)의 이전 답변을 재사용
+        client: 공유할 AsyncOpenAI 클라이언트 (없으면 새로 생성)
+        pool: psycopg_pool.AsyncConnectionPool (있으면 툴 호출 그룹마다 별도 연결로 병렬 실행)
+        verbose: True면 단계별 로그와 LLM 컨텍스트 전체를 콘솔에 출력
+        return_trace: True면 반환값 마지막에 단계별 span 목록(list[dict])을 덧붙임
+        top_k: 벡터 검색으로 가져올 청크 수
+        rewrite: False면 질의 재작성 없이 원본 질의로 검색
+        speculative: True면 재작성 요청과 동시에 원본 질의로 미리 검색 (재작성이 원본과 가까우면 그 결과 재사용)
+        context_policy: 초기 컨텍스트에 넣을 공고 정보 ("chunks": 청크만, "title_link": + 제목·링크,
+                        "full": + 직무소개). 검색된 공고 행은 정책과 관계없이 미리 가져와 툴 호출에 재사용
+        context_budget: 컨텍스트(청크 + 공고 정보)의 토큰 예산 (context.estimate_tokens 기준 로컬 추정).
+                        넘치는 청크는 유사도가 낮은 것부터 제외
+        max_tool_rounds: 툴 호출 라운드(LLM 재호출) 최대 수. 넘으면 tool_choice="none"으로 최종 답변 강제
+        max_tool_calls: 요청 1건에서 실행하는 툴 호출 최대 수 (넘는 호출은 실행하지 않고 안내 결과로 응답)
+        diversify: True면 후보를 top_k × DEFAULT_FETCH_FACTOR개 가져와 MMR로 top_k개 선택
+                   (같은 공고 최대 diversify.DEFAULT_MAX_PER_JOB개, 추가 API 호출 없음)
+        two_stage: True면 2단계 검색 (job_vectors로 후보 공고 top_k × JOB_CANDIDATE_FACTOR개 → 그 공고의 청크만 순위)
+        stack_fast_path: True면 기술스택 나열 질의를 재작성·임베딩·평가 없이 jobs.stack 겹침 검색으로 처리
+                         (커버리지가 낮으면 일반 경로)
+        name_fast_path: True면 회사명·공고 제목을 짚는 짧은 질의를 재작성·임베딩·평가 없이 pg_trgm 유사도 검색으로 처리
+                        (회사명·제목이 맞지 않으면 일반 경로)
+
+    Returns:
+        answer / (answer, chunks, tools_used) — return_trace면 각각 뒤에 trace가 붙음
+    """
+    result = None
+    async for event in _generate_events(
+        query,
+        verbose=verbose,
+        conn=conn,
+        grade_mode=grade_mode,
+        grade_concurrency=grade_concurrency,
+        use_answer_cache=use_answer_cache,
+        client=client,
+        pool=pool,
+        top_k=top_k,
+        rewrite=rewrite,
+        speculative=speculative,
+        context_policy=context_policy,
+        context_budget=context_budget,
+        max_tool_rounds=max_tool_rounds,
+        max_tool_calls=max_tool_calls,
+        diversify=diversify,
+        two_stage=two_stage,
+        stack_fast_path=stack_fast_path,
+        name_fast_path=name_fast_path,
+    ):
+        if event["type"] == "done":
+            result = event
+    out = (result["answer"], result["chunks"], result["tools_used"]) if return_chunks else (result["answer"],)
+    if return_trace:
+        out += (result["trace"],)
+    return out if len(out) > 1 else out[0]
+
+
+async def astream_generate(
+    query: str,
+    conn=None,
+    grade_mode: str = DEFAULT_GRADE_MODE,
+    grade_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    use_answer_cache: bool = True,
+    client: AsyncOpenAI | None = None,
+    pool=None,
+    verbose: bool = False,
+    top_k: int = TOP_K,
+    rewrite: bool = True,
+    speculative: bool = False,
+    context_policy: str = DEFAULT_CONTEXT_POLICY,
+    context_budget: int = DEFAULT_CONTEXT_BUDGET,
+    max_tool_rounds: int = DEFAULT_MAX_TOOL_ROUNDS,
+    max_tool_calls: int = DEFAULT_MAX_TOOL_CALLS,
+    diversify: bool = False,
+    two_stage: bool = False,
+    stack_fast_path: bool = False,
+    name_fast_path: bool = False,
+):
+    """
+    agenerate의 스트리밍 버전 (async iterator).
+    답변 토큰이 도착하는 대로 {"type": "delta"} 이벤트를, 툴 호출 시 {"type": "tool_calls"}를,
+    마지막에 {"type": "done", "answer", "chunks", "tools_used", "trace"}를 내보낸다.
+    """
+    async for event in _generate_events(
+        query,
+        verbose=verbose,
+        conn=conn,
+        grade_mode=grade_mode,
+        grade_concurrency=grade_concurrency,
+        use_answer_cache=use_answer_cache,
+        client=client,
+        pool=pool,
+        stream=True,
+        top_k=top_k,
+        rewrite=rewrite,
+        speculative=speculative,
+        context_policy=context_policy,
+        context_budget=context_budget,
+        max_tool_rounds=max_tool_rounds,
+        max_tool_calls=max_tool_calls,
+        diversify=diversify,
+        two_stage=two_stage,
+        stack_fast_path=stack_fast_path,
+        name_fast_path=name_fast_path,
+    ):
+        yield event
+
+
+async def _retrieve_many(
+    client: AsyncOpenAI,
+    conn,
+    queries: list[str],
+    top_k: int = TOP_K,
+    rewrite: bool = True,
+    with_embedding: bool = False,
+    concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    two_stage: bool = False,
+) -> dict[str, tuple[str, list[float], list[dict]]]:
+    """
+    generate_many의 검색 단계 (중복 질의는 한 번만):
+    재작성(최대 concurrency개 동시) → 임베딩 요청 1번(multi-input) → 벡터 검색 쿼리 1번(SEARCH_BATCH_SIZE개씩)
+
+    Returns:
+        {원본 질의: (검색 질의, 질의 임베딩, 청크 리스트)}
+    """
+    unique = list(dict.fromkeys(queries))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _rewrite(q: str) -> str:
+        async with semaphore:
+            return await _rewrite_query_for_search(client, q)
+
+    if rewrite:
+        rewritten = dict(zip(unique, await asyncio.gather(*(_rewrite(q) for q in unique))))
+    else:
+        rewritten = {q: q for q in unique}
+
+    # 재작성 캐시에 임베딩까지 있으면 임베딩 요청에서 제외
+    embeddings: dict[str, list[float]] = {}
+    for q in unique:
+        cached = _rewrite_cache.get(_rewrite_cache_key(q)) if rewrite else None
+        if cached and cached["embedding"] is not None and cached["model"] == EMBEDDING_MODEL:
+            embeddings[q] = cached["embedding"]
+    to_embed = [q for q in unique if q not in embeddings]
+    for q, emb in zip(to_embed, await aembed_queries(client, [rewritten[q] for q in to_embed])):
+        embeddings[q] = emb
+        if rewrite:
+            key = _rewrite_cache_key(q)
+            cached = _rewrite_cache.get(key)
+            if cached and cached["query"] == rewritten[q]:
+                _rewrite_cache.set(key, {**cached, "embedding": emb, "model": EMBEDDING_MODEL})
+
+    results: dict[str, tuple[str, list[float], list[dict]]] = {}
+    for start in range(0, len(unique), SEARCH_BATCH_SIZE):
+        batch = unique[start:start + SEARCH_BATCH_SIZE]
+        searched = await avector_search_many(
+            conn, [embeddings[q] for q in batch], top_k=top_k, with_embedding=with_embedding, two_stage=two_stage
+        )
+        for q, chunks in zip(batch, searched):
+            results[q] = (rewritten[q], embeddings[q], chunks)
+    return results
+
+
+async def agenerate_many(
+    queries: list[str],
+    conn=None,
+    pool=None,
+    client: AsyncOpenAI | None = None,
+    concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    grade_mode: str = DEFAULT_GRADE_MODE,
+    grade_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    use_answer_cache: bool = True,
+    verbose: bool = False,
+    top_k: int = TOP_K,
+    rewrite: bool = True,
+    context_policy: str = DEFAULT_CONTEXT_POLICY,
+    context_budget: int = DEFAULT_CONTEXT_BUDGET,
+    max_tool_rounds: int = DEFAULT_MAX_TOOL_ROUNDS,
+    max_tool_calls: int = DEFAULT_MAX_TOOL_CALLS,
+    diversify: bool = False,
+    two_stage: bool = False,
+) -> list[dict]:
+    """
+    여러 질의 → RAG 응답 일괄 생성 (야간 추천 배치 등).
+    - 검색 단계는 배치로: 재작성 결과를 임베딩 요청 1번으로, 벡터 검색을 LATERAL 조인 쿼리 1번으로 처리
+    - 이후 질의별 평가·답변 생성(LLM 단계)은 최대 concurrency개씩 동시에 실행
+    - conn/pool을 주지 않으면 최대 concurrency개 연결의 풀을 열었다가 끝나면 닫음
+
+    Args:
+        concurrency: 질의별 LLM 단계의 최대 동시 실행 수
+        나머지 인자는 agenerate와 같음 (speculative, stack_fast_path, name_fast_path는 배치 검색과 겹치므로 지원하지 않음)
+
+    Returns:
+        입력 순서대로 {"query", "answer", "chunks", "tools_used", "trace"} 리스트.
+        질의 하나가 실패해도 나머지는 계속 처리하고, 실패한 항목은 {"query", "error"}
+    """
+    if context_policy not in CONTEXT_POLICIES:
+        raise ValueError(
+            f"지원하지 않는 컨텍스트 정책입니다: {context_policy} (가능: {', '.join(CONTEXT_POLICIES)})"
+        )
+    if not queries:
+        return []
+    client = client or AsyncOpenAI()
+    async with AsyncExitStack() as stack:
+        if conn is None and pool is None:
+            pool = await stack.enter_async_context(async_pool_scope(max_size=concurrency))
+
+        # 1. 배치 검색 (단계별 span은 배치 전체에 대한 Tracer 1개에 기록)
+        tracer = Tracer(verbose=verbose)
+        with tracer.activate():
+            with span("generate_many", queries=len(queries), concurrency=concurrency):
+                async with async_conn_scope(conn, pool) as _conn:
+                    retrieved = await _retrieve_many(
+                        client, _conn, queries,
+                        top_k * DEFAULT_FETCH_FACTOR if diversify else top_k, rewrite,
+                        with_embedding=grade_mode == "similarity" or diversify, concurrency=concurrency,
+                        two_stage=two_stage,
                     )
-                    result = json.dumps(items, ensure_ascii=False, default=str)
-                else:
-                    result = "알 수 없는 툴입니다."
-                messages.append({
-                    "role": "tool",
-                    "tool_call_id": tool_call.id,
-                    "content": result,
-                })
+        tracer.export_jsonl()
+
+        # 2. 질의별 평가·답변 생성 (동시 실행 수 제한)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _one(query: str) -> dict:
+            async with semaphore:
+                try:
+                    result = None
+                    async for event in _generate_events(
+                        query,
+                        verbose=verbose,
+                        conn=conn,
+                        grade_mode=grade_mode,
+                        grade_concurrency=grade_concurrency,
+                        use_answer_cache=use_answer_cache,
+                        client=client,
+                        pool=pool,
+                        top_k=top_k,
+                        rewrite=rewrite,
+                        context_policy=context_policy,
+                        context_budget=context_budget,
+                        max_tool_rounds=max_tool_rounds,
+                        max_tool_calls=max_tool_calls,
+                        diversify=diversify,
+                        two_stage=two_stage,
+                        retrieved=retrieved[query],
+                    ):
+                        if event["type"] == "done":
+                            result = event
+                except Exception as e:
+                    return {"query": query, "error": f"{type(e).__name__}: {e}"}
+                return {
+                    "query": query,
+                    "answer": result["answer"],
+                    "chunks": result["chunks"],
+                    "tools_used": result["tools_used"],
+                    "trace": result["trace"],
+                }
+
+        return list(await asyncio.gather(*(_one(q) for q in queries)))
+
+
+def generate(query: str, **kwargs):
+    """
+    사용자 질의 → RAG 응답 생성 (agenerate를 실행하는 동기 래퍼)
+    인자·반환값은 agenerate와 같으며, conn/pool/client를 주지 않으면 호출마다 새로 만든다.
+    """
+    return asyncio.run(agenerate(query, **kwargs))
+
+
+def generate_many(queries: list[str], **kwargs) -> list[dict]:
+    """agenerate_many를 실행하는 동기 래퍼 (인자·반환값은 agenerate_many와 같음)"""
+    return asyncio.run(agenerate_many(queries, **kwargs))
 
+
+def stream_generate(query: str, **kwargs):
+    """
+    astream_generate의 동기 제너레이터 버전 (호출마다 전용 이벤트 루프에서 실행, iterate_in_loop)
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        yield from iterate_in_loop(loop, astream_generate(query, **kwargs))
     finally:
-        if close_conn:
-            _conn.close()
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
 
+def iterate_in_loop(loop: asyncio.AbstractEventLoop, events):
+    """
+    async iterator를 주어진 이벤트 루프에서 한 단계씩 실행하는 동기 제너레이터.
+    모든 단계를 같은 Context에서 실행해 요청 단위 Tracer(contextvar)가 단계 사이에 유지되도록 한다.
+    """
+    ctx = contextvars.copy_context()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(loop.create_task(events.__anext__(), context=ctx))
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(loop.create_task(events.aclose(), context=ctx))
@@ -0,0 +1,175 @@
+"""
+대화 세션 (후속 질문 처리)
+
+ChatSession은 턴 사이에 다음을 유지한다.
+- 마지막 검색의 후보 청크 (유사도 순)
+- 지금까지 가져온 공고·회사 행 (tool_runner.JobCache, 세션 전체에서 공유)
+- 대화 기록 (최근 max_history_turns턴의 user/assistant 메시지)
+- AsyncOpenAI 클라이언트와 DB 연결 (턴마다 새로 만들지 않음)
+
+매 턴 classify_followup(로컬 규칙, 모델 호출 없음)으로 경로를 고른다.
+- "followup": 재작성·임베딩·검색·평가 없이 세션의 청크·공고 행·대화 기록으로 답변 (대부분 LLM 호출 1번)
+- "new"     : 전체 파이프라인으로 새로 검색 (대화 기록은 답변 생성에 함께 넣음)
+"""
+
+import asyncio
+import re
+
+from openai import AsyncOpenAI
+
+from db.conn import get_async_conn
+from llm import _generate_events, iterate_in_loop
+from retrieval.name_search import JOB_ATTRIBUTE_RE
+from tool_runner import JobCache
+
+SESSION_HISTORY_TURNS = 4  # 답변 생성에 넣을 최근 대화 턴 수
+
+# 앞선 답변·공고를 가리키는 표현 ("그 회사", "두 번째 공고", "위에서", "더 자세히" 등)
+_REFERENCE_RE = re.compile(
+    r"(그|저|이|해당|위|앞|방금|아까)\s*(회사|기업|공고|포지션|곳|거|것|중|에서|내용|목록)"
+    r"|(첫|두|세|네|다섯|[1-9１-９])\s*(번째|번)"
+    r"|더\s*자세히|자세하게|좀\s*더\s*(자세|알려|설명)|추가로|거기|그거|그럼|그러면|그중|이중"
+)
+# 새 검색이 필요하다는 표현 ("다른 공고", "말고", "새로 찾아줘" 등) — 지시 표현보다 우선
+_NEW_SEARCH_RE = re.compile(r"다른\s*(회사|기업|공고|포지션|곳|직무)|말고|대신|새로|처음부터|다시\s*(찾|검색)")
+# 속성 질문의 어미 ("연봉은?", "복지는 어때?", "마감 언제야?")
+_ATTRIBUTE_QUESTION_RE = re.compile(r"(은|는|[?？]|어때|얼마|언제|어디|뭐|몇)\s*[?？]?\s*$")
+# 속성을 조건으로 새로 찾는 표현 ("연봉 높은 회사", "코딩테스트 없는 곳 추천") — 속성 질문에서 제외
+_ATTRIBUTE_SEARCH_RE = re.compile(r"높은|낮은|많은|적은|좋은|이상|이하|넘는|없는|있는|찾아|추천|검색|보여")
+SHORT_FOLLOWUP_WORDS = 3
+
+
+def classify_followup(query: str, has_context: bool) -> str:
+    """
+    질문을 "followup"(세션 상태로 답변) / "new"(새 검색)로 분류. 모델 호출 없는 로컬 규칙.
+    세션에 청크가 없으면 항상 "new".
+
+    followup: "그 회사 연봉은?", "두 번째 공고 더 자세히", "좀 더 자세히 알려줘", "연봉은?", "복지는 어때?"
+    new     : "다른 회사 공고는?", "좀 더 연봉 높은 곳 찾아줘", "연봉 높은 회사", "코딩테스트 없는 회사"
+    """
+    if not has_context:
+        return "new"
+    text = query.strip()
+    if _NEW_SEARCH_RE.search(text):
+        return "new"
+    if _REFERENCE_RE.search(text):
+        return "followup"
+    if (
+        len(text.split()) <= SHORT_FOLLOWUP_WORDS
+        and JOB_ATTRIBUTE_RE.search(text)  # 지시 표현 없이도 후속 질문으로 보는 공고 속성 ("연봉은?", "복지는 어때?")
+        and _ATTRIBUTE_QUESTION_RE.search(text)
+        and not _ATTRIBUTE_SEARCH_RE.search(text)
+    ):
+        return "followup"
+    return "new"
+
+
+class ChatSession:
+    """
+    후속 질문을 이전 턴의 검색 결과로 처리하는 대화 세션.
+
+    비동기: `async for event in session.astream(query)` (이벤트 형식은 astream_generate와 같고 done에 "route"가 추가됨)
+    동기  : `for event in session.stream(query)` — 세션 전용 이벤트 루프 1개에서 실행되므로
+            클라이언트·DB 연결을 턴 사이에 재사용한다. 끝나면 close().
+    """
+
+    def __init__(
+        self,
+        client: AsyncOpenAI | None = None,
+        conn=None,
+        pool=None,
+        verbose: bool = False,
+        max_history_turns: int = SESSION_HISTORY_TURNS,
+        **generate_kwargs,
+    ):
+        self.client = client
+        self.conn = conn
+        self.pool = pool
+        self.verbose = verbose
+        self.max_history_turns = max_history_turns
+        self.generate_kwargs = generate_kwargs
+        self.chunks: list[dict] = []
+        self.history: list[dict] = []
+        self.job_cache: JobCache | None = None
+        self._own_conn = False
+        self._own_client = False
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def reset(self) -> None:
+        """검색 결과·공고 행·대화 기록 초기화 (클라이언트·연결은 유지)"""
+        self.chunks = []
+        self.history = []
+        self.job_cache = None
+
+    async def _ensure_resources(self) -> None:
+        if self.client is None:
+            self.client = AsyncOpenAI()
+            self._own_client = True
+        if self.conn is None and self.pool is None:
+            self.conn = await get_async_conn()
+            self._own_conn = True
+        if self.job_cache is None:
+            self.job_cache = JobCache(self.conn, self.pool)
+
+    def _recent_history(self) -> list[dict]:
+        return self.history[-2 * self.max_history_turns:] if self.max_history_turns > 0 else []
+
+    async def astream(self, query: str):
+        """질문 1턴 처리. 이벤트를 차례로 내보내고 done 이벤트에 "route"("followup" / "new")를 담는다"""
+        await self._ensure_resources()
+        route = classify_followup(query, bool(self.chunks))
+        common = {"conn": self.conn, "client": self.client, "pool": self.pool, "stream": True}
+        if route == "followup":
+            options = {
+                k: v for k, v in self.generate_kwargs.items()
+                if k in ("context_budget", "max_tool_rounds", "max_tool_calls")
+            }
+            events = _generate_events(
+                query, verbose=self.verbose, followup=True,
+                chunks=self.chunks, job_cache=self.job_cache, history=self._recent_history(),
+                **common, **options,
+            )
+        else:
+            events = _generate_events(
+                query, verbose=self.verbose,
+                job_cache=self.job_cache, history=self._recent_history(),
+                **common, **self.generate_kwargs,
+            )
+
+        async for event in events:
+            if event["type"] == "done":
+                if route == "new":
+                    self.chunks = event["chunks"]
+                self.history += [
+                    {"role": "user", "content": query},
+                    {"role": "assistant", "content": event["answer"] or ""},
+                ]
+                # 답변 생성에 넣는 최근 턴만 보관 (오래 쓰는 세션의 메모리가 계속 늘지 않게)
+                self.history = self._recent_history()
+                event = {**event, "route": route}
+            yield event
+
+    def stream(self, query: str):
+        """astream의 동기 제너레이터 버전 (세션 전용 이벤트 루프 사용)"""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        yield from iterate_in_loop(self._loop, self.astream(query))
+
+    async def aclose(self) -> None:
+        if self._own_conn and self.conn is not None:
+            await self.conn.close()
+            self.conn = None
+            self._own_conn = False
+        if self._own_client and self.client is not None:
+            await self.client.close()
+            self.client = None
+            self._own_client = False
+
+    def close(self) -> None:
+        """동기 사용 시 종료 (연결·클라이언트 정리 후 이벤트 루프 닫음)"""
+        if self._loop is None:
+            return
+        self._loop.run_until_complete(self.aclose())
+        self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+        self._loop.close()
+        self._loop = None
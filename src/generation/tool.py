@@ -4,9 +4,23 @@ Generation 단계에서 사용할 Tool 함수들
 - get_jobs_title_link: 근거 청크들의 job_post_id로 jobs 테이블 조회 → post_title, job_post_url 조회
 - get_job_descriptions: 직무 관련 질문 시 검색된 청크 공고 n개의 post_title, job_post_url, job_description 조회 → 참고하여 답변
 - get_company_info: job_post_id로 공고 상세 조회 (company 정보 조회)
+- get_companies_info: 여러 job_post_id의 회사 정보를 한 번에 조회 (회사 단위로 중복 제거, 요청 필드만).
+                      공고 행은 tool_runner.JobCache(afetch_jobs)에서 가져오고 company_records로 회사별 레코드를 만듦
+- filter_jobs: 직원 수·평균 연봉·매출액·영업이익 범위, 코딩테스트 여부, 마감일, 기술스택 조건으로 공고를 SQL에서 바로 거름
+               (etl/load.py의 숫자·boolean·날짜 컬럼, B-tree 인덱스)
+
+get_company_info / get_jobs_title_link / get_job_descriptions는 동기(psycopg2) 단독 조회용이고,
+비동기 생성 경로의 툴 호출은 아래 afetch_jobs 캐시에서 응답합니다 (filter_jobs만 비동기 afilter_jobs를 따로 제공).
+afetch_jobs는 세 툴이 쓰는 컬럼을 한 번의 ANY(%s) 쿼리로 가져와 (job_description은 SQL에서 필드 선택·길이 제한) 요청 단위 공고 캐시(tool_runner.JobCache)를 채웁니다.
+(벡터 검색 직후 미리 채우고, 여러 툴 호출도 이 캐시에서 응답)
 """
 
-from db.conn import get_conn
+from db.conn import get_async_conn, get_conn
+from etl.nomalizing import normalize_stack
+
+# job_description JSONB 필드 (etl/cleaning.py 출력 키). get_job_descriptions의 fields 인자로 골라 받을 수 있음
+JOB_DESCRIPTION_FIELDS = ("기술스택", "주요업무", "자격요건", "우대사항", "코딩테스트 여부")
+JOB_FIELD_CHAR_LIMIT = 800  # 툴 결과에 담을 직무소개 필드 1개당 최대 글자 수
 
 # OpenAI function calling 스키마: 회사 정보 조회
 TOOL_GET_COMPANY_INFO = {
@@ -32,6 +46,23 @@ TOOL_GET_COMPANY_INFO = {
 }
 
 
+_COMPANY_INFO_SQL = """
+    SELECT job_post_id, post_title, company
+    FROM jobs
+    WHERE job_post_id = %s
+"""
+
+
+def _company_info_row(row) -> dict | None:
+    if row is None:
+        return None
+    return {
+        "job_post_id": row[0],
+        "post_title": row[1],
+        "company": row[2] or {}
+    }
+
+
 def get_company_info(conn, job_post_id: str) -> dict | None:
     """
     job_post_id로 공고의 회사(company) 정보 조회.
@@ -40,28 +71,77 @@ def get_company_info(conn, job_post_id: str) -> dict | None:
     if own_conn:
         conn = get_conn()
     try:
-        sql = """
-            SELECT job_post_id, post_title, company
-            FROM jobs
-            WHERE job_post_id = %s
-        """
         with conn.cursor() as cur:
-            cur.execute(sql, (job_post_id,))
+            cur.execute(_COMPANY_INFO_SQL, (job_post_id,))
             row = cur.fetchone()
-
-        if row is None:
-            return None
-
-        return {
-            "job_post_id": row[0],
-            "post_title": row[1],
-            "company": row[2] or {}
-        }
+        return _company_info_row(row)
     finally:
         if own_conn:
             conn.close()
 
 
+# company JSONB 필드 (etl/cleaning.py 출력 키). get_companies_info의 fields 인자로 골라 받을 수 있음
+COMPANY_FIELDS = ("전체 직원수", "평균 연봉", "매출액", "영업이익", "복지 및 혜택", "company_tags", "company_url")
+COMPANY_WELFARE_LIMIT = 500  # 복지 및 혜택 최대 글자 수
+
+# OpenAI function calling 스키마: 여러 공고의 회사 정보 일괄 조회 (회사 단위로 중복 제거)
+TOOL_GET_COMPANIES_INFO = {
+    "type": "function",
+    "function": {
+        "name": "get_companies_info",
+        "description": (
+            "여러 채용 공고의 회사 정보를 한 번에 조회합니다. 회사를 비교하거나 여러 공고의 회사 정보가 필요할 때 "
+            "get_company_info를 여러 번 호출하지 말고 이 툴을 한 번 사용하세요. "
+            "같은 회사의 공고는 하나로 합쳐 회사별로 반환합니다."
+        ),
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "job_post_ids": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "회사 정보를 조회할 채용 공고 ID 목록",
+                },
+                "fields": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": list(COMPANY_FIELDS)},
+                    "description": "필요한 회사 정보 항목만 지정 (생략하면 전체)",
+                },
+            },
+            "required": ["job_post_ids"],
+        },
+    },
+}
+
+
+def company_record(company_name: str, job_post_ids: list[str], company: dict, fields=None) -> dict:
+    """회사 1곳의 툴 결과 레코드 (요청 필드만, 빈 값 제외, 복지 글자 수 제한, 태그는 한 줄로)"""
+    record = {"company_name": company_name, "job_post_ids": list(job_post_ids)}
+    for key in fields or COMPANY_FIELDS:
+        value = company.get(key)
+        if not value:
+            continue
+        if key == "company_tags" and isinstance(value, list):
+            value = ", ".join(value)
+        elif key == "복지 및 혜택" and len(value) > COMPANY_WELFARE_LIMIT:
+            value = value[:COMPANY_WELFARE_LIMIT] + "..."
+        record[key] = value
+    return record
+
+
+def company_records(jobs: list[dict], fields=None) -> list[dict]:
+    """
+    공고 행(afetch_jobs 결과) 목록 → get_companies_info 결과: 회사별 레코드
+    (회사명이 같은 공고는 하나로 합치고 회사명이 없으면 공고 단위, 주어진 공고 순서 유지)
+    """
+    by_company: dict[str, tuple[list[str], dict]] = {}
+    for job in jobs:
+        company = job["company"] or {}
+        name = company.get("company_name") or job["job_post_id"]
+        by_company.setdefault(name, ([], company))[0].append(job["job_post_id"])
+    return [company_record(name, ids, company, fields) for name, (ids, company) in by_company.items()]
+
+
 # OpenAI function calling 스키마: 공고 제목·링크 조회
 TOOL_GET_JOBS_TITLE_LINK = {
     "type": "function",
@@ -86,6 +166,20 @@ TOOL_GET_JOBS_TITLE_LINK = {
 }
 
 
+_JOBS_TITLE_LINK_SQL = """
+    SELECT job_post_id, post_title, job_post_url
+    FROM jobs
+    WHERE job_post_id = ANY(%s)
+"""
+
+
+def _title_link_rows(rows) -> list[dict]:
+    return [
+        {"job_post_id": r[0], "post_title": r[1], "job_post_url": r[2] or ""}
+        for r in rows
+    ]
+
+
 def get_jobs_title_link(conn, job_post_ids: list[str]) -> list[dict]:
     """
     job_post_id 목록으로 jobs 테이블에서 공고 제목·링크만 조회.
@@ -97,19 +191,10 @@ def get_jobs_title_link(conn, job_post_ids: list[str]) -> list[dict]:
     if own_conn:
         conn = get_conn()
     try:
-        sql = """
-            SELECT job_post_id, post_title, job_post_url
-            FROM jobs
-            WHERE job_post_id = ANY(%s)
-        """
         with conn.cursor() as cur:
-            cur.execute(sql, (job_post_ids,))
+            cur.execute(_JOBS_TITLE_LINK_SQL, (job_post_ids,))
             rows = cur.fetchall()
-
-        return [
-            {"job_post_id": r[0], "post_title": r[1], "job_post_url": r[2] or ""}
-            for r in rows
-        ]
+        return _title_link_rows(rows)
     finally:
         if own_conn:
             conn.close()
@@ -138,6 +223,11 @@ TOOL_GET_JOB_DESCRIPTIONS = {
                     "description": "가져올 공고 개수 (기본 5, 최대 10)",
                     "default": 5,
                 },
+                "fields": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": list(JOB_DESCRIPTION_FIELDS)},
+                    "description": "질문에 필요한 직무소개 항목만 지정 (생략하면 전체)",
+                },
             },
             "required": ["job_post_ids"],
         },
@@ -145,6 +235,27 @@ TOOL_GET_JOB_DESCRIPTIONS = {
 }
 
 
+_JOB_DESCRIPTIONS_SQL = """
+    SELECT job_post_id, post_title, job_post_url, job_description
+    FROM jobs
+    WHERE job_post_id = ANY(%s)
+"""
+
+
+def _job_description_rows(rows, ids: list[str]) -> list[dict]:
+    # 요청한 id 순서 유지
+    by_id = {
+        r[0]: {
+            "job_post_id": r[0],
+            "post_title": r[1],
+            "job_post_url": r[2] or "",
+            "job_description": r[3] or {}
+        }
+        for r in rows
+    }
+    return [by_id[jid] for jid in ids if jid in by_id]
+
+
 def get_job_descriptions(conn, job_post_ids: list[str], n: int = 5) -> list[dict]:
     """
     질문에 적합한 청크 공고 n개의 job_description 컬럼 조회.
@@ -158,26 +269,216 @@ def get_job_descriptions(conn, job_post_ids: list[str], n: int = 5) -> list[dict
     if own_conn:
         conn = get_conn()
     try:
-        sql = """
-            SELECT job_post_id, post_title, job_post_url, job_description
-            FROM jobs
-            WHERE job_post_id = ANY(%s)
-        """
         with conn.cursor() as cur:
-            cur.execute(sql, (ids,))
+            cur.execute(_JOB_DESCRIPTIONS_SQL, (ids,))
             rows = cur.fetchall()
+        return _job_description_rows(rows, ids)
+    finally:
+        if own_conn:
+            conn.close()
 
-        # 요청한 id 순서 유지
-        by_id = {
-            r[0]: {
-                "job_post_id": r[0],
-                "post_title": r[1],
-                "job_post_url": r[2] or "",
-                "job_description": r[3] or {}
-            }
-            for r in rows
-        }
-        return [by_id[jid] for jid in ids if jid in by_id]
+
+FILTER_JOBS_DEFAULT_LIMIT = 10
+FILTER_JOBS_MAX_LIMIT = 30
+
+# sort_by 값 → ORDER BY 식 (값이 없는 공고는 뒤로)
+FILTER_SORT_KEYS = {
+    "avg_salary": "company_avg_salary DESC NULLS LAST",
+    "employees": "company_employees DESC NULLS LAST",
+    "revenue": "company_revenue DESC NULLS LAST",
+    "operating_profit": "company_operating_profit DESC NULLS LAST",
+    "deadline": "deadline ASC NULLS LAST",
+}
+
+# OpenAI function calling 스키마: 회사 수치·코딩테스트·마감일·기술스택 조건으로 공고 필터링
+TOOL_FILTER_JOBS = {
+    "type": "function",
+    "function": {
+        "name": "filter_jobs",
+        "description": (
+            "직원 수, 평균 연봉, 매출액, 영업이익, 코딩테스트 여부, 마감일, 기술스택 같은 조건으로 "
+            "전체 채용 공고를 DB에서 정확히 걸러 조건에 맞는 공고 수(total)와 공고 목록을 가져옵니다. "
+            "'평균 연봉 5천 이상', '직원 100명 이상', '코딩테스트 없는 회사'처럼 숫자·조건 질문이면 "
+            "get_company_info를 공고마다 호출하지 말고 이 툴을 사용하세요. 모든 조건은 AND로 적용됩니다."
+        ),
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "min_employees": {"type": "integer", "description": "최소 직원 수 (명)"},
+                "max_employees": {"type": "integer", "description": "최대 직원 수 (명)"},
+                "min_avg_salary": {"type": "integer", "description": "최소 평균 연봉 (만원, 예: 5천만원 → 5000)"},
+                "max_avg_salary": {"type": "integer", "description": "최대 평균 연봉 (만원)"},
+                "min_revenue": {"type": "integer", "description": "최소 매출액 (억원)"},
+                "min_operating_profit": {"type": "integer", "description": "최소 영업이익 (억원, 흑자 회사만이면 0)"},
+                "has_coding_test": {"type": "boolean", "description": "채용 절차에 코딩테스트가 있는지"},
+                "open_only": {"type": "boolean", "description": "마감되지 않은 공고만 (마감일이 없는 상시채용 포함)"},
+                "deadline_before": {"type": "string", "description": "이 날짜(YYYY-MM-DD) 이전에 마감하는 공고만"},
+                "stacks": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "모두 요구하는 기술스택 (예: ['Python', 'Django'])",
+                },
+                "within_job_post_ids": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "이 공고 ID들 안에서만 거름 (검색된 청크의 공고로 범위를 좁힐 때)",
+                },
+                "sort_by": {
+                    "type": "string",
+                    "enum": list(FILTER_SORT_KEYS),
+                    "description": "정렬 기준 (금액·인원은 큰 순, 마감일은 빠른 순)",
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": f"가져올 공고 수 (기본 {FILTER_JOBS_DEFAULT_LIMIT}, 최대 {FILTER_JOBS_MAX_LIMIT})",
+                    "default": FILTER_JOBS_DEFAULT_LIMIT,
+                },
+            },
+            "required": [],
+        },
+    },
+}
+
+# 필터 인자 → WHERE 조건 (인자 이름과 같은 이름의 SQL 파라미터를 씀). 금액 인자 중 억원 단위는 만원으로 바꿔서 비교
+_FILTER_CONDITIONS = {
+    "min_employees": "company_employees >= %(min_employees)s",
+    "max_employees": "company_employees <= %(max_employees)s",
+    "min_avg_salary": "company_avg_salary >= %(min_avg_salary)s",
+    "max_avg_salary": "company_avg_salary <= %(max_avg_salary)s",
+    "min_revenue": "company_revenue >= %(min_revenue)s",
+    "min_operating_profit": "company_operating_profit >= %(min_operating_profit)s",
+    "has_coding_test": "has_coding_test = %(has_coding_test)s",
+    "deadline_before": "deadline < %(deadline_before)s::date",
+    "stacks": "stack @> %(stacks)s::text[]",
+    "within_job_post_ids": "job_post_id = ANY(%(within_job_post_ids)s)",
+}
+_EOK_TO_MAN = 10000  # 억원 → 만원
+_EOK_FILTERS = ("min_revenue", "min_operating_profit")
+
+# 결과에 담을 company 원문 필드 (LLM이 단위 변환 없이 그대로 인용)
+_FILTER_COMPANY_FIELDS = ("전체 직원수", "평균 연봉", "매출액", "영업이익")
+
+_FILTER_JOBS_SQL = """
+    SELECT job_post_id, post_title, job_post_url,
+           company->>'company_name',
+           {company_cols},
+           has_coding_test, deadline::text,
+           count(*) OVER () AS total
+    FROM jobs
+    WHERE {where}
+    ORDER BY {order}
+    LIMIT %(limit)s
+"""
+
+
+def _filter_jobs_query(filters: dict) -> tuple[str, dict]:
+    """
+    필터 인자(tool_runner.normalize_tool_args의 filter_jobs 정규형) → (SQL, 파라미터).
+    WHERE·ORDER BY에는 미리 정해 둔 식만 넣고 값은 모두 파라미터로 넘긴다.
+    """
+    params: dict = {"limit": filters.get("limit") or FILTER_JOBS_DEFAULT_LIMIT}
+    where = []
+    for key, condition in _FILTER_CONDITIONS.items():
+        value = filters.get(key)
+        if value is None:
+            continue
+        params[key] = value * _EOK_TO_MAN if key in _EOK_FILTERS else value
+        where.append(condition)
+    if filters.get("open_only"):
+        where.append("(deadline IS NULL OR deadline >= current_date)")
+    sql = _FILTER_JOBS_SQL.format(
+        company_cols=", ".join(f"company->>'{f}'" for f in _FILTER_COMPANY_FIELDS),
+        where=" AND ".join(where) or "TRUE",
+        order=", ".join(filter(None, [FILTER_SORT_KEYS.get(filters.get("sort_by")), "job_post_id"])),
+    )
+    return sql, params
+
+
+def filter_stacks(stacks) -> list[str]:
+    """stacks 인자 → jobs.stack과 같은 규칙으로 정규화한 토큰 (etl.nomalizing.normalize_stack)"""
+    return [t for s in stacks or [] for t in normalize_stack(str(s))]
+
+
+def _filter_jobs_rows(rows) -> dict:
+    jobs = []
+    for r in rows:
+        record = {"job_post_id": r[0], "post_title": r[1], "job_post_url": r[2] or "", "company_name": r[3]}
+        record.update(zip(_FILTER_COMPANY_FIELDS, r[4:8]))
+        record["코딩테스트"] = None if r[8] is None else ("있음" if r[8] else "없음")
+        record["마감일"] = r[9]
+        jobs.append({k: v for k, v in record.items() if v not in (None, "")})
+    return {"total": rows[0][-1] if rows else 0, "jobs": jobs}
+
+
+def filter_jobs(conn, filters: dict) -> dict:
+    """
+    조건에 맞는 공고 수와 공고 목록 조회 → {"total": 조건에 맞는 전체 공고 수, "jobs": 상위 limit개}
+    """
+    sql, params = _filter_jobs_query(filters)
+    own_conn = conn is None
+    if own_conn:
+        conn = get_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+        return _filter_jobs_rows(rows)
     finally:
         if own_conn:
             conn.close()
+
+
+async def afilter_jobs(conn, filters: dict) -> dict:
+    """filter_jobs의 비동기 버전"""
+    sql, params = _filter_jobs_query(filters)
+    own_conn = conn is None
+    if own_conn:
+        conn = await get_async_conn()
+    try:
+        async with conn.cursor() as cur:
+            await cur.execute(sql, params)
+            rows = await cur.fetchall()
+        return _filter_jobs_rows(rows)
+    finally:
+        if own_conn:
+            await conn.close()
+
+
+# 벡터 검색 직후 공고 행 미리 가져오기(prefetch)용: 세 툴이 쓰는 컬럼을 모두 포함
+# job_description은 DB에서 알려진 필드만, 빈 값 제외, 필드별 JOB_FIELD_CHAR_LIMIT자로 잘라서 가져옴
+_JOBS_SQL = """
+    SELECT j.job_post_id, j.post_title, j.job_post_url, j.company,
+           (
+               SELECT jsonb_object_agg(
+                   d.key,
+                   CASE WHEN length(d.value) > %(limit)s THEN left(d.value, %(limit)s) || '...' ELSE d.value END
+               )
+               FROM jsonb_each_text(j.job_description) AS d
+               WHERE d.key = ANY(%(fields)s) AND d.value <> ''
+           ) AS job_description
+    FROM jobs AS j
+    WHERE j.job_post_id = ANY(%(ids)s)
+"""
+
+
+def _job_row(row) -> dict:
+    return {
+        "job_post_id": row[0],
+        "post_title": row[1],
+        "job_post_url": row[2] or "",
+        "company": row[3] or {},
+        "job_description": row[4] or {},
+    }
+
+
+async def afetch_jobs(conn, job_post_ids: list[str]) -> dict[str, dict]:
+    """여러 job_post_id의 공고 행(제목, 링크, company, job_description)을 한 번에 조회 → {job_post_id: 공고 dict}"""
+    if not job_post_ids:
+        return {}
+    async with conn.cursor() as cur:
+        await cur.execute(
+            _JOBS_SQL,
+            {"ids": list(job_post_ids), "fields": list(JOB_DESCRIPTION_FIELDS), "limit": JOB_FIELD_CHAR_LIMIT},
+        )
+        rows = await cur.fetchall()
+    return {r[0]: _job_row(r) for r in rows}
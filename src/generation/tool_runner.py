@@ -0,0 +1,359 @@
+"""
+툴 호출 실행기 (tool dispatcher)
+
+LLM이 한 메시지에서 여러 tool_calls를 반환하면:
+- 같은 종류의 호출은 모아서 SQL 한 번(job_post_id = ANY(%s))으로 조회한 뒤 호출별로 나눠 담고
+- 서로 다른 종류의 호출 그룹은 동시에 실행 (pool이 있으면 그룹마다 별도 연결 사용)
+- 결과 tool 메시지는 원래 tool_call 순서(tool_call_id)대로 반환
+- 공고 행은 요청 단위 JobCache에서 꺼내 씀. generate가 벡터 검색 직후 검색된 공고를 미리 채워 두므로
+  대부분의 툴 호출은 DB를 거치지 않고, 캐시에 없는 공고만 한 번에 조회
+- 결과는 요청한 필드만 남겨(get_job_descriptions의 fields) 공백 없는 JSON으로 직렬화
+- 요청 단위 ToolMemo: 같은 (툴, 정규화한 인자) 호출은 다시 실행하지 않고, 이미 전달한 공고는 목록에서 뺌
+- filter_jobs는 공고 행 캐시를 거치지 않고 조건마다 SQL 한 번 (JobCache와 같은 연결 규칙)
+"""
+
+import asyncio
+import json
+
+from db.conn import async_conn_scope
+from context import compact_json, project_job_description
+from monitoring.tracing import span
+from etl.nomalizing import parse_deadline
+from monitoring.metrics import count_cache
+from tool import (
+    COMPANY_FIELDS,
+    COMPANY_WELFARE_LIMIT,
+    FILTER_JOBS_DEFAULT_LIMIT,
+    FILTER_JOBS_MAX_LIMIT,
+    FILTER_SORT_KEYS,
+    JOB_DESCRIPTION_FIELDS,
+    afetch_jobs,
+    afilter_jobs,
+    company_records,
+    filter_stacks,
+)
+
+UNKNOWN_TOOL_RESULT = "알 수 없는 툴입니다."
+
+
+def format_company_info(company_info: dict | None) -> str:
+    """get_company_info 결과를 LLM이 읽기 쉬운 텍스트로 변환"""
+    if not company_info:
+        return "해당 공고를 찾을 수 없습니다."
+    company = company_info.get("company", {})
+    result_parts = [
+        f"공고 제목: {company_info.get('post_title', '')}",
+        f"회사명: {company.get('company_name', '정보 없음')}",
+        f"회사 소개 링크: {company.get('company_url', '정보 없음')}",
+        f"직원 수: {company.get('전체 직원수', '정보 없음')}",
+        f"평균 연봉: {company.get('평균 연봉', '정보 없음')}",
+        f"매출액: {company.get('매출액', '정보 없음')}",
+        f"영업이익: {company.get('영업이익', '정보 없음')}",
+    ]
+    if company.get("복지 및 혜택"):
+        welfare = company["복지 및 혜택"]
+        # 너무 길면 앞부분만 (COMPANY_WELFARE_LIMIT자 제한)
+        if len(welfare) > COMPANY_WELFARE_LIMIT:
+            welfare = welfare[:COMPANY_WELFARE_LIMIT] + "..."
+        result_parts.append(f"복지 및 혜택:\n{welfare}")
+    if company.get("company_tags"):
+        tags = ", ".join(company["company_tags"])
+        result_parts.append(f"회사 태그: {tags}")
+    return "\n".join(result_parts)
+
+
+def _dumps(items) -> str:
+    return compact_json(items)
+
+
+def _unique(ids) -> list[str]:
+    """순서를 유지하며 중복 제거"""
+    return list(dict.fromkeys(str(i) for i in ids))
+
+
+class JobCache:
+    """
+    요청 1건 동안 jobs 행(afetch_jobs 결과)을 보관하는 캐시. 없는 공고만 DB에서 한 번에 가져온다.
+    DB 연결은 실제로 조회할 때만 사용 (pool이 있으면 그때 빌렸다가 반납).
+    """
+
+    def __init__(self, conn=None, pool=None):
+        self.conn = conn
+        self.pool = pool
+        self._rows: dict[str, dict] = {}
+        self._missing: set[str] = set()  # DB에 없다고 확인된 공고 (다시 조회하지 않음)
+
+    def get(self, job_post_id) -> dict | None:
+        return self._rows.get(str(job_post_id))
+
+    def __contains__(self, job_post_id) -> bool:
+        return str(job_post_id) in self._rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def connection(self):
+        """DB 연결 스코프 (pool이 있으면 빌렸다가 반납, 없으면 conn을 그대로 사용)"""
+        return async_conn_scope(None if self.pool is not None else self.conn, self.pool)
+
+    async def ensure(self, job_post_ids) -> int:
+        """캐시에 없는 공고만 한 번의 쿼리로 가져와 채운다. 실제로 조회한 공고 수 반환"""
+        requested = _unique(job_post_ids)
+        ids = [jid for jid in requested if jid not in self._rows and jid not in self._missing]
+        count_cache("job", hits=len(requested) - len(ids), misses=len(ids))
+        if not ids:
+            return 0
+        with span("job_fetch", requested=len(ids)) as sp:
+            async with self.connection() as conn:
+                rows = await afetch_jobs(conn, ids)
+            self._rows.update(rows)
+            self._missing.update(jid for jid in ids if jid not in rows)
+            sp.set(found=len(rows))
+        return len(ids)
+
+
+def _company_info(job: dict | None) -> dict | None:
+    if job is None:
+        return None
+    return {"job_post_id": job["job_post_id"], "post_title": job["post_title"], "company": job["company"]}
+
+
+def _title_link(job: dict) -> dict:
+    return {"job_post_id": job["job_post_id"], "post_title": job["post_title"], "job_post_url": job["job_post_url"]}
+
+
+def _job_description(job: dict, fields: list[str] | None = None) -> dict:
+    return {**_title_link(job), "job_description": project_job_description(job["job_description"], fields)}
+
+
+def _requested_fields(args: dict) -> list[str] | None:
+    """get_job_descriptions의 fields 인자 중 알려진 필드만 (없거나 모두 모르는 필드면 None = 전체)"""
+    fields = [f for f in JOB_DESCRIPTION_FIELDS if f in (args.get("fields") or [])]
+    return fields or None
+
+
+def _requested_company_fields(args: dict) -> list[str] | None:
+    """get_companies_info의 fields 인자 중 알려진 필드만 (없으면 None = 전체)"""
+    fields = [f for f in COMPANY_FIELDS if f in (args.get("fields") or [])]
+    return fields or None
+
+
+def normalize_tool_args(name: str, args: dict) -> dict:
+    """
+    툴 인자를 정규형으로 (메모 키이자 실행기가 쓰는 인자):
+    - get_company_info    : {"job_post_id"}
+    - get_jobs_title_link : {"job_post_ids": 순서 유지·중복 제거}
+    - get_job_descriptions: {"job_post_ids": 중복 제거 후 상위 n개(1~10), "fields": 알려진 필드(정의 순서) 또는 None}
+    - get_companies_info  : {"job_post_ids": 순서 유지·중복 제거, "fields": 알려진 필드(정의 순서) 또는 None}
+    - filter_jobs         : 값이 있는 알려진 조건만 (숫자는 int, stacks는 정규화·정렬, 날짜는 YYYY-MM-DD), limit은 1~30
+    """
+    if name == "get_company_info":
+        return {"job_post_id": str(args.get("job_post_id", ""))}
+    if name == "get_jobs_title_link":
+        return {"job_post_ids": _unique(args.get("job_post_ids") or [])}
+    if name == "get_job_descriptions":
+        n = min(max(1, int(args.get("n") or 5)), 10)
+        return {"job_post_ids": _unique(args.get("job_post_ids") or [])[:n], "fields": _requested_fields(args)}
+    if name == "get_companies_info":
+        return {"job_post_ids": _unique(args.get("job_post_ids") or []), "fields": _requested_company_fields(args)}
+    if name == "filter_jobs":
+        return _filter_args(args)
+    return args
+
+
+_FILTER_INT_ARGS = (
+    "min_employees", "max_employees", "min_avg_salary", "max_avg_salary", "min_revenue", "min_operating_profit",
+)
+
+
+def _filter_args(args: dict) -> dict:
+    """filter_jobs 인자 정규형 (없거나 해석할 수 없는 조건은 뺌)"""
+    filters = {key: int(args[key]) for key in _FILTER_INT_ARGS if args.get(key) is not None}
+    if isinstance(args.get("has_coding_test"), bool):
+        filters["has_coding_test"] = args["has_coding_test"]
+    if args.get("open_only"):
+        filters["open_only"] = True
+    deadline_before = parse_deadline(str(args.get("deadline_before") or ""))
+    if deadline_before:
+        filters["deadline_before"] = deadline_before
+    stacks = sorted(set(filter_stacks(args.get("stacks"))))
+    if stacks:
+        filters["stacks"] = stacks
+    within = _unique(args.get("within_job_post_ids") or [])
+    if within:
+        filters["within_job_post_ids"] = within
+    if args.get("sort_by") in FILTER_SORT_KEYS:
+        filters["sort_by"] = args["sort_by"]
+    filters["limit"] = min(max(1, int(args.get("limit") or FILTER_JOBS_DEFAULT_LIMIT)), FILTER_JOBS_MAX_LIMIT)
+    return filters
+
+
+class ToolMemo:
+    """
+    요청 1건 동안의 툴 결과 메모.
+    - (툴 이름, 정규화한 인자)가 같은 호출은 다시 실행하지 않고 앞선 tool_call_id를 가리키는 짧은 결과로 대신함
+    - 공고 목록을 받는 툴은 이미 전달한 공고(같은 필드)를 빼고 나머지만 실행 (겹치는 ID 재조회 방지)
+    """
+
+    def __init__(self):
+        self._calls: dict[str, str] = {}                        # 메모 키 → tool_call_id
+        self._delivered: dict[tuple, str] = {}                  # (툴 이름, 공고 ID, 필드) → tool_call_id
+        self.hits = 0
+
+    @staticmethod
+    def key(name: str, args: dict) -> str:
+        return f"{name}:{compact_json(args)}"
+
+    def lookup(self, name: str, args: dict) -> str | None:
+        return self._calls.get(self.key(name, args))
+
+    def remember(self, name: str, args: dict, tool_call_id: str) -> None:
+        self._calls.setdefault(self.key(name, args), tool_call_id)
+
+    def split_delivered(self, name: str, args: dict) -> tuple[dict, dict[str, str]]:
+        """공고 목록 인자에서 이미 전달한 공고를 뺀 인자와 {뺀 공고 ID: 전달한 tool_call_id}"""
+        if "job_post_ids" not in args:
+            return args, {}
+        fields = tuple(args.get("fields") or ())
+        delivered = {
+            jid: self._delivered[(name, jid, fields)]
+            for jid in args["job_post_ids"] if (name, jid, fields) in self._delivered
+        }
+        remaining = [jid for jid in args["job_post_ids"] if jid not in delivered]
+        return {**args, "job_post_ids": remaining}, delivered
+
+    def mark_delivered(self, name: str, args: dict, tool_call_id: str) -> None:
+        fields = tuple(args.get("fields") or ())
+        for jid in args.get("job_post_ids", []):
+            self._delivered.setdefault((name, jid, fields), tool_call_id)
+
+
+def _memo_note(tool_call_id: str) -> str:
+    return f"같은 호출의 결과가 이미 위에 있습니다 (tool_call_id={tool_call_id}). 그 결과를 참고하세요."
+
+
+def _delivered_note(delivered: dict[str, str]) -> str:
+    refs = ", ".join(f"{jid}(tool_call_id={tcid})" for jid, tcid in delivered.items())
+    return f"이미 조회한 공고는 생략했습니다: {refs}"
+
+
+async def _run_company_info(calls: list[tuple[int, dict]], jobs: JobCache) -> dict[int, str]:
+    await jobs.ensure((args["job_post_id"] for _, args in calls))
+    return {i: format_company_info(_company_info(jobs.get(args["job_post_id"]))) for i, args in calls}
+
+
+async def _run_title_link(calls: list[tuple[int, dict]], jobs: JobCache) -> dict[int, str]:
+    await jobs.ensure((jid for _, args in calls for jid in args["job_post_ids"]))
+    return {
+        i: _dumps([_title_link(jobs.get(jid)) for jid in args["job_post_ids"] if jid in jobs])
+        for i, args in calls
+    }
+
+
+async def _run_job_descriptions(calls: list[tuple[int, dict]], jobs: JobCache) -> dict[int, str]:
+    await jobs.ensure((jid for _, args in calls for jid in args["job_post_ids"]))
+    return {
+        i: _dumps([_job_description(jobs.get(jid), args["fields"]) for jid in args["job_post_ids"] if jid in jobs])
+        for i, args in calls
+    }
+
+
+async def _run_companies_info(calls: list[tuple[int, dict]], jobs: JobCache) -> dict[int, str]:
+    # 공고 행은 JobCache에서 (없는 공고만 afetch_jobs 한 번), 회사 단위 중복 제거·필드 선택은 tool.company_records
+    await jobs.ensure((jid for _, args in calls for jid in args["job_post_ids"]))
+    return {
+        i: _dumps(company_records([jobs.get(jid) for jid in args["job_post_ids"] if jid in jobs], args["fields"]))
+        for i, args in calls
+    }
+
+
+async def _run_filter_jobs(calls: list[tuple[int, dict]], jobs: JobCache) -> dict[int, str]:
+    # 조건이 호출마다 달라 묶지 않고, 연결 하나로 차례대로 실행
+    results = {}
+    async with jobs.connection() as conn:
+        for i, args in calls:
+            with span("filter_jobs", conditions=len(args) - 1) as sp:
+                found = await afilter_jobs(conn, args)
+                sp.set(total=found["total"], results=len(found["jobs"]))
+            results[i] = _dumps(found)
+    return results
+
+
+# 툴 이름 → (같은 종류 호출 묶음을 한 번에 처리하는 함수). 인자는 normalize_tool_args의 정규형
+_GROUP_RUNNERS = {
+    "get_company_info": _run_company_info,
+    "get_jobs_title_link": _run_title_link,
+    "get_job_descriptions": _run_job_descriptions,
+    "get_companies_info": _run_companies_info,
+    "filter_jobs": _run_filter_jobs,
+}
+
+
+async def run_tool_calls(
+    conn,
+    tool_calls,
+    pool=None,
+    job_cache: JobCache | None = None,
+    memo: ToolMemo | None = None,
+) -> list[dict]:
+    """
+    tool_calls를 실행해 tool 메시지 리스트를 원래 순서대로 반환.
+
+    Args:
+        conn: psycopg AsyncConnection (pool이 없을 때 모든 그룹이 공유)
+        tool_calls: LLM 응답 메시지의 tool_calls
+        pool: psycopg_pool.AsyncConnectionPool (있으면 그룹마다 연결을 빌려 실제로 병렬 실행)
+        job_cache: 요청 단위 공고 캐시 (없으면 conn/pool로 이번 호출에서만 쓰는 캐시를 만듦)
+        memo: 요청 단위 툴 결과 메모 (없으면 이번 tool_calls 안에서만 중복 제거)
+    """
+    jobs = job_cache if job_cache is not None else JobCache(conn, pool)
+    memo = memo if memo is not None else ToolMemo()
+    groups: dict[str, list[tuple[int, dict]]] = {}
+    results: dict[int, str] = {}
+    notes: dict[int, str] = {}  # 생략한 공고 안내 (실행 결과 뒤에 붙임)
+    for i, tool_call in enumerate(tool_calls):
+        name = tool_call.function.name
+        if name not in _GROUP_RUNNERS:
+            results[i] = UNKNOWN_TOOL_RESULT
+            continue
+        try:
+            args = normalize_tool_args(name, json.loads(tool_call.function.arguments or "{}"))
+        except (json.JSONDecodeError, TypeError, ValueError):
+            results[i] = "툴 인자를 해석할 수 없습니다."
+            continue
+
+        previous = memo.lookup(name, args)
+        if previous is not None:
+            memo.hits += 1
+            count_cache("tool_memo", hits=1)
+            results[i] = _memo_note(previous)
+            continue
+        memo.remember(name, args, tool_call.id)
+
+        run_args, delivered = memo.split_delivered(name, args)
+        if delivered:
+            memo.hits += 1
+            notes[i] = _delivered_note(delivered)
+            if not run_args["job_post_ids"]:
+                count_cache("tool_memo", hits=1)
+                results[i] = notes.pop(i)
+                continue
+        count_cache("tool_memo", misses=1)
+        memo.mark_delivered(name, run_args, tool_call.id)
+        groups.setdefault(name, []).append((i, run_args))
+
+    async def _run_group(name: str, calls: list[tuple[int, dict]]) -> dict[int, str]:
+        with span("tool", tool=name, calls=len(calls)):
+            return await _GROUP_RUNNERS[name](calls, jobs)
+
+    for group_result in await asyncio.gather(
+        *(_run_group(name, calls) for name, calls in groups.items())
+    ):
+        results.update(group_result)
+    for i, note in notes.items():
+        results[i] = f"{results[i]}\n({note})"
+
+    return [
+        {"role": "tool", "tool_call_id": tool_call.id, "content": results[i]}
+        for i, tool_call in enumerate(tool_calls)
+    ]
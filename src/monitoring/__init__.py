@@ -0,0 +1 @@
+# monitoring 패키지
@@ -0,0 +1,227 @@
+"""
+METRICS - 프로세스 단위 지표 (Prometheus 텍스트 형식)
+
+질문 1건이 OpenAI 호출·토큰·DB 쿼리를 얼마나 쓰는지 밖에서(대시보드) 보기 위한 카운터·히스토그램.
+tracing.span이 끝날 때 record_span으로 span 이름·속성을 지표로 옮기므로 모듈마다 따로 계측하지 않는다
+(span이 없는 캐시 적중만 count_cache를 직접 호출).
+
+- rag_requests_total / rag_request_seconds   : generate 요청 수·전체 지연 시간
+- rag_api_calls_total{purpose}               : OpenAI 호출 수 (rewrite / grading / answer / embedding)
+- rag_tokens_total{purpose, kind}            : 토큰 수 (kind = prompt / completion)
+- rag_tool_calls_total{tool}                 : 실행한 툴 호출 수 (ToolMemo로 생략한 호출 제외)
+- rag_db_query_seconds{operation}            : 벡터 검색·인덱스 빠른 경로·툴 SQL 지연 시간
+- rag_cache_requests_total{cache, result}    : 캐시 조회 수 (result = hit / miss, 적중률 = hit / 전체)
+
+지표는 워커 프로세스마다 따로 집계된다 (server/app.py를 --workers N으로 띄우면 /metrics도 워커별).
+노출: server/app.py의 GET /metrics, ask.py --metrics-port (start_http_server)
+"""
+
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 지연 시간 히스토그램 구간 (초)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# span 이름 → OpenAI 호출 용도 (span의 api_calls·토큰 속성을 이 용도로 집계)
+SPAN_PURPOSES = {
+    "rewrite": "rewrite",
+    "grade_llm": "grading",
+    "llm_round": "answer",
+    "embed": "embedding",
+    "embed_batch": "embedding",
+}
+# DB 지연 시간을 기록할 span (retrieval·tool_runner의 SQL 구간)
+DB_SPANS = (
+    "vector_search", "vector_search_batch", "stack_search", "name_search", "job_fetch", "filter_jobs",
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    """라벨별 누적 값"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def samples(self) -> list[tuple[str, tuple, float]]:
+        with self._lock:
+            return [(self.name, key, v) for key, v in sorted(self._values.items())]
+
+
+class Histogram:
+    """라벨별 구간 누적 개수·합계·개수 (Prometheus histogram)"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._values: dict[tuple, tuple[list[int], list[float]]] = {}  # 라벨 → (구간별 개수, [합계, 개수])
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counts, totals = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0, 0]))
+            counts[bisect_left(self.buckets, value)] += 1
+            totals[0] += value
+            totals[1] += 1
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(tuple(sorted(labels.items())))
+        return entry[1][1] if entry else 0
+
+    def samples(self) -> list[tuple[str, tuple, float]]:
+        out = []
+        with self._lock:
+            for key, (counts, (total, n)) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, c in zip((*self.buckets, float("inf")), counts):
+                    cumulative += c
+                    out.append((f"{self.name}_bucket", key + (("le", _format_value(bound)),), cumulative))
+                out.append((f"{self.name}_sum", key, total))
+                out.append((f"{self.name}_count", key, n))
+        return out
+
+
+class MetricsRegistry:
+    """지표 모음. 같은 이름으로 다시 만들면 기존 지표를 돌려준다"""
+
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help_text: str, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._get(Counter, name, help_text)
+
+    def histogram(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help_text, buckets=buckets)
+
+    def clear(self) -> None:
+        """모든 값 초기화 (지표 정의는 유지). 벤치마크·테스트용"""
+        with self._lock:
+            for metric in self._metrics.values():
+                with metric._lock:
+                    metric._values.clear()
+
+    def render(self) -> str:
+        """Prometheus 텍스트 형식 (text/plain; version=0.0.4)"""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUESTS = REGISTRY.counter("rag_requests_total", "generate 요청 수")
+REQUEST_SECONDS = REGISTRY.histogram("rag_request_seconds", "generate 요청 1건의 전체 지연 시간 (초)")
+API_CALLS = REGISTRY.counter("rag_api_calls_total", "OpenAI API 호출 수 (용도별)")
+TOKENS = REGISTRY.counter("rag_tokens_total", "OpenAI 토큰 수 (용도·prompt/completion별)")
+TOOL_CALLS = REGISTRY.counter("rag_tool_calls_total", "실행한 툴 호출 수 (툴 이름별)")
+DB_QUERY_SECONDS = REGISTRY.histogram("rag_db_query_seconds", "검색·툴 SQL 지연 시간 (초)")
+CACHE_REQUESTS = REGISTRY.counter("rag_cache_requests_total", "캐시 조회 수 (캐시별 hit/miss)")
+
+
+def count_cache(cache: str, hits: int = 0, misses: int = 0) -> None:
+    """캐시 조회 결과 기록 (cache: embedding / rewrite / answer / job / tool_memo)"""
+    if hits:
+        CACHE_REQUESTS.inc(hits, cache=cache, result="hit")
+    if misses:
+        CACHE_REQUESTS.inc(misses, cache=cache, result="miss")
+
+
+def record_span(name: str, duration_ms: float, attributes: dict) -> None:
+    """끝난 span 1개를 지표로 옮긴다 (tracing.Span이 종료 시 호출)"""
+    seconds = duration_ms / 1000
+    purpose = SPAN_PURPOSES.get(name)
+    if purpose is not None and attributes.get("api_calls"):
+        API_CALLS.inc(attributes["api_calls"], purpose=purpose)
+        for kind in ("prompt", "completion"):
+            tokens = attributes.get(f"{kind}_tokens")
+            if tokens:
+                TOKENS.inc(tokens, purpose=purpose, kind=kind)
+    if name in DB_SPANS:
+        DB_QUERY_SECONDS.observe(seconds, operation=name)
+    elif name == "generate":
+        REQUESTS.inc()
+        REQUEST_SECONDS.observe(seconds)
+    elif name == "tool":
+        TOOL_CALLS.inc(attributes.get("calls", 1), tool=attributes.get("tool", "unknown"))
+    elif name == "answer_cache" and "hit" in attributes:
+        count_cache("answer", hits=int(bool(attributes["hit"])), misses=int(not attributes["hit"]))
+    elif name == "embed" and "cached" in attributes:
+        count_cache("embedding", hits=int(bool(attributes["cached"])), misses=int(not attributes["cached"]))
+    elif name == "embed_batch":
+        count_cache("embedding", hits=attributes.get("cached", 0), misses=attributes.get("requested", 0))
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # 스크레이프마다 콘솔에 찍지 않음
+
+
+def start_http_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """GET /metrics를 응답하는 HTTP 서버를 데몬 스레드로 시작 (ask.py처럼 ASGI 서버가 없는 프로세스용)"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,164 @@
+"""
+TRACING - 요청 단위 단계별 지연 시간 추적
+
+- Tracer: 요청 1건의 span 목록 (OpenTelemetry span과 같은 필드: trace_id, span_id, parent_id, name,
+          start_time, duration_ms, attributes). 현재 요청의 Tracer는 contextvar로 전달되므로
+          retrieval/generation 모듈은 인자 없이 span()/log()만 호출하면 된다.
+- span(name, **attrs): 현재 Tracer에 span 기록 (Tracer가 없으면 아무것도 하지 않음)
+    sp.add_usage(response.usage) → api_calls, prompt/completion/total_tokens 누적
+- log(...): 현재 요청이 verbose일 때만 콘솔 출력 (대량 요청 시 출력 자체가 오버헤드)
+- 결과는 JSON lines로 내보내거나(RAG_TRACE_PATH 환경변수 / Tracer.export_jsonl) 답변과 함께 반환
+- 끝난 span은 monitoring.metrics.record_span으로 프로세스 단위 지표(API 호출·토큰·DB 지연·캐시 적중)에도 집계
+
+환경변수: RAG_TRACE_PATH (설정 시 요청마다 span을 이 파일에 JSON lines로 추가)
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from monitoring.metrics import record_span
+
+_current_tracer: ContextVar["Tracer | None"] = ContextVar("current_tracer", default=None)
+_current_span_id: ContextVar[str | None] = ContextVar("current_span_id", default=None)
+_export_lock = threading.Lock()
+
+
+class Span:
+    """진행 중인 span 1개. 종료 시 Tracer.spans에 dict로 기록된다."""
+
+    def __init__(self, tracer: "Tracer", name: str, parent_id: str | None, attributes: dict):
+        self.tracer = tracer
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+
+    def set(self, **attrs) -> None:
+        self.attributes.update(attrs)
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self._start) * 1000, 3)
+
+    def add(self, key: str, value: float = 1) -> None:
+        self.attributes[key] = self.attributes.get(key, 0) + value
+
+    def add_usage(self, usage) -> None:
+        """OpenAI 응답 usage로 API 호출 수·토큰 수 누적 (usage가 없어도 호출 수는 센다)"""
+        self.add("api_calls")
+        if usage is None:
+            return
+        for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+            value = getattr(usage, key, None)
+            if value is not None:
+                self.add(key, value)
+
+    def _finish(self) -> dict:
+        record = {
+            "trace_id": self.tracer.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration_ms": self.elapsed_ms(),
+            "attributes": self.attributes,
+        }
+        self.tracer.spans.append(record)
+        record_span(self.name, record["duration_ms"], self.attributes)
+        return record
+
+
+class _NoopSpan:
+    """Tracer가 없을 때 쓰는 빈 span"""
+
+    def set(self, **attrs) -> None:
+        pass
+
+    def elapsed_ms(self) -> float:
+        return 0.0
+
+    def add(self, key: str, value: float = 1) -> None:
+        pass
+
+    def add_usage(self, usage) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """요청 1건의 span 모음"""
+
+    def __init__(self, verbose: bool = False, trace_id: str | None = None):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.verbose = verbose
+        self.spans: list[dict] = []
+
+    @contextmanager
+    def activate(self):
+        """이 Tracer를 현재 컨텍스트(요청)의 Tracer로 설정"""
+        token = _current_tracer.set(self)
+        try:
+            yield self
+        finally:
+            _current_tracer.reset(token)
+
+    def summary(self) -> dict:
+        """span 이름별 합계: count, duration_ms, api_calls, 토큰 수"""
+        out: dict[str, dict] = {}
+        for s in self.spans:
+            agg = out.setdefault(s["name"], {"count": 0, "duration_ms": 0.0})
+            agg["count"] += 1
+            agg["duration_ms"] = round(agg["duration_ms"] + s["duration_ms"], 3)
+            for key in ("api_calls", "prompt_tokens", "completion_tokens", "total_tokens"):
+                if key in s["attributes"]:
+                    agg[key] = agg.get(key, 0) + s["attributes"][key]
+        return out
+
+    def to_jsonl(self) -> str:
+        return "".join(json.dumps(s, ensure_ascii=False, default=str) + "\n" for s in self.spans)
+
+    def export_jsonl(self, path: str | None = None) -> None:
+        """span들을 JSON lines 파일에 추가 (path 없으면 RAG_TRACE_PATH, 둘 다 없으면 무시)"""
+        path = path or os.environ.get("RAG_TRACE_PATH")
+        if not path or not self.spans:
+            return
+        with _export_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(self.to_jsonl())
+
+
+def current_tracer() -> Tracer | None:
+    return _current_tracer.get()
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """현재 Tracer에 span 기록. 예외가 나면 error 속성을 남기고 다시 던진다."""
+    tracer = _current_tracer.get()
+    if tracer is None:
+        yield _NOOP_SPAN
+        return
+    sp = Span(tracer, name, _current_span_id.get(), attrs)
+    token = _current_span_id.set(sp.span_id)
+    try:
+        yield sp
+    except BaseException as e:
+        sp.set(error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _current_span_id.reset(token)
+        sp._finish()
+
+
+def log(*args, **kwargs) -> None:
+    """현재 요청이 verbose일 때만 print"""
+    tracer = _current_tracer.get()
+    if tracer is not None and tracer.verbose:
+        print(*args, **kwargs)
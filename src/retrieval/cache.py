@@ -0,0 +1,270 @@
+"""
+CACHE - 질의 임베딩 캐시
+
+- TTLCache      : 프로세스 내 LRU 캐시 (최대 크기 + TTL 만료), 스레드 안전
+- EmbeddingCache: 2단 캐시
+    1단 - TTLCache (프로세스 내 메모리)
+    2단 - SQLite 파일 (같은 머신의 워커 프로세스끼리 공유)
+  키: 임베딩 모델명 + 정규화된 질의 텍스트
+  모델이 바뀌면 키가 달라진다. 디스크 캐시는 모델별 행을 함께 보관하고(조회는 현재 모델 행만),
+  열 때 disk_ttl보다 오래된 행만 정리한다 (여러 모델을 쓰는 프로세스가 서로의 캐시를 지우지 않게).
+  비동기 경로(aget / aget_many / aset / aset_many)는 SQLite 조회·저장을 asyncio.to_thread로 실행해
+  이벤트 루프(서버의 다른 요청)를 막지 않고, 여러 건은 쿼리·커밋 1번으로 묶는다.
+
+환경변수: EMBEDDING_CACHE_PATH (빈 값이면 디스크 캐시 사용 안 함, 기본은 프로젝트 루트의 data/cache/embedding_cache.sqlite3),
+          EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_TTL
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+# 실행 위치(cwd)와 관계없이 프로젝트 루트 기준 (src/retrieval/cache.py → 루트)
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parents[2] / "data" / "cache" / "embedding_cache.sqlite3"
+DEFAULT_MEMORY_SIZE = 1024
+DEFAULT_MEMORY_TTL = 60 * 60           # 1시간
+DEFAULT_DISK_TTL = 60 * 60 * 24 * 30   # 30일 (같은 모델이면 임베딩은 바뀌지 않음)
+_SQLITE_MAX_PARAMS = 500               # IN (...) 한 번에 넣을 키 수
+
+
+def normalize_query_text(text: str) -> str:
+    """캐시 키용 질의 정규화: 유니코드 NFKC, 소문자화, 앞뒤·연속 공백 정리"""
+    text = unicodedata.normalize("NFKC", text or "")
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.lower()
+
+
+class TTLCache:
+    """최대 크기(LRU 제거)와 TTL(초) 만료를 가진 스레드 안전 메모리 캐시"""
+
+    def __init__(self, maxsize: int = DEFAULT_MEMORY_SIZE, ttl: float | None = DEFAULT_MEMORY_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            expires_at, value = item
+            if expires_at and expires_at < now:
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl else 0.0
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)  # 가장 오래 안 쓴 항목 제거
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+class EmbeddingCache:
+    """질의 임베딩 2단 캐시 (메모리 LRU → SQLite)"""
+
+    def __init__(
+        self,
+        model: str,
+        path: str | Path | None = DEFAULT_CACHE_PATH,
+        memory_size: int = DEFAULT_MEMORY_SIZE,
+        memory_ttl: float | None = DEFAULT_MEMORY_TTL,
+        disk_ttl: float | None = DEFAULT_DISK_TTL,
+    ):
+        self.model = model
+        self.disk_ttl = disk_ttl
+        self.memory = TTLCache(memory_size, memory_ttl)
+        self.disk_hits = 0
+        self.misses = 0
+        self._db: sqlite3.Connection | None = None
+        self._db_lock = threading.Lock()
+        if path:
+            self._open_disk(Path(path))
+
+    def _open_disk(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(path), timeout=5, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")  # 여러 워커 프로세스 동시 읽기/쓰기
+        db.execute("PRAGMA synchronous=NORMAL")  # WAL에서는 커밋마다 fsync하지 않아도 DB가 깨지지 않음
+        db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                key        TEXT PRIMARY KEY,
+                model      TEXT NOT NULL,
+                embedding  BLOB NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        # 만료된 행만 정리 (다른 모델의 행은 그 모델을 쓰는 프로세스가 쓰고 있을 수 있으므로 남김)
+        if self.disk_ttl:
+            db.execute("DELETE FROM embedding_cache WHERE created_at < ?", (time.time() - self.disk_ttl,))
+            db.commit()
+        self._db = db
+
+    def key(self, query: str) -> str:
+        raw = f"{self.model}\n{normalize_query_text(query)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, query: str) -> list[float] | None:
+        key = self.key(query)
+        emb = self.memory.get(key)
+        if emb is not None:
+            return emb
+
+        emb = self._disk_get_many([key]).get(key)
+        if emb is not None:
+            self.disk_hits += 1
+            self.memory.set(key, emb)  # 다음부터는 메모리에서 바로 반환
+            return emb
+
+        self.misses += 1
+        return None
+
+    def set(self, query: str, embedding: list[float]) -> None:
+        key = self.key(query)
+        self.memory.set(key, embedding)
+        self._disk_set_many([(key, embedding)])
+
+    async def aget(self, query: str) -> list[float] | None:
+        """get의 비동기 버전 (디스크 조회는 asyncio.to_thread)"""
+        return (await self.aget_many([query])).get(query)
+
+    async def aget_many(self, queries: list[str]) -> dict[str, list[float]]:
+        """여러 질의 조회 → {질의: 임베딩} (없는 질의는 빠짐). 메모리에 없는 질의만 디스크 조회 1번 (to_thread)"""
+        found: dict[str, list[float]] = {}
+        disk_keys: dict[str, str] = {}
+        for query in dict.fromkeys(queries):
+            key = self.key(query)
+            emb = self.memory.get(key)
+            if emb is not None:
+                found[query] = emb
+            else:
+                disk_keys[query] = key
+        if not disk_keys:
+            return found
+
+        rows = await asyncio.to_thread(self._disk_get_many, list(disk_keys.values())) if self._db else {}
+        for query, key in disk_keys.items():
+            emb = rows.get(key)
+            if emb is None:
+                self.misses += 1
+                continue
+            self.disk_hits += 1
+            self.memory.set(key, emb)
+            found[query] = emb
+        return found
+
+    async def aset(self, query: str, embedding: list[float]) -> None:
+        """set의 비동기 버전 (디스크 저장은 asyncio.to_thread)"""
+        await self.aset_many({query: embedding})
+
+    async def aset_many(self, embeddings: dict[str, list[float]]) -> None:
+        """여러 질의 저장. 메모리는 바로, 디스크는 INSERT·커밋 1번 (to_thread)"""
+        items = [(self.key(query), emb) for query, emb in embeddings.items()]
+        for key, emb in items:
+            self.memory.set(key, emb)
+        if self._db is not None and items:
+            await asyncio.to_thread(self._disk_set_many, items)
+
+    def _disk_set_many(self, items: list[tuple[str, list[float]]]) -> None:
+        if self._db is None or not items:
+            return
+        now = time.time()
+        rows = [(key, self.model, array("f", emb).tobytes(), now) for key, emb in items]
+        try:
+            with self._db_lock:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embedding_cache (key, model, embedding, created_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+                self._db.commit()
+        except sqlite3.Error as e:
+            # 디스크 캐시 실패는 검색 자체를 막지 않음
+            print(f"[임베딩 캐시] 디스크 저장 실패: {e}")
+
+    def _disk_get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        if self._db is None or not keys:
+            return {}
+        rows = []
+        try:
+            with self._db_lock:
+                for start in range(0, len(keys), _SQLITE_MAX_PARAMS):
+                    batch = keys[start:start + _SQLITE_MAX_PARAMS]
+                    rows += self._db.execute(
+                        "SELECT key, embedding, created_at FROM embedding_cache "
+                        f"WHERE model = ? AND key IN ({','.join('?' * len(batch))})",
+                        (self.model, *batch),
+                    ).fetchall()
+        except sqlite3.Error as e:
+            print(f"[임베딩 캐시] 디스크 조회 실패: {e}")
+            return {}
+        out = {}
+        for key, blob, created_at in rows:
+            if self.disk_ttl and created_at + self.disk_ttl < time.time():
+                continue
+            vec = array("f")
+            vec.frombytes(blob)
+            out[key] = vec.tolist()
+        return out
+
+    def stats(self) -> dict:
+        memory_hits = self.memory.hits
+        total = memory_hits + self.disk_hits + self.misses
+        return {
+            "model": self.model,
+            "memory_size": len(self.memory),
+            "memory_hits": memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (memory_hits + self.disk_hits) / total if total else 0.0,
+        }
+
+
+_embedding_caches: dict[str, EmbeddingCache] = {}
+_embedding_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(model: str) -> EmbeddingCache:
+    """모델별 프로세스 공용 임베딩 캐시 반환 (환경변수 설정은 처음 만들 때 적용)"""
+    with _embedding_caches_lock:
+        cache = _embedding_caches.get(model)
+        if cache is None:
+            cache = EmbeddingCache(
+                model,
+                path=os.environ.get("EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH) or None,
+                memory_size=int(os.environ.get("EMBEDDING_CACHE_SIZE", DEFAULT_MEMORY_SIZE)),
+                memory_ttl=float(os.environ.get("EMBEDDING_CACHE_TTL", DEFAULT_MEMORY_TTL)),
+            )
+            _embedding_caches[model] = cache
+        return cache
@@ -0,0 +1,80 @@
+"""
+DIVERSIFY - 검색 결과 다양화 (MMR)
+
+vector_search는 같은 공고의 비슷한 청크(예: 한 공고의 자격요건 줄 3개)를 연달아 돌려주는 경우가 많아
+top_k 자리와 평가 호출·컨텍스트 토큰을 낭비한다.
+후보를 top_k보다 넉넉히(fetch_k) 저장된 임베딩과 함께 가져온 뒤, 로컬에서(API 호출 없이)
+MMR(maximal marginal relevance)로 top_k개를 고른다.
+
+    MMR 점수 = λ · sim(질의, 청크) − (1 − λ) · max sim(청크, 이미 고른 청크)
+
+- 코사인 유사도는 NumPy 행렬 연산으로 계산 (후보 n개 × 고른 k개, O(n·k))
+- 같은 공고(job_post_id)에서는 최대 max_per_job개만 선택
+"""
+
+import numpy as np
+
+DEFAULT_MMR_LAMBDA = 0.7     # 1이면 유사도 순 그대로, 0에 가까울수록 다양성 우선
+DEFAULT_FETCH_FACTOR = 4     # 후보 수 = top_k × fetch_factor
+DEFAULT_MAX_PER_JOB = 2      # 같은 공고에서 최대 몇 개까지 고를지
+
+
+def _normalize_rows(mat: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(mat, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+
+def mmr_select(
+    query_embedding: list[float],
+    chunks: list[dict],
+    top_k: int,
+    lambda_mult: float = DEFAULT_MMR_LAMBDA,
+    max_per_job: int | None = DEFAULT_MAX_PER_JOB,
+) -> list[dict]:
+    """
+    후보 청크 중 MMR로 top_k개 선택 → 유사도 내림차순으로 반환.
+    청크에는 vector_search(with_embedding=True)로 받은 "embedding"이 있어야 한다
+    (임베딩이 없는 후보만 있으면 앞에서부터 top_k개를 그대로 반환).
+
+    Args:
+        query_embedding: 질의 임베딩
+        chunks: 후보 청크 (유사도 순)
+        top_k: 고를 청크 수
+        lambda_mult: 관련성 가중치 λ (0~1)
+        max_per_job: 같은 공고에서 고를 최대 개수 (None이면 제한 없음)
+    """
+    if top_k <= 0 or not chunks:
+        return []
+    candidates = [c for c in chunks if c.get("embedding") is not None]
+    if not candidates:
+        return chunks[:top_k]
+
+    mat = _normalize_rows(np.asarray([c["embedding"] for c in candidates], dtype=np.float32))
+    q = _normalize_rows(np.asarray(query_embedding, dtype=np.float32))
+    relevance = mat @ q
+    _, job_codes = np.unique([str(c.get("job_post_id")) for c in candidates], return_inverse=True)
+
+    n = len(candidates)
+    available = np.ones(n, dtype=bool)
+    max_redundancy = np.full(n, -np.inf, dtype=np.float32)  # 이미 고른 청크와의 최대 유사도
+    per_job = np.zeros(job_codes.max() + 1, dtype=np.int32)
+    selected: list[int] = []
+    while len(selected) < top_k and available.any():
+        if selected:
+            scores = lambda_mult * relevance - (1 - lambda_mult) * max_redundancy
+        else:
+            scores = relevance.copy()
+        scores[~available] = -np.inf
+        idx = int(np.argmax(scores))
+        selected.append(idx)
+        available[idx] = False
+        np.maximum(max_redundancy, mat @ mat[idx], out=max_redundancy)
+
+        job = job_codes[idx]
+        per_job[job] += 1
+        if max_per_job is not None and per_job[job] >= max_per_job:
+            available[job_codes == job] = False
+
+    selected.sort(key=lambda i: -relevance[i])
+    return [candidates[i] for i in selected]
@@ -0,0 +1,160 @@
+"""
+NAME SEARCH - 회사명·공고 제목 질의 빠른 경로
+
+"카카오 백엔드 공고", "토스 Server Developer"처럼 회사명이나 특정 공고 제목을 짚는 질의는
+임베딩 검색이 정확한 이름에 약하고 재작성·임베딩·ANN·평가 비용만 든다.
+이런 질의는 pg_trgm 인덱스(etl/load.py: post_title, company->>'company_name'의 GIN gin_trgm_ops)로
+trigram 유사도 쿼리 1번에 공고와 청크를 찾는다.
+
+- extract_name_terms: 질의를 단어로 나누고 조사·불용어를 뺀 후보어. 직무·조건 일반어, 공고 속성어(JOB_ATTRIBUTE_RE),
+                      스택 어휘를 뺀 이름 후보가 1~NAME_MAX_TERMS개인 질의만 (아니면 None, DB 조회 없음)
+- aname_search      : 후보어별 회사명 유사도(%) + 질의 전체의 제목 단어 유사도(%>)로 공고를 고르고 공고별 청크 반환.
+                      회사명이 NAME_MIN_COMPANY_SIMILARITY 이상 맞은 공고가 있으면 그 회사 공고(제목이 맞는 순),
+                      없으면 제목 유사도 NAME_MIN_TITLE_SIMILARITY 이상인 공고가 NAME_MAX_TITLE_JOBS개 이하일 때만 사용.
+                      둘 다 아니면 None (벡터 검색으로 대체)
+"""
+
+import re
+
+from etl.chunking import CHUNK_TYPES
+from etl.nomalizing import normalize_query_stack
+from monitoring.tracing import span
+
+NAME_MAX_TERMS = 4                  # 이름 후보가 이보다 많으면 이름 질의가 아니라고 보고 DB 조회 없이 None
+NAME_MIN_COMPANY_SIMILARITY = 0.5   # 회사명 trigram 유사도 (similarity) 기준
+NAME_MIN_TITLE_SIMILARITY = 0.8     # 제목 trigram 단어 유사도 (word_similarity) 기준
+NAME_MAX_TITLE_JOBS = 5             # 제목만 맞을 때 이보다 많은 공고가 맞으면 일반 질의로 보고 None
+NAME_MAX_JOBS = 5                   # 결과 공고 수 상한
+NAME_CHUNKS_PER_JOB = 2             # 공고마다 넣을 청크 수 (주요 업무 → 기술스택 → 나머지 순)
+
+# 이름 질의에 흔히 붙는 말 (후보어에서 제외)
+_QUERY_STOPWORDS = {
+    "공고", "채용", "채용공고", "포지션", "자리", "직무", "회사", "기업", "어디", "어떤", "무슨",
+    "찾아줘", "찾아주세요", "알려줘", "알려주세요", "보여줘", "추천", "추천해줘", "추천해주세요",
+    "있어", "있나요", "있어요", "관련", "정보", "채용하는", "모집", "모집하는", "뽑는", "하는",
+}
+# 직무·조건 일반어: 후보어로는 남기되(제목 유사도에 사용) 이름 후보로 세지 않음 ("백엔드 신입 공고"는 이름 질의가 아님)
+_GENERIC_WORDS = {
+    "백엔드", "프론트엔드", "프론트", "풀스택", "서버", "개발", "개발자", "엔지니어", "데이터", "디자이너", "기획자",
+    "신입", "경력직", "주니어", "시니어", "인턴", "정규직", "계약직", "원격", "재택",
+    "backend", "frontend", "server", "developer", "engineer",
+    "높은", "낮은", "많은", "적은", "좋은", "큰", "작은", "이상", "이하", "넘는", "없는", "있는",
+}
+# 공고 속성어 ("연봉", "복지", "코딩테스트" 등). generation/session.py의 속성 후속 질문 판별과 공유
+JOB_ATTRIBUTE_RE = re.compile(
+    r"연봉|복지|직원|매출|영업이익|위치|근무지|경력|마감|링크|기술\s*스택|자격\s*요건|우대\s*사항|코딩\s*테스트|채용\s*절차|주요\s*업무"
+)
+# 이름 뒤에 붙은 조사 ("카카오의", "토스에서")
+_JOSA_RE = re.compile(r"(에서|이랑|랑|으로|로|와|과|을|를|은|는|이|가|에|의|도|만)$")
+_WORD_RE = re.compile(r"[0-9A-Za-z가-힣+#.]+")
+# 공고별 청크 우선순위 (chunking.py의 chunk_type)
+_PRIORITY_CHUNK_TYPES = [CHUNK_TYPES["main_tasks"], CHUNK_TYPES["skills"]]
+
+# 회사명: 후보어마다 인덱스 조회(%, pg_trgm.similarity_threshold), 제목: 질의 전체(%>, word_similarity_threshold)
+# psycopg 파라미터 때문에 % 연산자는 %%로 씀
+_NAME_SEARCH_SQL = """
+    WITH company_hits AS (
+        SELECT j.job_post_id, max(similarity(j.company->>'company_name', t.term)) AS company_score
+        FROM unnest(%(terms)s::text[]) AS t(term)
+        JOIN jobs AS j ON (j.company->>'company_name') %% t.term
+        GROUP BY j.job_post_id
+    ),
+    title_hits AS (
+        SELECT job_post_id, word_similarity(%(text)s, post_title) AS title_score
+        FROM jobs
+        WHERE post_title %%> %(text)s
+    ),
+    matched AS MATERIALIZED (
+        SELECT job_post_id,
+               COALESCE(c.company_score, 0) AS company_score,
+               COALESCE(t.title_score, 0) AS title_score,
+               count(*) FILTER (WHERE t.title_score >= %(title_min)s) OVER () AS n_title
+        FROM company_hits AS c
+        FULL JOIN title_hits AS t USING (job_post_id)
+        ORDER BY COALESCE(c.company_score, 0) >= %(company_min)s DESC,
+                 COALESCE(t.title_score, 0) DESC, COALESCE(c.company_score, 0) DESC, job_post_id
+        LIMIT %(n_jobs)s
+    ),
+    ranked AS (
+        SELECT c.chunk_id, c.chunk_type, c.chunk_text,
+               c.job_post_id, c.job_category, c.post_title, c.job_post_url,
+               m.company_score, m.title_score, m.n_title,
+               row_number() OVER (
+                   PARTITION BY c.job_post_id
+                   ORDER BY array_position(%(priority)s::text[], c.chunk_type) NULLS LAST, c.chunk_id
+               ) AS rn
+        FROM matched AS m
+        JOIN chunks AS c USING (job_post_id)
+    )
+    SELECT chunk_id, chunk_type, chunk_text,
+           job_post_id, job_category, post_title, job_post_url,
+           company_score, title_score, n_title
+    FROM ranked
+    WHERE rn <= %(per_job)s
+    ORDER BY company_score >= %(company_min)s DESC, title_score DESC, company_score DESC, job_post_id, rn
+"""
+
+_CHUNK_COLS = [
+    "chunk_id", "chunk_type", "chunk_text",
+    "job_post_id", "job_category", "post_title", "job_post_url",
+]
+
+
+def _is_name_candidate(term: str, stack_vocabulary: frozenset[str]) -> bool:
+    """직무·조건 일반어, 공고 속성어, 스택 어휘(stack_search.aload_stack_vocabulary)가 아니면 이름 후보"""
+    if term in _GENERIC_WORDS or JOB_ATTRIBUTE_RE.fullmatch(term):
+        return False
+    stacks = normalize_query_stack(term)
+    return not (stack_vocabulary and stacks and all(t in stack_vocabulary for t in stacks))
+
+
+def extract_name_terms(query: str, stack_vocabulary: frozenset[str] = frozenset()) -> list[str] | None:
+    """
+    이름 질의 후보어 (조사·불용어 제외, 2글자 이상).
+    일반어·속성어·스택을 뺀 이름 후보가 없거나 NAME_MAX_TERMS개보다 많으면 None.
+    """
+    terms = []
+    for word in _WORD_RE.findall(query or ""):
+        word = word.lower()
+        if word not in _QUERY_STOPWORDS:
+            word = _JOSA_RE.sub("", word) if len(word) > 2 else word
+        if len(word) >= 2 and word not in _QUERY_STOPWORDS and word not in terms:
+            terms.append(word)
+    names = [t for t in terms if _is_name_candidate(t, stack_vocabulary)]
+    if not names or len(names) > NAME_MAX_TERMS:
+        return None
+    return terms
+
+
+async def aname_search(conn, terms: list[str], top_k: int) -> list[dict] | None:
+    """
+    회사명·제목 trigram 유사도로 찾은 공고의 청크 (score = 회사명·제목 유사도 중 큰 값, 공고 순위 순).
+    회사명도 특정 제목도 맞지 않으면 None.
+    """
+    params = {
+        "terms": terms,
+        "text": " ".join(terms),
+        "company_min": NAME_MIN_COMPANY_SIMILARITY,
+        "title_min": NAME_MIN_TITLE_SIMILARITY,
+        "n_jobs": min(NAME_MAX_JOBS, max(1, top_k // NAME_CHUNKS_PER_JOB)),
+        "priority": _PRIORITY_CHUNK_TYPES,
+        "per_job": NAME_CHUNKS_PER_JOB,
+    }
+    with span("name_search", terms=len(terms), top_k=top_k) as sp:
+        async with conn.cursor() as cur:
+            await cur.execute(_NAME_SEARCH_SQL, params)
+            rows = await cur.fetchall()
+        company_rows = [r for r in rows if r[7] >= NAME_MIN_COMPANY_SIMILARITY]
+        title_rows = [r for r in rows if r[8] >= NAME_MIN_TITLE_SIMILARITY]
+        n_title = rows[0][9] if rows else 0
+        if company_rows:
+            rows, matched_by = company_rows, "company"
+        elif title_rows and n_title <= NAME_MAX_TITLE_JOBS:
+            rows, matched_by = title_rows, "title"
+        else:
+            rows, matched_by = [], None
+        chunks = [
+            {**dict(zip(_CHUNK_COLS, r[:7])), "score": float(max(r[7], r[8]))} for r in rows
+        ][:top_k]
+        sp.set(results=len(chunks), matched_by=matched_by, jobs=len({c["job_post_id"] for c in chunks}))
+    return chunks or None
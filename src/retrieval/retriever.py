@@ -2,47 +2,281 @@
 RETRIEVER - 쿼리 임베딩 및 벡터 검색
 
 질의 문자열 → 임베딩 → chunks 테이블 코사인 유사도 검색 → top_k 청크 반환
+- 질의 임베딩은 retrieval/cache.py의 2단 캐시(메모리 LRU → SQLite)를 먼저 확인
+- 동기(embed_query, vector_search) / 비동기(aembed_query, avector_search) 버전 제공
+  (비동기 버전은 AsyncOpenAI, psycopg AsyncConnection 사용)
+- 배치: aembed_queries(여러 질의를 임베딩 요청 1번으로), avector_search_many(여러 벡터를 LATERAL 조인 쿼리 1번으로)
+- 2단계 검색(two_stage=True): job_vectors(공고별 청크 임베딩 평균, HNSW 인덱스)에서 가까운 공고를 먼저 고르고
+  (1단계, 근사 검색), 그 공고들의 청크만 정확한 거리로 순위를 매김 (2단계, idx_chunks_job_post_id).
+  검색 대상이 공고당 평균 청크 수만큼 줄고, 결과는 최대 top_k × JOB_CANDIDATE_FACTOR개 공고에서만 나옴
 """
 
 import json
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
 from db.conn import get_conn
+from monitoring.tracing import span
+from retrieval.cache import get_embedding_cache
 
 EMBEDDING_MODEL = "text-embedding-3-small"
 DEFAULT_TOP_K = 10
+JOB_CANDIDATE_FACTOR = 2  # 2단계 검색 1단계에서 고를 공고 수 = top_k × 이 값 (HNSW ef_search 기본값 40 이하 권장)
 
+_CHUNK_COLS = [
+    "chunk_id", "chunk_type", "chunk_text",
+    "job_post_id", "job_category", "post_title", "job_post_url", "score",
+]
+
+
+def embed_query(
+    client: OpenAI,
+    query: str,
+    model: str = EMBEDDING_MODEL,
+    use_cache: bool = True,
+) -> list[float]:
+    """질의 문자열을 임베딩 벡터로 변환 (캐시에 있으면 API 호출 생략)"""
+    cache = get_embedding_cache(model) if use_cache else None
+    if cache is not None:
+        emb = cache.get(query)
+        if emb is not None:
+            return emb
 
-def embed_query(client: OpenAI, query: str, model: str = EMBEDDING_MODEL) -> list[float]:
-    """질의 문자열을 임베딩 벡터로 변환"""
     resp = client.embeddings.create(model=model, input=query)
-    return resp.data[0].embedding
+    emb = resp.data[0].embedding
+    if cache is not None:
+        cache.set(query, emb)
+    return emb
+
+
+async def aembed_query(
+    client: AsyncOpenAI,
+    query: str,
+    model: str = EMBEDDING_MODEL,
+    use_cache: bool = True,
+) -> list[float]:
+    """embed_query의 비동기 버전"""
+    with span("embed", model=model) as sp:
+        cache = get_embedding_cache(model) if use_cache else None
+        if cache is not None:
+            emb = await cache.aget(query)
+            if emb is not None:
+                sp.set(cached=True)
+                return emb
+
+        resp = await client.embeddings.create(model=model, input=query)
+        sp.set(cached=False)
+        sp.add_usage(resp.usage)
+        emb = resp.data[0].embedding
+        if cache is not None:
+            await cache.aset(query, emb)
+        return emb
+
+
+async def aembed_queries(
+    client: AsyncOpenAI,
+    queries: list[str],
+    model: str = EMBEDDING_MODEL,
+    use_cache: bool = True,
+) -> list[list[float]]:
+    """여러 질의를 임베딩 (캐시에 없는 질의만 중복 없이 모아 multi-input 요청 1번으로)"""
+    with span("embed_batch", model=model, queries=len(queries)) as sp:
+        cache = get_embedding_cache(model) if use_cache else None
+        found: dict[str, list[float]] = await cache.aget_many(queries) if cache is not None else {}
+        missing = list(dict.fromkeys(q for q in queries if q not in found))
+        sp.set(cached=len(set(queries)) - len(missing), requested=len(missing))
+        if missing:
+            resp = await client.embeddings.create(model=model, input=missing)
+            sp.add_usage(resp.usage)
+            # 응답 순서는 index 기준 (입력 순서와 같음)
+            fetched = {q: item.embedding for q, item in zip(missing, sorted(resp.data, key=lambda d: d.index))}
+            found.update(fetched)
+            if cache is not None:
+                await cache.aset_many(fetched)
+        return [found[q] for q in queries]
+
+
+def _parse_vector(value) -> list[float]:
+    """pgvector 컬럼 값('[0.1,0.2,...]' 문자열 또는 리스트)을 float 리스트로 변환"""
+    if isinstance(value, str):
+        return json.loads(value)
+    return list(value)
+
+
+def _vector_search_sql(with_embedding: bool) -> str:
+    emb_col = ", embedding::text" if with_embedding else ""
+    return f"""
+        SELECT chunk_id, chunk_type, chunk_text,
+               job_post_id, job_category, post_title, job_post_url,
+               1 - (embedding <=> %s::vector) AS score{emb_col}
+        FROM chunks
+        ORDER BY embedding <=> %s::vector
+        LIMIT %s
+    """
+
+
+def _two_stage_search_sql(with_embedding: bool) -> str:
+    """
+    1단계: job_vectors HNSW로 가까운 공고 n_jobs개 → 2단계: 그 공고들의 청크만 정확한 거리로 top_k개.
+    MATERIALIZED CTE로 거리를 먼저 계산해 2단계 정렬이 chunks의 HNSW 인덱스(근사)를 타지 않게 한다.
+    """
+    inner_emb_col = ", c.embedding::text AS embedding" if with_embedding else ""
+    outer_emb_col = ", embedding" if with_embedding else ""
+    return f"""
+        WITH candidate_jobs AS MATERIALIZED (
+            SELECT job_post_id
+            FROM job_vectors
+            ORDER BY embedding <=> %(vec)s::vector
+            LIMIT %(n_jobs)s
+        ),
+        candidates AS MATERIALIZED (
+            SELECT c.chunk_id, c.chunk_type, c.chunk_text,
+                   c.job_post_id, c.job_category, c.post_title, c.job_post_url,
+                   c.embedding <=> %(vec)s::vector AS distance{inner_emb_col}
+            FROM chunks AS c
+            WHERE c.job_post_id IN (SELECT job_post_id FROM candidate_jobs)
+        )
+        SELECT chunk_id, chunk_type, chunk_text,
+               job_post_id, job_category, post_title, job_post_url,
+               1 - distance AS score{outer_emb_col}
+        FROM candidates
+        ORDER BY distance
+        LIMIT %(top_k)s
+    """
+
+
+def _search_query(embedding: list[float], top_k: int, with_embedding: bool, two_stage: bool) -> tuple[str, tuple | dict]:
+    """검색 방식에 맞는 (SQL, 파라미터)"""
+    emb_str = json.dumps(embedding)
+    if two_stage:
+        params = {"vec": emb_str, "n_jobs": top_k * JOB_CANDIDATE_FACTOR, "top_k": top_k}
+        return _two_stage_search_sql(with_embedding), params
+    return _vector_search_sql(with_embedding), (emb_str, emb_str, top_k)
+
+
+def _batch_vector_search_sql(with_embedding: bool) -> str:
+    """질의 벡터 배열을 unnest해 벡터마다 LATERAL로 top_k 검색 (q.idx = 입력 순서, 1부터)"""
+    inner_emb_col = ", c.embedding::text AS embedding" if with_embedding else ""
+    outer_emb_col = ", s.embedding" if with_embedding else ""
+    return f"""
+        SELECT q.idx, s.chunk_id, s.chunk_type, s.chunk_text,
+               s.job_post_id, s.job_category, s.post_title, s.job_post_url, s.score{outer_emb_col}
+        FROM unnest(%s::text[]) WITH ORDINALITY AS q(vec, idx)
+        CROSS JOIN LATERAL (
+            SELECT c.chunk_id, c.chunk_type, c.chunk_text,
+                   c.job_post_id, c.job_category, c.post_title, c.job_post_url,
+                   1 - (c.embedding <=> q.vec::vector) AS score{inner_emb_col}
+            FROM chunks AS c
+            ORDER BY c.embedding <=> q.vec::vector
+            LIMIT %s
+        ) AS s
+        ORDER BY q.idx, s.score DESC
+    """
+
+
+def _batch_two_stage_search_sql(with_embedding: bool) -> str:
+    """_two_stage_search_sql의 배치 버전 (질의 벡터마다 LATERAL로 공고 후보 → 청크 순위)"""
+    inner_emb_col = ", c.embedding::text AS embedding" if with_embedding else ""
+    mid_emb_col = ", embedding" if with_embedding else ""
+    outer_emb_col = ", s.embedding" if with_embedding else ""
+    return f"""
+        SELECT q.idx, s.chunk_id, s.chunk_type, s.chunk_text,
+               s.job_post_id, s.job_category, s.post_title, s.job_post_url, s.score{outer_emb_col}
+        FROM unnest(%(vecs)s::text[]) WITH ORDINALITY AS q(vec, idx)
+        CROSS JOIN LATERAL (
+            WITH candidates AS MATERIALIZED (
+                SELECT c.chunk_id, c.chunk_type, c.chunk_text,
+                       c.job_post_id, c.job_category, c.post_title, c.job_post_url,
+                       c.embedding <=> q.vec::vector AS distance{inner_emb_col}
+                FROM chunks AS c
+                WHERE c.job_post_id IN (
+                    SELECT jv.job_post_id
+                    FROM job_vectors AS jv
+                    ORDER BY jv.embedding <=> q.vec::vector
+                    LIMIT %(n_jobs)s
+                )
+            )
+            SELECT chunk_id, chunk_type, chunk_text,
+                   job_post_id, job_category, post_title, job_post_url,
+                   1 - distance AS score{mid_emb_col}
+            FROM candidates
+            ORDER BY distance
+            LIMIT %(top_k)s
+        ) AS s
+        ORDER BY q.idx, s.score DESC
+    """
+
+
+def _rows_to_chunks(rows, with_embedding: bool) -> list[dict]:
+    cols = _CHUNK_COLS + ["embedding"] if with_embedding else _CHUNK_COLS
+    results = [dict(zip(cols, row)) for row in rows]
+    if with_embedding:
+        for r in results:
+            r["embedding"] = _parse_vector(r["embedding"])
+    return results
 
 
 def vector_search(
     conn,
     embedding: list[float],
     top_k: int = DEFAULT_TOP_K,
+    with_embedding: bool = False,
+    two_stage: bool = False,
 ) -> list[dict]:
     """
     코사인 유사도 벡터 검색 → top_k 청크 반환
+
+    Args:
+        with_embedding: True면 각 청크의 저장된 임베딩 벡터도 "embedding" 키로 함께 반환
+                        (로컬 유사도 필터링·재정렬용)
+        two_stage: True면 공고 벡터(job_vectors)로 후보 공고를 먼저 고른 뒤 그 공고의 청크만 순위를 매김
     """
-    sql = """
-        SELECT chunk_id, chunk_type, chunk_text,
-               job_post_id, job_category, post_title, job_post_url,
-               1 - (embedding <=> %s::vector) AS score
-        FROM chunks
-        ORDER BY embedding <=> %s::vector
-        LIMIT %s
-    """
-    emb_str = json.dumps(embedding)
+    sql, params = _search_query(embedding, top_k, with_embedding, two_stage)
     with conn.cursor() as cur:
-        cur.execute(sql, (emb_str, emb_str, top_k))
+        cur.execute(sql, params)
         rows = cur.fetchall()
+    return _rows_to_chunks(rows, with_embedding)
 
-    cols = [
-        "chunk_id", "chunk_type", "chunk_text",
-        "job_post_id", "job_category", "post_title", "job_post_url", "score",
-    ]
-    return [dict(zip(cols, row)) for row in rows]
+
+async def avector_search(
+    conn,
+    embedding: list[float],
+    top_k: int = DEFAULT_TOP_K,
+    with_embedding: bool = False,
+    two_stage: bool = False,
+) -> list[dict]:
+    """vector_search의 비동기 버전 (conn: psycopg AsyncConnection)"""
+    sql, params = _search_query(embedding, top_k, with_embedding, two_stage)
+    with span("vector_search", top_k=top_k, two_stage=two_stage) as sp:
+        async with conn.cursor() as cur:
+            await cur.execute(sql, params)
+            rows = await cur.fetchall()
+        sp.set(results=len(rows))
+    return _rows_to_chunks(rows, with_embedding)
+
+
+async def avector_search_many(
+    conn,
+    embeddings: list[list[float]],
+    top_k: int = DEFAULT_TOP_K,
+    with_embedding: bool = False,
+    two_stage: bool = False,
+) -> list[list[dict]]:
+    """여러 질의 벡터를 한 번의 쿼리(왕복 1번)로 검색 → 입력 순서대로 청크 리스트"""
+    if not embeddings:
+        return []
+    vectors = [json.dumps(e) for e in embeddings]
+    if two_stage:
+        sql = _batch_two_stage_search_sql(with_embedding)
+        params = {"vecs": vectors, "n_jobs": top_k * JOB_CANDIDATE_FACTOR, "top_k": top_k}
+    else:
+        sql, params = _batch_vector_search_sql(with_embedding), (vectors, top_k)
+    with span("vector_search_batch", queries=len(embeddings), top_k=top_k, two_stage=two_stage) as sp:
+        async with conn.cursor() as cur:
+            await cur.execute(sql, params)
+            rows = await cur.fetchall()
+        sp.set(results=len(rows))
+    results: list[list] = [[] for _ in embeddings]
+    for row in rows:
+        results[row[0] - 1].append(row[1:])
+    return [_rows_to_chunks(r, with_embedding) for r in results]
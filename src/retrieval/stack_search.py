@@ -0,0 +1,132 @@
+"""
+STACK SEARCH - 기술스택 질의 빠른 경로
+
+"React, TypeScript 공고"처럼 주로 기술스택 나열인 질의는 재작성·임베딩 없이
+jobs.stack(정규화된 기술스택 TEXT[], GIN 인덱스)의 배열 겹침(&&) 쿼리 1번으로 공고를 찾는다.
+
+- extract_query_stacks: 질의를 etl.nomalizing.normalize_query_stack으로 토큰화하고, DB에 있는 스택 어휘와 대조해
+                        스택 토큰 비율이 STACK_QUERY_MIN_RATIO 이상일 때만 스택 목록 반환 (아니면 None → 일반 검색)
+- astack_search       : 질의 스택을 많이 가진 공고 순으로 공고별 청크(기술스택·주요 업무 우선)를 반환.
+                        질의 스택의 STACK_MIN_COVERAGE 이상을 가진 공고가 STACK_MIN_JOBS개 미만이면 None (벡터 검색으로 대체)
+- 스택 어휘(SELECT DISTINCT unnest(stack))는 프로세스 내 TTLCache에 STACK_VOCAB_TTL초 동안 보관
+"""
+
+import re
+
+from etl.chunking import CHUNK_TYPES
+from etl.nomalizing import normalize_query_stack
+from monitoring.tracing import span
+from retrieval.cache import TTLCache
+
+STACK_QUERY_MIN_RATIO = 0.6   # (불용어 제외) 질의 토큰 중 스택 토큰 비율이 이 값 이상이면 스택 질의
+STACK_MIN_COVERAGE = 0.5      # 공고가 질의 스택의 이 비율 이상을 가져야 결과로 인정
+STACK_MIN_JOBS = 3            # 인정된 공고가 이보다 적으면 벡터 검색으로 대체
+STACK_CHUNKS_PER_JOB = 2      # 공고마다 넣을 청크 수 (기술스택 → 주요 업무 → 나머지 순)
+STACK_VOCAB_TTL = 10 * 60     # 스택 어휘 캐시 TTL (초)
+
+# 스택 질의에 흔히 붙는 말 (스택 비율 계산에서 제외)
+_QUERY_STOPWORDS = {
+    "공고", "채용", "채용공고", "포지션", "자리", "직무", "회사", "기업", "개발자", "엔지니어",
+    "쓰는", "사용하는", "다루는", "하는", "있는", "관련", "기술", "스택", "기술스택",
+    "찾아줘", "찾아주세요", "알려줘", "알려주세요", "추천", "추천해줘", "추천해주세요", "보여줘",
+    "and", "or", "및", "+",
+}
+# 스택 뒤에 붙은 조사 ("react랑", "python으로")
+_JOSA_RE = re.compile(r"(이랑|랑|으로|로|와|과|을|를|은|는|이|가|에|의|도|만)$")
+# 공고별 청크 우선순위 (chunking.py의 chunk_type)
+_PRIORITY_CHUNK_TYPES = [CHUNK_TYPES["skills"], CHUNK_TYPES["main_tasks"]]
+
+_vocab_cache = TTLCache(maxsize=1, ttl=STACK_VOCAB_TTL)
+
+_STACK_SEARCH_SQL = """
+    WITH matched AS MATERIALIZED (
+        SELECT job_post_id,
+               cardinality(ARRAY(
+                   SELECT unnest(stack) INTERSECT SELECT unnest(%(stacks)s::text[])
+               )) AS n_matched
+        FROM jobs
+        WHERE stack && %(stacks)s::text[]
+        ORDER BY n_matched DESC, job_post_id
+        LIMIT %(n_jobs)s
+    ),
+    ranked AS (
+        SELECT c.chunk_id, c.chunk_type, c.chunk_text,
+               c.job_post_id, c.job_category, c.post_title, c.job_post_url,
+               m.n_matched,
+               row_number() OVER (
+                   PARTITION BY c.job_post_id
+                   ORDER BY array_position(%(priority)s::text[], c.chunk_type) NULLS LAST, c.chunk_id
+               ) AS rn
+        FROM matched AS m
+        JOIN chunks AS c USING (job_post_id)
+    )
+    SELECT chunk_id, chunk_type, chunk_text,
+           job_post_id, job_category, post_title, job_post_url,
+           n_matched::float / %(n_stacks)s AS score
+    FROM ranked
+    WHERE rn <= %(per_job)s
+    ORDER BY n_matched DESC, job_post_id, rn
+"""
+
+_CHUNK_COLS = [
+    "chunk_id", "chunk_type", "chunk_text",
+    "job_post_id", "job_category", "post_title", "job_post_url", "score",
+]
+
+
+def clear_stack_vocabulary() -> None:
+    _vocab_cache.clear()
+
+
+async def aload_stack_vocabulary(conn) -> frozenset[str]:
+    """jobs.stack에 있는 모든 스택 토큰 (TTL 캐시)"""
+    vocab = _vocab_cache.get("vocab")
+    if vocab is None:
+        async with conn.cursor() as cur:
+            await cur.execute("SELECT DISTINCT unnest(stack) FROM jobs")
+            vocab = frozenset(row[0] for row in await cur.fetchall())
+        _vocab_cache.set("vocab", vocab)
+    return vocab
+
+
+def extract_query_stacks(query: str, vocabulary: frozenset[str]) -> list[str] | None:
+    """
+    질의가 주로 기술스택 나열이면 정규화된 스택 목록, 아니면 None.
+    불용어("공고", "찾아줘" 등)를 뺀 토큰 중 어휘에 있는 토큰이 STACK_QUERY_MIN_RATIO 이상이어야 한다.
+    """
+    tokens = [t for t in normalize_query_stack(query) if t not in _QUERY_STOPWORDS]
+    if not tokens or not vocabulary:
+        return None
+    stacks = []
+    for token in tokens:
+        if token not in vocabulary:
+            token = _JOSA_RE.sub("", token)
+        if token in vocabulary and token not in stacks:
+            stacks.append(token)
+    if not stacks or len(stacks) / len(tokens) < STACK_QUERY_MIN_RATIO:
+        return None
+    return stacks
+
+
+async def astack_search(conn, stacks: list[str], top_k: int) -> list[dict] | None:
+    """
+    질의 스택과 겹치는 공고의 청크 (score = 공고가 가진 질의 스택 비율, 공고 순위 순).
+    커버리지가 낮으면(STACK_MIN_COVERAGE 이상인 공고가 STACK_MIN_JOBS개 미만) None.
+    """
+    params = {
+        "stacks": stacks,
+        "n_stacks": len(stacks),
+        "n_jobs": max(1, top_k // STACK_CHUNKS_PER_JOB),
+        "priority": _PRIORITY_CHUNK_TYPES,
+        "per_job": STACK_CHUNKS_PER_JOB,
+    }
+    with span("stack_search", stacks=len(stacks), top_k=top_k) as sp:
+        async with conn.cursor() as cur:
+            await cur.execute(_STACK_SEARCH_SQL, params)
+            rows = await cur.fetchall()
+        chunks = [dict(zip(_CHUNK_COLS, row)) for row in rows][:top_k]
+        covered = {c["job_post_id"] for c in chunks if c["score"] >= STACK_MIN_COVERAGE}
+        sp.set(results=len(chunks), covered_jobs=len(covered))
+    if len(covered) < min(STACK_MIN_JOBS, params["n_jobs"]):
+        return None
+    return [c for c in chunks if c["score"] >= STACK_MIN_COVERAGE]
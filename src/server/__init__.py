@@ -0,0 +1 @@
+# HTTP 서버: ASGI 앱 (uvicorn 워커로 실행)
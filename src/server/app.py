@@ -0,0 +1,326 @@
+"""
+RAG HTTP 서버 (ASGI)
+
+agenerate를 HTTP로 노출하는 장기 실행 서비스. 프레임워크 없이 ASGI 앱을 직접 구현하고 uvicorn으로 실행한다.
+- 워커 프로세스마다 AsyncOpenAI 클라이언트 1개와 DB 커넥션 풀 1개를 만들어 모든 요청이 공유 (lifespan에서 생성·정리)
+- 동시 처리 수(max_concurrency)를 넘는 요청은 최대 max_queue개까지 대기, 그 이상은 바로 503 + Retry-After (부하 차단)
+- 요청마다 마감 시간(대기 시간 포함): 넘으면 파이프라인을 취소하고 504
+- 워커 수(--workers)만큼 프로세스를 띄우고, 같은 머신의 워커끼리는 디스크 임베딩 캐시(retrieval/cache.py)를 공유
+
+엔드포인트:
+    POST /generate  {"query": "...", "grade_mode"?, "top_k"?, "rewrite"?, "context_policy"?, "context_budget"?, "diversify"?, "two_stage"?, "stack_fast_path"?, "name_fast_path"?, "timeout"?}
+                    → {"answer", "chunks": [{chunk_id, job_post_id, post_title, score}], "tools_used", "elapsed_ms"}
+    GET  /healthz   → DB 연결 확인(SELECT 1) + 현재 처리·대기 수. 실패 시 503
+    GET  /metrics   → Prometheus 텍스트 형식 지표 (monitoring/metrics.py, 이 요청을 받은 워커 프로세스의 값)
+    (/healthz, /metrics는 HEAD도 받으며 상태·헤더만 보내고 본문은 보내지 않음)
+    처리 중 예상하지 못한 오류는 로그(stderr)에 남기고 JSON 500으로 응답
+
+사용법:
+    python src/server/app.py --workers 4 --port 8000
+    curl -s localhost:8000/generate -d '{"query": "파이썬 백엔드 신입 공고"}'
+
+환경변수: RAG_MAX_CONCURRENCY, RAG_MAX_QUEUE, RAG_REQUEST_TIMEOUT, RAG_POOL_SIZE (+ OPENAI_*, DATABASE_URL / POSTGRES_*)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import traceback
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+from pathlib import Path
+
+# 스크립트 단독 실행·uvicorn 워커 import 시 src, src/generation을 path에 넣어 llm 모듈 import 가능하게 함
+_src_dir = Path(__file__).resolve().parent.parent
+for _p in (_src_dir, _src_dir / "generation"):
+    if str(_p) not in sys.path:
+        sys.path.insert(0, str(_p))
+
+from openai import AsyncOpenAI
+
+from context import CONTEXT_POLICIES
+from db.conn import async_pool_scope
+from grading import GRADE_MODES
+from llm import agenerate
+from monitoring.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, render as render_metrics
+
+MAX_BODY_BYTES = 64 * 1024
+MAX_QUERY_CHARS = 2000
+HEALTH_TIMEOUT = 2.0  # /healthz DB 확인 최대 대기 (초)
+
+
+@dataclass
+class ServerConfig:
+    max_concurrency: int = 16       # 워커 1개가 동시에 실행하는 generate 수
+    max_queue: int = 64             # 동시 처리 수를 넘은 요청의 최대 대기 수 (넘으면 503)
+    request_timeout: float = 30.0   # 요청 마감 시간 (초, 대기 시간 포함). 요청 본문 timeout으로 더 짧게만 지정 가능
+    pool_size: int = 16             # DB 커넥션 풀 최대 크기
+
+    @classmethod
+    def from_env(cls) -> "ServerConfig":
+        return cls(
+            max_concurrency=int(os.environ.get("RAG_MAX_CONCURRENCY", cls.max_concurrency)),
+            max_queue=int(os.environ.get("RAG_MAX_QUEUE", cls.max_queue)),
+            request_timeout=float(os.environ.get("RAG_REQUEST_TIMEOUT", cls.request_timeout)),
+            pool_size=int(os.environ.get("RAG_POOL_SIZE", cls.pool_size)),
+        )
+
+
+class Overloaded(Exception):
+    """대기열이 가득 차 요청을 받을 수 없음 (503)"""
+
+
+class AdmissionControl:
+    """동시 처리 수 제한 + 길이 제한 대기열. 자리가 없으면 기다리지 않고 Overloaded"""
+
+    def __init__(self, max_concurrency: int, max_queue: int):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def __aenter__(self):
+        if self.in_flight >= self.max_concurrency and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+        }
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str, headers: list | None = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or []
+
+
+async def _read_body(receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if len(body) > MAX_BODY_BYTES:
+            raise HTTPError(413, "요청 본문이 너무 큽니다.")
+        if not message.get("more_body"):
+            return body
+
+
+async def _send_json(send, status: int, payload: dict, headers: list | None = None, head: bool = False) -> None:
+    """head면 (HEAD 요청) 상태·헤더(content-length 포함)만 보내고 본문은 비움"""
+    body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json; charset=utf-8"),
+            (b"content-length", str(len(body)).encode()),
+            *(headers or []),
+        ],
+    })
+    await send({"type": "http.response.body", "body": b"" if head else body})
+
+
+async def _send_text(send, status: int, text: str, content_type: str, head: bool = False) -> None:
+    body = text.encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", content_type.encode()),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": b"" if head else body})
+
+
+def _parse_generate_request(body: bytes, config: ServerConfig) -> tuple[str, dict, float]:
+    """요청 본문 → (질의, agenerate 인자, 마감 시간(초))"""
+    try:
+        data = json.loads(body or b"{}")
+    except json.JSONDecodeError:
+        raise HTTPError(400, "JSON 본문이 필요합니다.")
+    if not isinstance(data, dict):
+        raise HTTPError(400, "JSON 객체가 필요합니다.")
+    query = str(data.get("query") or "").strip()
+    if not query:
+        raise HTTPError(400, "query가 비어 있습니다.")
+    if len(query) > MAX_QUERY_CHARS:
+        raise HTTPError(400, f"query는 {MAX_QUERY_CHARS}자 이하여야 합니다.")
+
+    kwargs = {}
+    if "grade_mode" in data:
+        if data["grade_mode"] not in GRADE_MODES:
+            raise HTTPError(400, f"grade_mode는 {', '.join(GRADE_MODES)} 중 하나여야 합니다.")
+        kwargs["grade_mode"] = data["grade_mode"]
+    if "context_policy" in data:
+        if data["context_policy"] not in CONTEXT_POLICIES:
+            raise HTTPError(400, f"context_policy는 {', '.join(CONTEXT_POLICIES)} 중 하나여야 합니다.")
+        kwargs["context_policy"] = data["context_policy"]
+    try:
+        if "top_k" in data:
+            kwargs["top_k"] = min(max(1, int(data["top_k"])), 50)
+        if "context_budget" in data:
+            kwargs["context_budget"] = max(100, int(data["context_budget"]))
+        timeout = config.request_timeout
+        if "timeout" in data:
+            timeout = min(float(data["timeout"]), config.request_timeout)
+    except (TypeError, ValueError):
+        raise HTTPError(400, "top_k, context_budget, timeout은 숫자여야 합니다.")
+    if "rewrite" in data:
+        kwargs["rewrite"] = bool(data["rewrite"])
+    if "diversify" in data:
+        kwargs["diversify"] = bool(data["diversify"])
+    if "two_stage" in data:
+        kwargs["two_stage"] = bool(data["two_stage"])
+    if "stack_fast_path" in data:
+        kwargs["stack_fast_path"] = bool(data["stack_fast_path"])
+    if "name_fast_path" in data:
+        kwargs["name_fast_path"] = bool(data["name_fast_path"])
+    return query, kwargs, timeout
+
+
+class RAGApp:
+    """ASGI 앱. 워커 프로세스마다 1개 (lifespan startup에서 클라이언트·풀 생성)"""
+
+    def __init__(self, config: ServerConfig | None = None):
+        self.config = config or ServerConfig.from_env()
+        self.client: AsyncOpenAI | None = None
+        self.pool = None
+        self.admission: AdmissionControl | None = None
+        self._stack = AsyncExitStack()
+
+    async def startup(self) -> None:
+        self.client = AsyncOpenAI()
+        self._stack.push_async_callback(self.client.close)
+        self.pool = await self._stack.enter_async_context(async_pool_scope(max_size=self.config.pool_size))
+        self.admission = AdmissionControl(self.config.max_concurrency, self.config.max_queue)
+
+    async def shutdown(self) -> None:
+        await self._stack.aclose()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        try:
+            await self._route(scope, receive, send)
+        except HTTPError as e:
+            await _send_json(send, e.status, {"error": e.message}, e.headers, head=scope["method"] == "HEAD")
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _route(self, scope, receive, send) -> None:
+        method, path = scope["method"], scope["path"]
+        head = method == "HEAD"
+        if path == "/generate":
+            if method != "POST":
+                raise HTTPError(405, "POST만 지원합니다.", [(b"allow", b"POST")])
+            await self._generate(receive, send)
+        elif path == "/healthz":
+            if method not in ("GET", "HEAD"):
+                raise HTTPError(405, "GET, HEAD만 지원합니다.", [(b"allow", b"GET, HEAD")])
+            await self._healthz(send, head)
+        elif path == "/metrics":
+            if method not in ("GET", "HEAD"):
+                raise HTTPError(405, "GET, HEAD만 지원합니다.", [(b"allow", b"GET, HEAD")])
+            await _send_text(send, 200, render_metrics(), METRICS_CONTENT_TYPE, head)
+        else:
+            raise HTTPError(404, "없는 경로입니다.")
+
+    async def _generate(self, receive, send) -> None:
+        query, kwargs, timeout = _parse_generate_request(await _read_body(receive), self.config)
+        t0 = time.perf_counter()
+        try:
+            # 마감 시간은 대기열에서 기다린 시간까지 포함
+            async with asyncio.timeout(timeout):
+                async with self.admission:
+                    answer, chunks, tools_used = await agenerate(
+                        query, client=self.client, pool=self.pool, return_chunks=True, **kwargs
+                    )
+        except Overloaded:
+            raise HTTPError(503, "요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도하세요.", [(b"retry-after", b"1")])
+        except TimeoutError:
+            raise HTTPError(504, f"{timeout:g}초 안에 답변을 만들지 못했습니다.")
+        except Exception as e:
+            # OpenAI·DB 오류 등: uvicorn의 텍스트 500 대신 JSON 500 (원인은 로그에만 남김)
+            print(f"[서버] /generate 처리 실패: {type(e).__name__}: {e}", file=sys.stderr)
+            traceback.print_exc()
+            raise HTTPError(500, "답변을 만드는 중 오류가 발생했습니다.")
+        await _send_json(send, 200, {
+            "answer": answer,
+            "chunks": [
+                {k: c.get(k) for k in ("chunk_id", "job_post_id", "post_title", "score")}
+                for c in chunks
+            ],
+            "tools_used": tools_used,
+            "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1),
+        })
+
+    async def _healthz(self, send, head: bool = False) -> None:
+        status = {"status": "ok", **self.admission.stats()}
+        try:
+            async with asyncio.timeout(HEALTH_TIMEOUT):
+                async with self.pool.connection() as conn:
+                    await conn.execute("SELECT 1")
+        except Exception as e:
+            status.update(status="error", error=f"DB: {type(e).__name__}: {e}")
+        await _send_json(send, 200 if status["status"] == "ok" else 503, status, head=head)
+
+
+app = RAGApp()
+
+
+if __name__ == "__main__":
+    import uvicorn
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="RAG HTTP 서버 (uvicorn)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("RAG_WORKERS", 1)), help="워커 프로세스 수")
+    args = parser.parse_args()
+
+    # 워커 프로세스가 app을 import할 수 있도록 src를 PYTHONPATH에 추가 (환경변수는 워커에 상속됨)
+    os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [str(_src_dir), os.environ.get("PYTHONPATH")]))
+    uvicorn.run("server.app:app", host=args.host, port=args.port, workers=args.workers, lifespan="on")